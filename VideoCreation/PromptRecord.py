@@ -1,8 +1,12 @@
+import sys
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
-from datetime import datetime
+from typing import Optional, Dict, Any, Union, List, Iterable, Iterator
+from datetime import datetime, date
 
-@dataclass
+import pandas as pd
+
+@dataclass(slots=True)
 class TextElement:
     """Represents a text element with its styling properties."""
     text: str
@@ -13,7 +17,7 @@ class TextElement:
     hor_offset: int
     vert_offset: int
 
-@dataclass
+@dataclass(slots=True)
 class PromptRecord:
     """Represents a single prompt record from the Excel file."""
     
@@ -159,6 +163,208 @@ class PromptRecord:
         
         return result
 
+# Tracker columns holding text element styling, with from_excel_row defaults
+TEXT_ELEMENT_COUNT = 3
+TEXT_ELEMENT_INT_COLUMNS = {'Font Size': 24, 'Stroke Width': 1, 'Hor Offset': 0, 'Vert Offset': 0}
+TEXT_ELEMENT_STR_COLUMNS = {'Color': '#FFFFFF', 'Stroke Color': '#000000'}
+
+# Plain string fields: dataclass field -> tracker column. Interned fields repeat across many rows.
+PROMPT_STR_FIELDS = {
+    'category': 'Category',
+    'prompt_title': 'Prompt Title',
+    'status': 'Status',
+    'version': 'Version',
+    'head_video_path': 'Head Video Path',
+    'head_music_path': 'Head Music Path',
+    'tail_video_path': 'Tail Video Path',
+    'tail_music_path': 'Tail Music Path',
+    'tail_comic_image_path': 'Tail Comic Image Path',
+    'voiceover_path': 'Voiceover Path',
+    'voiceover_script': 'Voiceover Script',
+    'google_doc_link': 'Google Doc Link',
+    'notion_link': 'Notion Link',
+    'gumroad_link': 'Gumroad Link',
+    'notes': 'Notes'
+}
+INTERNED_FIELDS = {
+    'category', 'status', 'version', 'head_video_path', 'head_music_path',
+    'tail_video_path', 'tail_music_path', 'tail_comic_image_path'
+}
+
+
+def _as_date(value: Union[date, datetime]) -> date:
+    """Normalize a date or datetime to a date."""
+    return value.date() if isinstance(value, datetime) else value
+
+
+class PromptRecordStore:
+    """
+    In-memory, indexed collection of PromptRecords.
+    
+    Records are slotted dataclasses with repeated strings (status, category,
+    asset paths) interned. Indexes on prompt_id, status, category and
+    publish_date let filtered queries skip a full scan of the records.
+    """
+    
+    def __init__(self, records: Iterable[PromptRecord] = ()):
+        self._records: List[PromptRecord] = []
+        self._by_id: Dict[int, int] = {}
+        self._by_status: Dict[str, set] = {}
+        self._by_category: Dict[str, set] = {}
+        # Parallel lists sorted by publish date ordinal: ordinals and record positions
+        self._date_ordinals: List[int] = []
+        self._date_positions: List[int] = []
+        self._add_all(records)
+    
+    @classmethod
+    def from_excel(cls, excel_path: str, sheet_name: Union[str, int] = 0) -> 'PromptRecordStore':
+        """Load a whole prompt tracker (Excel or CSV) in bulk."""
+        if excel_path.lower().endswith(('.xlsx', '.xls')):
+            df = pd.read_excel(excel_path, sheet_name=sheet_name, engine='openpyxl')
+        else:
+            df = pd.read_csv(excel_path)
+        store = cls.from_dataframe(df)
+        print(f"Loaded {len(store)} prompt records from {excel_path}")
+        return store
+    
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'PromptRecordStore':
+        """
+        Build a store from a tracker DataFrame.
+        Columns are normalized once (not cell by cell) with the same defaults as
+        PromptRecord.from_excel_row.
+        """
+        n = len(df)
+        
+        def str_column(column: str, default: str = '') -> List[str]:
+            if column not in df.columns:
+                return [default] * n
+            values = df[column].astype(object).where(df[column].notna(), default)
+            return [str(v) for v in values]
+        
+        def int_column(column: str, default: int) -> List[int]:
+            if column not in df.columns:
+                return [default] * n
+            return pd.to_numeric(df[column], errors='coerce').fillna(default).astype('int64').tolist()
+        
+        if 'Publish Date' in df.columns:
+            parsed_dates = pd.to_datetime(df['Publish Date'], errors='coerce')
+            publish_dates = [None if pd.isna(v) else v.to_pydatetime() for v in parsed_dates]
+        else:
+            publish_dates = [None] * n
+        
+        prompt_ids = int_column('Prompt ID', 0)
+        str_fields = {}
+        for field_name, column in PROMPT_STR_FIELDS.items():
+            values = str_column(column)
+            if field_name in INTERNED_FIELDS:
+                values = [sys.intern(v) for v in values]
+            str_fields[field_name] = values
+        
+        text_columns = []
+        for i in range(1, TEXT_ELEMENT_COUNT + 1):
+            text_columns.append((
+                str_column(f'Text {i}'),
+                {name: int_column(f'{name} {i}', default) for name, default in TEXT_ELEMENT_INT_COLUMNS.items()},
+                {name: [sys.intern(v) for v in str_column(f'{name} {i}', default)] for name, default in TEXT_ELEMENT_STR_COLUMNS.items()}
+            ))
+        
+        records = []
+        for row in range(n):
+            text_elements = []
+            for texts, ints, strs in text_columns:
+                if texts[row]:  # Only create if text exists
+                    text_elements.append(TextElement(
+                        text=texts[row],
+                        font_size=ints['Font Size'][row],
+                        color=strs['Color'][row],
+                        stroke_color=strs['Stroke Color'][row],
+                        stroke_width=ints['Stroke Width'][row],
+                        hor_offset=ints['Hor Offset'][row],
+                        vert_offset=ints['Vert Offset'][row]
+                    ))
+            records.append(PromptRecord(
+                prompt_id=prompt_ids[row],
+                publish_date=publish_dates[row],
+                text_elements=text_elements,
+                **{field_name: values[row] for field_name, values in str_fields.items()}
+            ))
+        
+        return cls(records)
+    
+    def _add_all(self, records: Iterable[PromptRecord]) -> None:
+        """Append records and rebuild the date index once."""
+        dated = list(zip(self._date_ordinals, self._date_positions))
+        for record in records:
+            position = len(self._records)
+            self._records.append(record)
+            if record.prompt_id in self._by_id:
+                print(f"Warning: Duplicate prompt_id {record.prompt_id}, latest row wins for get()")
+            self._by_id[record.prompt_id] = position
+            self._by_status.setdefault(record.status.lower(), set()).add(position)
+            self._by_category.setdefault(record.category.lower(), set()).add(position)
+            if record.publish_date:
+                dated.append((_as_date(record.publish_date).toordinal(), position))
+        dated.sort()
+        self._date_ordinals = [ordinal for ordinal, _ in dated]
+        self._date_positions = [position for _, position in dated]
+    
+    def add(self, record: PromptRecord) -> None:
+        """Add a single record to the store and its indexes."""
+        self._add_all([record])
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __iter__(self) -> Iterator[PromptRecord]:
+        return iter(self._records)
+    
+    def get(self, prompt_id: int) -> Optional[PromptRecord]:
+        """Get a record by prompt_id."""
+        position = self._by_id.get(prompt_id)
+        return self._records[position] if position is not None else None
+    
+    def query(
+        self,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        publish_from: Optional[Union[date, datetime]] = None,
+        publish_to: Optional[Union[date, datetime]] = None
+    ) -> List[PromptRecord]:
+        """
+        Return records matching all given filters, in tracker order.
+        
+        Args:
+            status: Status to match (case-insensitive), e.g. "Done"
+            category: Category to match (case-insensitive), e.g. "Travel"
+            publish_from: Earliest publish date (inclusive)
+            publish_to: Latest publish date (inclusive)
+            
+        Returns:
+            List of matching PromptRecord objects
+        """
+        candidates = []
+        if status is not None:
+            candidates.append(self._by_status.get(status.lower(), set()))
+        if category is not None:
+            candidates.append(self._by_category.get(category.lower(), set()))
+        if publish_from is not None or publish_to is not None:
+            lo = bisect_left(self._date_ordinals, _as_date(publish_from).toordinal()) if publish_from else 0
+            hi = bisect_right(self._date_ordinals, _as_date(publish_to).toordinal()) if publish_to else len(self._date_ordinals)
+            candidates.append(set(self._date_positions[lo:hi]))
+        
+        if not candidates:
+            return list(self._records)
+        
+        # Intersect starting from the smallest candidate set
+        candidates.sort(key=len)
+        positions = candidates[0].intersection(*candidates[1:])
+        return [self._records[position] for position in sorted(positions)]
+    
+    def ready_for_production(self) -> List[PromptRecord]:
+        """Return all records that are ready for video production."""
+        return [record for record in self.query(status='done') if record.is_ready_for_production()]
+
 # Example usage
 if __name__ == "__main__":
     # Sample data matching your example
@@ -207,4 +413,10 @@ if __name__ == "__main__":
     record = PromptRecord.from_excel_row(sample_data)
     print(f"Created record: {record.prompt_title}")
     print(f"Ready for production: {record.is_ready_for_production()}")
-    print(f"Number of text elements: {len(record.text_elements)}")
\ No newline at end of file
+    print(f"Number of text elements: {len(record.text_elements)}")
+    
+    # Indexed store: all Done records in Travel publishing in the first week of August
+    store = PromptRecordStore.from_dataframe(pd.DataFrame([sample_data]))
+    matches = store.query(status='Done', category='Travel',
+                          publish_from=date(2025, 8, 4), publish_to=date(2025, 8, 10))
+    print(f"Store query matches: {[r.prompt_title for r in matches]}")
\ No newline at end of file
@@ -1,18 +1,21 @@
 import os
 
 from video_common import (
-    load_video_overlay_entries_from_excel, 
+    load_video_overlay_entries_filtered, 
     create_video_from_image_and_audio,
     resolve_path,
     VideoOverlayEntry,
     BASE_DIRECTORY
 )
+from config import PreviewSettings, preview_entry_point, preview_output_path
+from drive_staging import DriveStaging, is_drive_path
+from preflight import run_preflight, tracker_checks, tracker_entry_label
 
 
 # Define TimelessTales base directory
 BASE_DIRECTORY_TT = os.path.join(BASE_DIRECTORY, "TT")
 
-from typing import List
+from typing import List, Optional
 import logging
 
 # Configure logging
@@ -20,18 +23,19 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def load_tt_entries_from_excel(excel_path: str) -> List[VideoOverlayEntry]:
+def load_tt_entries_from_excel(excel_path: str, status_filter: Optional[str] = "todo") -> List[VideoOverlayEntry]:
     """
     Load video overlay entries from an Excel file and convert relative paths
     to absolute paths using BASE_DIRECTORY_TT as the base.
     
     Args:
         excel_path: Path to the Excel file
+        status_filter: Only load rows whose status matches (e.g. "todo"); None loads all rows
         
     Returns:
         List of VideoOverlayEntry objects with resolved paths
     """
-    entries = load_video_overlay_entries_from_excel(excel_path)
+    entries = load_video_overlay_entries_filtered(excel_path, status_filter=status_filter)
     resolved_entries = []
     
     for entry in entries:
@@ -51,44 +55,77 @@ def load_tt_entries_from_excel(excel_path: str) -> List[VideoOverlayEntry]:
     
     return resolved_entries
 
-def process_video_entries(csv_path: str, use_temp_dir: bool = False) -> List[str]:
-    """Process all video entries with the new combined function"""
+def _is_todo(entry: VideoOverlayEntry) -> bool:
+    return bool(entry.status) and "todo" in entry.status.lower().replace(" ", "")
+
+@preview_entry_point
+def process_video_entries(csv_path: str, use_temp_dir: bool = False, preview: Optional[PreviewSettings] = None,
+                          stage_drive: Optional[bool] = None, preflight: bool = True) -> List[str]:
+    """
+    Process all video entries with the new combined function.
+    With preview settings, fast drafts are written next to the outputs as "*_preview.mp4".
+    With stage_drive (default: when the TT directory is on the Colab Drive mount), inputs
+    are prefetched to local disk in the background, videos are rendered locally and
+    copied back to Drive while the next entry renders.
+    With preflight, the assets of all todo entries are validated together first and
+    entries with missing or broken assets are skipped.
+    """
+    if stage_drive is None:
+        stage_drive = is_drive_path(BASE_DIRECTORY_TT)
+    staging = DriveStaging(BASE_DIRECTORY_TT, enabled=stage_drive)
     try:
         entries = load_tt_entries_from_excel(csv_path)
         created_videos = []
 
+        blocked = set()
+        if preflight:
+            blocked = run_preflight(tracker_checks(entry for entry in entries if _is_todo(entry))).failed_owners()
+
+        # Start every Drive download at once; each entry waits only for its own files
+        staging.prefetch(
+            path for entry in entries if _is_todo(entry) and tracker_entry_label(entry) not in blocked
+            for path in (entry.image_path, entry.audio_path, entry.head_video_path, entry.tail_video_path)
+        )
+
         for entry in entries: 
             try:
                 # Skip non-todo entries
-                if not entry.status or not "todo" in entry.status.lower().replace(" ", ""):
+                if not _is_todo(entry):
                     logger.info(f"Skipping entry with status '{entry.status}': {entry.image_path}")
                     continue
+                if tracker_entry_label(entry) in blocked:
+                    logger.error(f"Skipping entry that failed the preflight: {entry.image_path}")
+                    continue
                 
                 logger.info(f"Processing entry: {os.path.basename(entry.image_path)}")
+                image_path = staging.fetch(entry.image_path)
+                audio_path = staging.fetch(entry.audio_path)
                 
                 # Validate files exist
-                if not os.path.exists(entry.image_path):
+                if not os.path.exists(image_path):
                     logger.error(f"Image file not found: {entry.image_path}")
                     continue
                     
-                if not os.path.exists(entry.audio_path):
+                if not os.path.exists(audio_path):
                     logger.error(f"Audio file not found: {entry.audio_path}")
                     continue
                 
                 # 🚀 ONE-STEP PROCESS: Create complete video
                 logger.info("Creating complete video...")
+                output_path = preview_output_path(entry.output_video_path) if preview else entry.output_video_path
                 video_path = create_video_from_image_and_audio(
-                    image_path=entry.image_path,
+                    image_path=image_path,
                     text_overlays=entry.overlays,
-                    audio_path=entry.audio_path,
-                    output_path=entry.output_video_path if entry.output_video_path else None,
-                    output_dir=BASE_DIRECTORY_TT if not entry.output_video_path else None,
-                    head_video_path=entry.head_video_path or None,
-                    tail_video_path=entry.tail_video_path or None,
+                    audio_path=audio_path,
+                    output_path=staging.local_path(output_path) or None,
+                    output_dir=staging.local_path(BASE_DIRECTORY_TT) if not entry.output_video_path else None,
+                    head_video_path=staging.fetch(entry.head_video_path) or None,
+                    tail_video_path=staging.fetch(entry.tail_video_path) or None,
                     use_temp_dir=use_temp_dir
                 )
                 
                 if video_path:
+                    video_path = staging.publish(video_path)
                     created_videos.append(video_path)
                     logger.info(f"✅ Successfully created video: {os.path.basename(video_path)}")
                 else:
@@ -100,6 +137,8 @@ def process_video_entries(csv_path: str, use_temp_dir: bool = False) -> List[str
                 traceback.print_exc()
                 continue
 
+        failed_publishes = staging.finish()
+        created_videos = [video for video in created_videos if video not in failed_publishes]
         logger.info(f"Completed processing. Created {len(created_videos)} videos out of {len(entries)} entries.")
         return created_videos
 
@@ -109,6 +148,9 @@ def process_video_entries(csv_path: str, use_temp_dir: bool = False) -> List[str
         traceback.print_exc()
         return []
 
+    finally:
+        staging.finish()
+
 if __name__ == "__main__":
     csv_path = os.path.join(BASE_DIRECTORY_TT, "TEST_TimelessTales_Video_Tracker.xlsx")
     created_videos = process_video_entries(csv_path)
@@ -0,0 +1,479 @@
+"""
+Reproducible benchmark suite for the video/image pipeline.
+
+All inputs are generated locally (FFmpeg test patterns, sine/noise audio and
+PIL-drawn portraits), so the suite runs anywhere without the Drive/Windows
+asset folders. The report is a JSON file with sorted keys, fixed case order
+and rounded timings, so two reports can be diffed between versions.
+
+Usage:
+    python benchmark.py --output benchmark_report.json --repeats 3
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import platform
+import statistics
+import subprocess
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from PIL import Image, ImageDraw
+
+from video_common import (
+    TextOverlay,
+    TextStyle,
+    create_video_from_image_and_audio,
+    CreateVideoFile,
+    CreateAudioFile,
+    ConcatenateVideoFiles,
+    ConcatenateAudioFiles,
+    clear_text_table_cache
+)
+from image_common import create_image_with_text_overlays_static, fit_text_to_region
+from frame_pipeline import FrameOverlay, PipelineSegment, render_frame_pipeline
+from frame_ring import DEFAULT_SLOTS_PER_DECODER, render_frame_pipeline_shared
+
+REPORT_VERSION = 1
+
+# name -> (width, height) of the generated test-pattern videos
+VIDEO_FIXTURE_SIZES = {
+    "horizontal_1080p": (1920, 1080),
+    "vertical_1080p": (1080, 1920),
+    "horizontal_720p": (1280, 720),
+}
+VIDEO_FIXTURE_DURATION = 3.0
+VIDEO_FIXTURE_FPS = 24
+
+SAMPLE_TEXTS = [
+    "The brave knight stood tall against the stormy sky.",
+    "Chapter 1: The Beginning",
+    "Athena watched from Olympus as the heroes gathered on the shore, "
+    "their ships ready for the long voyage across the wine-dark sea.",
+]
+
+
+@dataclass
+class BenchmarkFixtures:
+    """Paths of the generated benchmark inputs."""
+    root: str
+    videos: Dict[str, str] = field(default_factory=dict)
+    voice_audio: str = ""
+    music_audio: str = ""
+    short_audio: str = ""
+    portraits: Dict[str, str] = field(default_factory=dict)
+    text_csv: str = ""
+
+
+@dataclass
+class BenchmarkCase:
+    """One timed benchmark: run() does the work, returns True on success."""
+    name: str
+    run: Callable[[], bool]
+    params: Dict[str, object] = field(default_factory=dict)
+    setup: Optional[Callable[[], None]] = None
+
+
+def _run_ffmpeg(args: List[str]) -> None:
+    """Run ffmpeg quietly with deterministic output (no encoder metadata), raising on failure."""
+    command = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error"] + args
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({' '.join(command)}): {result.stderr.strip()}")
+
+
+def _generate_test_pattern_video(output_path: str, size: Tuple[int, int], duration: float, fps: int) -> None:
+    width, height = size
+    _run_ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=330:sample_rate=44100:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "64k", "-shortest",
+        "-fflags", "+bitexact", "-map_metadata", "-1",
+        output_path
+    ])
+
+
+def _generate_sine_audio(output_path: str, duration: float, frequency: int) -> None:
+    _run_ffmpeg([
+        "-f", "lavfi", "-i", f"sine=frequency={frequency}:sample_rate=44100:duration={duration}",
+        "-c:a", "libmp3lame", "-b:a", "128k", "-fflags", "+bitexact", "-map_metadata", "-1",
+        output_path
+    ])
+
+
+def _generate_noise_audio(output_path: str, duration: float) -> None:
+    _run_ffmpeg([
+        "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.2:seed=42:sample_rate=44100:duration={duration}",
+        "-c:a", "libmp3lame", "-b:a", "128k", "-fflags", "+bitexact", "-map_metadata", "-1",
+        output_path
+    ])
+
+
+def _generate_portrait(output_path: str, size: Tuple[int, int]) -> None:
+    """Draw a deterministic 'portrait': gradient background with a head-and-shoulders silhouette on the right."""
+    width, height = size
+    image = Image.new("RGB", size)
+    draw = ImageDraw.Draw(image)
+    for y in range(height):
+        shade = int(40 + 120 * y / height)
+        draw.line([(0, y), (width, y)], fill=(shade // 2, shade // 3, shade))
+
+    center_x = int(width * 0.80)
+    head_radius = int(min(width, height) * 0.14)
+    head_top = int(height * 0.22)
+    draw.ellipse(
+        [center_x - head_radius, head_top, center_x + head_radius, head_top + 2 * head_radius],
+        fill=(214, 170, 140)
+    )
+    shoulders_top = head_top + 2 * head_radius + int(height * 0.03)
+    draw.ellipse(
+        [center_x - 2 * head_radius, shoulders_top, center_x + 2 * head_radius, shoulders_top + 4 * head_radius],
+        fill=(90, 30, 40)
+    )
+    image.save(output_path, "PNG")
+
+
+def generate_fixtures(root: str, force: bool = False) -> BenchmarkFixtures:
+    """
+    Generate the synthetic benchmark inputs under root (reused if already present).
+
+    Args:
+        root: Fixture directory
+        force: Regenerate every fixture even if it exists
+
+    Returns:
+        BenchmarkFixtures: Paths of the generated files
+    """
+    os.makedirs(root, exist_ok=True)
+    fixtures = BenchmarkFixtures(root=root)
+
+    def needs(path: str) -> bool:
+        return force or not os.path.exists(path)
+
+    for name, size in VIDEO_FIXTURE_SIZES.items():
+        path = os.path.join(root, f"testsrc_{name}.mp4")
+        if needs(path):
+            print(f"🎞️ Generating test pattern video {name} {size[0]}x{size[1]}")
+            _generate_test_pattern_video(path, size, VIDEO_FIXTURE_DURATION, VIDEO_FIXTURE_FPS)
+        fixtures.videos[name] = path
+
+    fixtures.voice_audio = os.path.join(root, "voice_sine_6s.mp3")
+    if needs(fixtures.voice_audio):
+        _generate_sine_audio(fixtures.voice_audio, 6.0, 440)
+    fixtures.short_audio = os.path.join(root, "tail_sine_2s.mp3")
+    if needs(fixtures.short_audio):
+        _generate_sine_audio(fixtures.short_audio, 2.0, 660)
+    fixtures.music_audio = os.path.join(root, "music_noise_8s.mp3")
+    if needs(fixtures.music_audio):
+        _generate_noise_audio(fixtures.music_audio, 8.0)
+
+    for name, size in {"landscape": (1920, 1080), "square": (1024, 1024)}.items():
+        path = os.path.join(root, f"portrait_{name}.png")
+        if needs(path):
+            print(f"🖼️ Generating portrait {name} {size[0]}x{size[1]}")
+            _generate_portrait(path, size)
+        fixtures.portraits[name] = path
+
+    fixtures.text_csv = os.path.join(root, "texts.csv")
+    if needs(fixtures.text_csv):
+        pd.DataFrame({"english_text": SAMPLE_TEXTS}).to_csv(fixtures.text_csv, index=False)
+
+    return fixtures
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _sample_overlays() -> List[TextOverlay]:
+    return [
+        TextOverlay(
+            text=SAMPLE_TEXTS[0],
+            horizontal_offset=50,
+            vertical_offset=70,
+            style=TextStyle(font_size=60, text_color="#FFD700", stroke_color="black", stroke_width=2)
+        ),
+        TextOverlay(
+            text=SAMPLE_TEXTS[1],
+            horizontal_offset=50,
+            vertical_offset=30,
+            style=TextStyle(font_size=40, text_color="white", stroke_color="navy", stroke_width=3)
+        )
+    ]
+
+
+def _pipeline_segments(fixtures: BenchmarkFixtures) -> List[PipelineSegment]:
+    """Mixed-orientation timeline (stretch, crop and letterbox paths) with a caption overlay on every clip."""
+    caption = Image.new("RGBA", (1200, 140), (0, 0, 0, 0))
+    ImageDraw.Draw(caption).rounded_rectangle([0, 0, 1199, 139], radius=24, fill=(0, 0, 0, 160))
+    overlay = FrameOverlay.from_image(caption, x=360, y=880)
+    return [
+        PipelineSegment(fixtures.videos[name], duration=2.0, overlays=[overlay])
+        for name in ("horizontal_1080p", "vertical_1080p", "horizontal_720p")
+    ]
+
+
+def build_cases(fixtures: BenchmarkFixtures, output_dir: str) -> List[BenchmarkCase]:
+    """Build the benchmark cases (fixed order) writing their outputs to output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    overlays = _sample_overlays()
+    cases: List[BenchmarkCase] = []
+
+    def output(name: str) -> str:
+        return os.path.join(output_dir, name)
+
+    def exists(path: str) -> bool:
+        return os.path.exists(path) and os.path.getsize(path) > 0
+
+    for portrait_name, portrait_path in sorted(fixtures.portraits.items()):
+        cases.append(BenchmarkCase(
+            name=f"create_image_with_text_overlays_static/{portrait_name}",
+            run=lambda path=portrait_path: bool(create_image_with_text_overlays_static(path, overlays, output_dir=output_dir)),
+            params={"overlays": len(overlays)}
+        ))
+
+    for index, text in enumerate(SAMPLE_TEXTS):
+        cases.append(BenchmarkCase(
+            name=f"fit_text_to_region/text{index}",
+            run=lambda text=text: fit_text_to_region(text, 700, 400)[0] != "",
+            params={"chars": len(text), "region": "700x400"}
+        ))
+
+    cases.append(BenchmarkCase(
+        name="CreateAudioFile/voice_over_music",
+        run=lambda: (CreateAudioFile(
+            output_file=output("create_audio.mp3"),
+            music_overlay_path=fixtures.music_audio,
+            text_audio_overlay_path=fixtures.voice_audio,
+            time_of_music_before_voice=0.2,
+            time_of_music_after_voice=1.5
+        ), exists(output("create_audio.mp3")))[1],
+        setup=lambda: _remove(output("create_audio.mp3"))
+    ))
+
+    cases.append(BenchmarkCase(
+        name="ConcatenateAudioFiles/two_clips",
+        run=lambda: ConcatenateAudioFiles(
+            [fixtures.voice_audio, fixtures.short_audio], output("concat_audio.mp3"), silence_between=0.5
+        ),
+        params={"silence_between": 0.5}
+    ))
+
+    for video_name in sorted(VIDEO_FIXTURE_SIZES):
+        width, height = VIDEO_FIXTURE_SIZES[video_name]
+        resize_dim = "width" if width >= height else "height"
+        video_output = output(f"create_video_{video_name}.mp4")
+        cases.append(BenchmarkCase(
+            name=f"CreateVideoFile/{video_name}",
+            run=lambda video_output=video_output, size=(width, height), resize_dim=resize_dim, video_name=video_name: (CreateVideoFile(
+                output_file=video_output,
+                size=size,
+                resize_dim=resize_dim,
+                audio_path=fixtures.voice_audio,
+                csv_path=fixtures.text_csv,
+                text_column="english_text",
+                video_paths=[fixtures.videos[video_name]] * 2,
+                use_audio_duration=True
+            ), exists(video_output))[1],
+            params={"size": f"{width}x{height}", "clips": 2},
+            setup=lambda video_output=video_output: (_remove(video_output), clear_text_table_cache())
+        ))
+
+    cases.append(BenchmarkCase(
+        name="ConcatenateVideoFiles/horizontal_1080p_x2",
+        run=lambda: ConcatenateVideoFiles(
+            [fixtures.videos["horizontal_1080p"]] * 2, output("concat_video.mp4")
+        ),
+        params={"clips": 2}
+    ))
+
+    # queue_depth=2 keeps every stage blocked on its neighbours (back-pressure, in-order buffer claims)
+    for queue_depth in (8, 2):
+        pipeline_output = output(f"frame_pipeline_q{queue_depth}.mp4")
+        cases.append(BenchmarkCase(
+            name=f"render_frame_pipeline/mixed_x3_q{queue_depth}",
+            run=lambda pipeline_output=pipeline_output, queue_depth=queue_depth: render_frame_pipeline(
+                _pipeline_segments(fixtures), pipeline_output, (1920, 1080),
+                fps=VIDEO_FIXTURE_FPS, audio_path=fixtures.voice_audio, queue_depth=queue_depth
+            ),
+            params={"size": "1920x1080", "clips": 3, "queue_depth": queue_depth},
+            setup=lambda pipeline_output=pipeline_output: _remove(pipeline_output)
+        ))
+
+    # Same timeline through the shared-memory ring; slots=1 makes every decoder wait for its slot to be released
+    for slots in (DEFAULT_SLOTS_PER_DECODER, 1):
+        shared_output = output(f"frame_pipeline_shared_s{slots}.mp4")
+        cases.append(BenchmarkCase(
+            name=f"render_frame_pipeline_shared/mixed_x3_s{slots}",
+            run=lambda shared_output=shared_output, slots=slots: render_frame_pipeline_shared(
+                _pipeline_segments(fixtures), shared_output, (1920, 1080),
+                fps=VIDEO_FIXTURE_FPS, audio_path=fixtures.voice_audio, slots_per_decoder=slots
+            ),
+            params={"size": "1920x1080", "clips": 3, "slots_per_decoder": slots},
+            setup=lambda shared_output=shared_output: _remove(shared_output)
+        ))
+
+    cases.append(BenchmarkCase(
+        name="create_video_from_image_and_audio/landscape",
+        run=lambda: bool(create_video_from_image_and_audio(
+            image_path=fixtures.portraits["landscape"],
+            text_overlays=overlays,
+            audio_path=fixtures.short_audio,
+            output_path=output("image_audio_landscape.mp4"),
+            output_dir=output_dir
+        )),
+        params={"size": "1920x1080", "head_tail": False}
+    ))
+
+    return cases
+
+
+def _remove(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def run_case(case: BenchmarkCase, repeats: int, warmup: bool) -> Dict[str, object]:
+    """Time one case and return its report entry (a case that raises is reported as failed)."""
+    if repeats < 1:
+        raise ValueError(f"repeats must be at least 1, got {repeats}")
+
+    ok = True
+    if warmup:
+        try:
+            if case.setup:
+                case.setup()
+            ok = bool(case.run())
+        except Exception as e:
+            print(f"❌ {case.name} raised during warm-up: {e}")
+            ok = False
+
+    timings = []
+    for _ in range(repeats):
+        try:
+            if case.setup:
+                case.setup()
+        except Exception as e:
+            print(f"❌ {case.name} setup raised: {e}")
+            ok = False
+        start = time.perf_counter()
+        try:
+            ok = bool(case.run()) and ok
+        except Exception as e:
+            print(f"❌ {case.name} raised: {e}")
+            ok = False
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "ok": ok,
+        "params": case.params,
+        "repeats": repeats,
+        "min_s": round(min(timings), 3),
+        "median_s": round(statistics.median(timings), 3),
+        "max_s": round(max(timings), 3),
+    }
+
+
+def _environment() -> Dict[str, str]:
+    versions = {"python": platform.python_version(), "platform": platform.platform(terse=True)}
+    for module_name in ("moviepy", "PIL", "numpy", "pandas"):
+        module = sys.modules.get(module_name)
+        versions[module_name] = getattr(module, "__version__", "unknown") if module else "not loaded"
+    try:
+        first_line = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout.splitlines()[0]
+        versions["ffmpeg"] = first_line.split(" Copyright")[0]
+    except Exception:
+        versions["ffmpeg"] = "unknown"
+    return versions
+
+
+def run_benchmarks(
+    fixture_dir: str = "benchmark_fixtures",
+    output_dir: str = "benchmark_output",
+    report_path: str = "benchmark_report.json",
+    repeats: int = 3,
+    warmup: bool = True,
+    only: Optional[List[str]] = None,
+    keep_outputs: bool = False
+) -> Dict[str, object]:
+    """
+    Generate fixtures, run every benchmark case and write the JSON report.
+
+    Args:
+        fixture_dir: Where the synthetic inputs are generated (reused between runs)
+        output_dir: Where the rendered outputs go
+        report_path: JSON report path
+        repeats: Timed runs per case (min/median/max are reported)
+        warmup: Run each case once untimed first (font/codec/import warm-up)
+        only: Run only cases whose name starts with one of these prefixes
+        keep_outputs: Keep output_dir after the run
+
+    Returns:
+        dict: The report
+    """
+    if repeats < 1:
+        raise ValueError(f"repeats must be at least 1, got {repeats}")
+    fixtures = generate_fixtures(fixture_dir)
+    cases = build_cases(fixtures, output_dir)
+    if only:
+        cases = [case for case in cases if any(case.name.startswith(prefix) for prefix in only)]
+
+    results = {}
+    for case in cases:
+        print(f"\n⏱️ Benchmark: {case.name}")
+        results[case.name] = run_case(case, repeats, warmup)
+        print(f"   median {results[case.name]['median_s']:.3f}s (ok={results[case.name]['ok']})")
+
+    fixture_paths = list(fixtures.videos.values()) + list(fixtures.portraits.values()) + [
+        fixtures.voice_audio, fixtures.music_audio, fixtures.short_audio, fixtures.text_csv
+    ]
+    report = {
+        "report_version": REPORT_VERSION,
+        "environment": _environment(),
+        "fixtures": {os.path.basename(path): _file_digest(path) for path in fixture_paths},
+        "results": results,
+    }
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\n📄 Benchmark report written to: {report_path}")
+
+    if not keep_outputs:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the video pipeline benchmarks on synthetic media")
+    parser.add_argument("--fixtures", default="benchmark_fixtures", help="Fixture directory")
+    parser.add_argument("--output-dir", default="benchmark_output", help="Directory for rendered outputs")
+    parser.add_argument("--output", default="benchmark_report.json", help="JSON report path")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per case")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip the untimed warm-up run")
+    parser.add_argument("--only", nargs="*", help="Run only cases starting with these prefixes")
+    parser.add_argument("--keep-outputs", action="store_true", help="Keep rendered outputs")
+    args = parser.parse_args()
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+
+    run_benchmarks(
+        fixture_dir=args.fixtures,
+        output_dir=args.output_dir,
+        report_path=args.output,
+        repeats=args.repeats,
+        warmup=not args.no_warmup,
+        only=args.only,
+        keep_outputs=args.keep_outputs
+    )
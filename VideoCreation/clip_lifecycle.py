@@ -0,0 +1,314 @@
+"""
+Clip ownership and bounded ffmpeg reader pool.
+
+Every VideoFileClip holds an ffmpeg subprocess and decode buffers from the moment
+it is opened until close() is called. This module provides:
+
+- ClipScope: owns the clips a function opens and closes them all (in reverse
+  order) when the function ends, instead of hand-written close() chains.
+- ReaderPool / LazyVideoSource: source videos are only probed up front; their
+  ffmpeg reader is opened when the first frame of the segment is needed and
+  closed once playback has passed the segment (release_finished_readers) or
+  when the pool is full (least recently used first), so a render over ten
+  prompt videos keeps at most max_open_readers decoders alive.
+- live_clip_report / report_live_clips: debug report of tracked clips and ffmpeg
+  subprocesses still alive when a function returns.
+"""
+
+import time
+import weakref
+import threading
+import functools
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from moviepy.video.VideoClip import VideoClip
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from config import get_resource_budget
+from frame_source import FrameSource, open_frame_source
+
+try:
+    import psutil  # Optional: lists ffmpeg child processes in the live report
+except ImportError:
+    psutil = None
+
+
+# id(clip) -> (weak reference, label, opened_at)
+_live_clips: Dict[int, Tuple[weakref.ref, str, float]] = {}
+_live_clips_lock = threading.Lock()
+
+
+def track_clip(clip, label: str = ""):
+    """Register a clip in the live-clip registry (returns the clip)."""
+    if clip is None:
+        return clip
+    key = id(clip)
+
+    def forget(_ref, key=key):
+        with _live_clips_lock:
+            _live_clips.pop(key, None)
+
+    try:
+        ref = weakref.ref(clip, forget)
+    except TypeError:
+        return clip
+    with _live_clips_lock:
+        _live_clips[key] = (ref, label or type(clip).__name__, time.time())
+    return clip
+
+
+def untrack_clip(clip) -> None:
+    """Remove a clip from the live-clip registry (it was closed)."""
+    with _live_clips_lock:
+        _live_clips.pop(id(clip), None)
+
+
+def close_clip(clip, label: str = "") -> None:
+    """Close a clip (or reader/pool), logging instead of raising on errors."""
+    if clip is None:
+        return
+    try:
+        clip.close()
+    except Exception as e:
+        print(f"Warning: Error closing {label or type(clip).__name__}: {e}")
+    finally:
+        untrack_clip(clip)
+
+
+class ClipScope:
+    """
+    Owns clips opened by one function and closes them when the scope ends.
+
+    Example:
+        with ClipScope("CreateVideoFile") as scope:
+            audio = scope.own(AudioFileClip(path), "audio")
+            ...
+    """
+
+    def __init__(self, name: str = "scope"):
+        self.name = name
+        self._owned: List[Tuple[object, str]] = []
+
+    def own(self, clip, label: str = ""):
+        """Take ownership of a clip, reader or pool (anything with close()). Returns it."""
+        if clip is not None:
+            label = label or type(clip).__name__
+            self._owned.append((clip, label))
+            track_clip(clip, f"{self.name}:{label}")
+        return clip
+
+    def release(self, clip) -> None:
+        """Close an owned clip now instead of at the end of the scope."""
+        for index, (owned, label) in enumerate(self._owned):
+            if owned is clip:
+                del self._owned[index]
+                close_clip(owned, label)
+                return
+
+    def close(self) -> None:
+        """Close every owned clip, newest first."""
+        while self._owned:
+            clip, label = self._owned.pop()
+            close_clip(clip, label)
+
+    def __enter__(self) -> "ClipScope":
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> bool:
+        self.close()
+        return False
+
+
+def probe_video(path: str) -> dict:
+    """
+    Read a video's size, fps and duration without starting a decoder.
+
+    Returns:
+        dict: {"size": (w, h), "fps": float, "duration": float}
+    """
+    infos = ffmpeg_parse_infos(path)
+    width, height = infos["video_size"]
+    if infos.get("video_rotation", 0) in (90, 270, -90, -270):
+        width, height = height, width
+    duration = infos.get("video_duration") or infos.get("duration")
+    return {"size": (width, height), "fps": infos.get("video_fps") or 24, "duration": duration}
+
+
+class ReaderPool:
+    """
+    Bounded pool of video readers (frame sources) shared by the LazyVideoSource clips of one render.
+    Readers are opened on first use and the least recently used one is closed when
+    more than max_open readers would be alive.
+
+    Args:
+        max_open: Maximum readers open at once (default: the resource budget's max_open_readers)
+        backend: Frame source backend ("ffmpeg" or "opencv", see frame_source)
+    """
+
+    def __init__(self, max_open: Optional[int] = None, backend: str = "ffmpeg"):
+        self.max_open = max(1, max_open or get_resource_budget().max_open_readers)
+        self.backend = backend
+        self._readers: "OrderedDict[str, FrameSource]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.opened_count = 0
+
+    def _acquire(self, path: str) -> FrameSource:
+        reader = self._readers.get(path)
+        if reader is not None:
+            self._readers.move_to_end(path)
+            return reader
+        while len(self._readers) >= self.max_open:
+            _, oldest = self._readers.popitem(last=False)
+            close_clip(oldest, "reader")
+        reader = track_clip(open_frame_source(path, self.backend), f"reader:{path}")
+        self._readers[path] = reader
+        self.opened_count += 1
+        return reader
+
+    def get_frame(self, path: str, t: float):
+        """Decode the frame of `path` at time t (opening its reader if needed)."""
+        with self._lock:
+            return self._acquire(path).get_frame(t)
+
+    def release(self, path: str) -> None:
+        """Close the reader of `path` if it is open."""
+        with self._lock:
+            reader = self._readers.pop(path, None)
+        close_clip(reader, "reader")
+
+    def open_paths(self) -> List[str]:
+        with self._lock:
+            return list(self._readers)
+
+    def close(self) -> None:
+        """Close all open readers."""
+        with self._lock:
+            readers = list(self._readers.values())
+            self._readers.clear()
+        for reader in readers:
+            close_clip(reader, "reader")
+
+
+class LazyVideoSource(VideoClip):
+    """
+    Video clip (no audio) whose decoder is opened lazily through a ReaderPool.
+    Size, fps and duration come from probing the file, so building resize/crop/
+    text layers on top of it does not start ffmpeg.
+
+    Args:
+        path: Video file path
+        pool: ReaderPool providing the decoder
+    """
+
+    def __init__(self, path: str, pool: ReaderPool):
+        info = probe_video(path)
+        super().__init__(duration=info["duration"])
+        self.filename = path
+        self.pool = pool
+        self.size = info["size"]
+        self.fps = info["fps"]
+        self.frame_function = lambda t: pool.get_frame(path, t)
+
+    def close(self) -> None:
+        """Release this source's reader (it is reopened if a frame is needed again)."""
+        self.pool.release(self.filename)
+
+
+def release_finished_readers(clip: VideoClip, segments: List[Tuple[float, str]], pool: ReaderPool) -> VideoClip:
+    """
+    Make a concatenated clip release each source's pooled reader as soon as playback
+    passes the end of the last segment that uses it (the clip is changed in place).
+
+    Args:
+        clip: Concatenation of LazyVideoSource-based segments
+        segments: (end time in `clip`, source path) of every segment
+        pool: ReaderPool of the sources
+
+    Returns:
+        The same clip, for chaining
+    """
+    last_end: Dict[str, float] = {}
+    for end, path in segments:
+        last_end[path] = max(last_end.get(path, 0.0), end)
+    pending = sorted((end, path) for path, end in last_end.items())
+    frame_function = clip.frame_function
+
+    def frame_function_releasing(t):
+        frame = frame_function(t)
+        while pending and t >= pending[0][0]:
+            pool.release(pending.pop(0)[1])
+        return frame
+
+    clip.frame_function = frame_function_releasing
+    return clip
+
+
+def _ffmpeg_children() -> Dict[int, str]:
+    """pid -> command line of ffmpeg processes started by this process (needs psutil)."""
+    if psutil is None:
+        return {}
+    try:
+        children = psutil.Process().children(recursive=True)
+    except psutil.Error:
+        return {}
+    result = {}
+    for child in children:
+        try:
+            if "ffmpeg" in child.name().lower():
+                result[child.pid] = " ".join(child.cmdline())[:160]
+        except psutil.Error:
+            continue
+    return result
+
+
+def live_clip_report(print_report: bool = True) -> dict:
+    """
+    List tracked clips/readers that were never closed and ffmpeg subprocesses still running.
+
+    Returns:
+        dict: {"clips": [{"label", "type", "age_s"}, ...], "ffmpeg_processes": {pid: cmdline}}
+    """
+    now = time.time()
+    with _live_clips_lock:
+        entries = list(_live_clips.values())
+    clips = []
+    for ref, label, opened_at in entries:
+        clip = ref()
+        if clip is not None:
+            clips.append({"label": label, "type": type(clip).__name__, "age_s": round(now - opened_at, 1)})
+    report = {"clips": clips, "ffmpeg_processes": _ffmpeg_children()}
+
+    if print_report:
+        print(f"🔎 Live clips: {len(clips)}, ffmpeg subprocesses: {len(report['ffmpeg_processes'])}")
+        for entry in clips:
+            print(f"   - {entry['label']} ({entry['type']}, open {entry['age_s']}s)")
+        for pid, cmdline in report["ffmpeg_processes"].items():
+            print(f"   - ffmpeg pid {pid}: {cmdline}")
+    return report
+
+
+def report_live_clips(func):
+    """
+    Decorator: after the function returns, report clips it registered and ffmpeg
+    subprocesses it started that are still alive (prints nothing when clean).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _live_clips_lock:
+            clips_before = set(_live_clips)
+        processes_before = set(_ffmpeg_children())
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with _live_clips_lock:
+                leaked = [(ref(), label) for key, (ref, label, _) in _live_clips.items()
+                          if key not in clips_before and ref() is not None]
+            processes = {pid: cmd for pid, cmd in _ffmpeg_children().items() if pid not in processes_before}
+            if leaked or processes:
+                print(f"⚠️ {func.__name__} left {len(leaked)} clips and {len(processes)} ffmpeg processes alive:")
+                for clip, label in leaked:
+                    print(f"   - {label} ({type(clip).__name__})")
+                for pid, cmdline in processes.items():
+                    print(f"   - ffmpeg pid {pid}: {cmdline}")
+    return wrapper
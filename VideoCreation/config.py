@@ -1,19 +1,322 @@
 import os
+import copy
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Dict, Any, List
+from types import MappingProxyType
+from typing import Dict, Any, List, Callable, Optional, Tuple, Union
+
+try:
+    import psutil  # Optional: enables the RAM ceiling
+except ImportError:
+    psutil = None
+
+
+class ProcessLimiter:
+    """ffmpeg process slots shared by a ResourceBudget and its resized copies"""
+    
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.active_processes = 0
+        self.held = threading.local()  # Per-thread re-entrancy depth
+
+
+@dataclass
+class ResourceBudget:
+    """
+    Machine-wide resource limits honored by every renderer in this process.
+    
+    Args:
+        cpu_threads: Total CPU threads available to encoders
+        max_ffmpeg_processes: Maximum concurrent ffmpeg processes (readers + writers)
+        max_open_readers: Source video readers one render keeps open at once (see clip_lifecycle.ReaderPool)
+        max_parallel_renders: Number of renders expected to run at once (encoder threads are split between them)
+        ram_ceiling_mb: Hold new renders while this process tree uses more RAM (0 = no limit, needs psutil)
+        scratch_quota_mb: Default size cap for per-job scratch directories (0 = no limit);
+            new scratch paths are refused over it, a peak over it is only reported
+        scratch_root: Where per-job scratch directories are created (None = system temp dir)
+        scratch_on_ram_disk: Prefer a tmpfs/RAM disk (/dev/shm) for scratch directories
+    """
+    cpu_threads: int = field(default_factory=lambda: os.cpu_count() or 4)
+    max_ffmpeg_processes: int = 8
+    max_open_readers: int = 2
+    max_parallel_renders: int = 1
+    ram_ceiling_mb: int = 0
+    scratch_quota_mb: int = 0
+    scratch_root: str = None
+    scratch_on_ram_disk: bool = False
+    
+    _limiter: ProcessLimiter = field(default_factory=ProcessLimiter, init=False, repr=False, compare=False)
+    
+    @property
+    def encoder_threads(self) -> int:
+        """Encoder threads for one render, so parallel renders together use cpu_threads"""
+        return max(1, self.cpu_threads // max(1, self.max_parallel_renders))
+    
+    def with_parallel_renders(self, renders: int) -> "ResourceBudget":
+        """
+        This budget sized for `renders` concurrent renders (a copy if that changes encoder_threads).
+        The copy shares this budget's process slots, so renders holding slots on either one
+        count against the same max_ffmpeg_processes.
+        """
+        if renders == self.max_parallel_renders:
+            return self
+        sized = replace(self, max_parallel_renders=renders)
+        sized._limiter = self._limiter
+        return sized
+    
+    def memory_used_mb(self) -> float:
+        """RSS of this process and its children (ffmpeg) in MB, or 0 if psutil is unavailable"""
+        if psutil is None:
+            return 0.0
+        try:
+            process = psutil.Process()
+            total = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total / (1024 * 1024)
+        except psutil.Error:
+            return 0.0
+    
+    def _memory_allows_new_render(self) -> bool:
+        # Never block a lone render: it could not free memory by waiting
+        if self.ram_ceiling_mb <= 0 or self._limiter.active_processes == 0:
+            return True
+        return self.memory_used_mb() < self.ram_ceiling_mb
+    
+    @contextmanager
+    def ffmpeg_processes(self, count: int = 1):
+        """
+        Reserve slots for `count` ffmpeg processes for the duration of a render.
+        Blocks while the process limit or the RAM ceiling is reached. Re-entrant per thread.
+        """
+        limiter = self._limiter
+        if getattr(limiter.held, "depth", 0):
+            limiter.held.depth += 1
+            try:
+                yield
+            finally:
+                limiter.held.depth -= 1
+            return
+        
+        count = max(1, min(count, self.max_ffmpeg_processes))
+        with limiter.condition:
+            while (limiter.active_processes + count > self.max_ffmpeg_processes
+                   or not self._memory_allows_new_render()):
+                limiter.condition.wait(timeout=1.0)  # Re-check memory periodically
+            limiter.active_processes += count
+        limiter.held.depth = 1
+        try:
+            yield
+        finally:
+            limiter.held.depth = 0
+            with limiter.condition:
+                limiter.active_processes -= count
+                limiter.condition.notify_all()
+
+
+_active_resource_budget = ResourceBudget()
+
+
+def get_resource_budget() -> ResourceBudget:
+    """Get the resource budget currently used by all render functions"""
+    return _active_resource_budget
+
+
+def set_resource_budget(budget: ResourceBudget) -> ResourceBudget:
+    """Install a resource budget for all render functions in this process"""
+    global _active_resource_budget
+    _active_resource_budget = budget
+    return budget
+
+
+@contextmanager
+def using_resource_budget(budget: ResourceBudget):
+    """Install a resource budget for the duration of a with-block, then restore the previous one"""
+    previous = get_resource_budget()
+    set_resource_budget(budget)
+    try:
+        yield budget
+    finally:
+        set_resource_budget(previous)
+
+
+def budgeted_render(processes: Union[int, Callable[[Dict[str, Any]], int]] = 2):
+    """
+    Decorator: run a render function inside the active budget's ffmpeg process limit.
+    
+    Args:
+        processes: Number of ffmpeg processes the render starts, or a function of
+            its bound arguments (dict) that estimates it
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if callable(processes):
+                bound = signature.bind_partial(*args, **kwargs)
+                bound.apply_defaults()
+                count = processes(bound.arguments)
+            else:
+                count = processes
+            with get_resource_budget().ffmpeg_processes(count):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@dataclass(frozen=True)
+class PreviewSettings:
+    """
+    Draft render settings for fast review cycles (text placement and timing checks).
+    
+    Args:
+        scale: Output size factor (0.5 renders 1920x1080 as 960x540)
+        fps: Maximum output frame rate
+        preset: x264 preset for every encode
+        crf: x264 quality (higher = smaller/faster); replaces bitrate limits
+        max_duration: Only render the first N seconds (0 = whole timeline)
+        boundary_window: Only render this many seconds on each side of the
+            head/tail boundaries (0 = whole timeline)
+    """
+    scale: float = 0.5
+    fps: int = 12
+    preset: str = "ultrafast"
+    crf: int = 30
+    max_duration: float = 0
+    boundary_window: float = 0
+    
+    def scaled_size(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """Scale a (width, height) size, keeping both sides even for yuv420p"""
+        return tuple(max(2, int(round(side * self.scale / 2)) * 2) for side in size)
+
+
+@dataclass(frozen=True)
+class IntermediateFormat:
+    """
+    Container and codecs for pipeline-internal artifacts (intro videos, main+tail videos,
+    intro/tail/with-tail audio) that the next step decodes again. Only the final video
+    gets the delivery encode.
+    
+    Args:
+        name: Key in INTERMEDIATE_FORMATS
+        video_extension: Container of intermediate videos (".mkv" needs no faststart rewrite)
+        audio_extension: Container of intermediate audio (".wav" = PCM, no encode/decode cost)
+        video_codec: ffmpeg video encoder
+        video_params: Extra ffmpeg output options of the video encoder
+        audio_codec: ffmpeg audio encoder of the video's sound track
+        pix_fmt: Pixel format of intermediate videos
+    """
+    name: str
+    video_extension: str = ".mkv"
+    audio_extension: str = ".wav"
+    video_codec: str = "ffv1"
+    video_params: Tuple[str, ...] = ()
+    audio_codec: str = "pcm_s16le"
+    pix_fmt: str = "yuv420p"
+    
+    @property
+    def is_delivery(self) -> bool:
+        """True for the "delivery" format (intermediates encoded like final videos, the previous behavior)"""
+        return self.name == "delivery"
+    
+    def video_path(self, path: str) -> str:
+        return os.path.splitext(path)[0] + self.video_extension
+    
+    def audio_path(self, path: str) -> str:
+        return os.path.splitext(path)[0] + self.audio_extension
+
+
+INTERMEDIATE_FORMATS = {
+    # MP4 (lossy x264, +faststart) and MP3 like the delivered videos
+    "delivery": IntermediateFormat("delivery", ".mp4", ".mp3", "libx264", (), "aac"),
+    # Lossless intra-only FFV1 + PCM in MKV: no generation loss, every frame a keyframe
+    "lossless": IntermediateFormat("lossless", video_codec="ffv1", video_params=("-level", "3", "-g", "1")),
+    # Lossless x264 (qp 0) + PCM: fastest lossless encode, smaller than FFV1, inter-coded
+    "x264_lossless": IntermediateFormat("x264_lossless", video_codec="libx264", video_params=("-preset", "ultrafast", "-qp", "0")),
+    # Intra-only MJPEG (visually lossless) + PCM: cheapest encode and decode
+    "intra": IntermediateFormat("intra", video_codec="mjpeg", video_params=("-q:v", "2"), pix_fmt="yuvj420p")
+}
+
+
+def get_intermediate_format(name: Union[str, IntermediateFormat, None]) -> IntermediateFormat:
+    """Look up an intermediate format by name (None = "delivery")"""
+    if isinstance(name, IntermediateFormat):
+        return name
+    name = name or "delivery"
+    if name not in INTERMEDIATE_FORMATS:
+        raise ValueError(f"Unknown intermediate format '{name}', expected one of {list(INTERMEDIATE_FORMATS)}")
+    return INTERMEDIATE_FORMATS[name]
+
+
+PREVIEW_SUFFIX = "_preview"
+
+_active_preview: contextvars.ContextVar = contextvars.ContextVar("active_preview", default=None)
+
+
+def get_preview_settings() -> Optional[PreviewSettings]:
+    """Preview settings of the render running in this thread/context, or None for a full render"""
+    return _active_preview.get()
+
+
+@contextmanager
+def preview_render(settings: Optional[PreviewSettings]):
+    """Render everything inside the block in preview mode (no-op when settings is None)"""
+    if settings is None:
+        yield None
+        return
+    token = _active_preview.set(settings)
+    try:
+        yield settings
+    finally:
+        _active_preview.reset(token)
+
+
+def preview_output_path(path: str) -> str:
+    """Output path for a preview render ("final.mp4" -> "final_preview.mp4"), so previews never overwrite full renders"""
+    if not path:
+        return path
+    stem, ext = os.path.splitext(path)
+    return path if stem.endswith(PREVIEW_SUFFIX) else f"{stem}{PREVIEW_SUFFIX}{ext}"
+
+
+def preview_entry_point(func):
+    """
+    Decorator for workflow entry points with a `preview: Optional[PreviewSettings]` argument:
+    runs the call in preview mode when a PreviewSettings is passed.
+    """
+    signature = inspect.signature(func)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind_partial(*args, **kwargs)
+        with preview_render(bound.arguments.get("preview")):
+            return func(*args, **kwargs)
+    return wrapper
 
 class VideoConfig:
     """Base configuration management for video creation workflows"""
     
-    def __init__(self, base_path: str = None, environment: str = "local"):
+    _frozen = False
+    
+    def __init__(self, base_path: str = None, environment: str = "local", resource_budget: ResourceBudget = None):
         """
         Initialize base configuration
         
         Args:
             base_path: Base directory path (auto-detected if None)
             environment: "local" or "colab"
+            resource_budget: Resource limits for renders (defaults to the active process-wide budget)
         """
         self.environment = environment
+        self.resource_budget = resource_budget or get_resource_budget()
         self._setup_base_paths(base_path)
     
     def _setup_base_paths(self, base_path: str = None):
@@ -28,6 +331,24 @@ class VideoConfig:
         # Ensure base directory exists
         os.makedirs(self.BASE_DIRECTORY, exist_ok=True)
     
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"{type(self).__name__} is frozen and cannot be modified (tried to set '{name}')")
+        super().__setattr__(name, value)
+    
+    def freeze(self):
+        """Make this configuration read-only so it can be shared safely between workers"""
+        object.__setattr__(self, "_frozen", True)
+        return self
+    
+    @property
+    def is_frozen(self) -> bool:
+        return self._frozen
+    
+    def apply_resource_budget(self) -> ResourceBudget:
+        """Make this config's resource budget the one every render function reads"""
+        return set_resource_budget(self.resource_budget)
+    
     def get_required_directories(self) -> list:
         """Get list of all required directories for validation - to be overridden by subclasses"""
         return [self.BASE_DIRECTORY]
@@ -59,7 +380,8 @@ class VideoConfig:
 class VideoConfigGreece(VideoConfig):
     """Greece-specific video configuration management"""
     
-    def __init__(self, current_project_dir: str, base_path: str = None, environment: str = "local"):
+    def __init__(self, current_project_dir: str, base_path: str = None, environment: str = "local", resource_budget: ResourceBudget = None,
+                 intermediate_format: Union[str, IntermediateFormat] = "delivery"):
         """
         Initialize Greece configuration
         
@@ -67,9 +389,12 @@ class VideoConfigGreece(VideoConfig):
             current_project_dir: Current Greece project directory name (e.g., "3_Hector")
             base_path: Base directory path (auto-detected if None)
             environment: "local" or "colab"
+            resource_budget: Resource limits for renders (defaults to the active process-wide budget)
+            intermediate_format: Format of the intro/tail/main+tail artifacts (see INTERMEDIATE_FORMATS)
         """
-        super().__init__(base_path, environment)
+        super().__init__(base_path, environment, resource_budget)
         self.current_project_dir = current_project_dir
+        self.intermediate_format = get_intermediate_format(intermediate_format)
         self._setup_greece_paths()
     
     def _setup_greece_paths(self):
@@ -79,27 +404,31 @@ class VideoConfigGreece(VideoConfig):
         self.BASE_DIRECTORY_GREECE_CURRENT = os.path.join(self.BASE_DIRECTORY_GREECE, self.current_project_dir)
         self.BASE_DIRECTORY_GREECE_COMMON_ARTIFACTS = os.path.join(self.BASE_DIRECTORY_GREECE, "Common_Artifacts")
         
+        # Pipeline-internal artifacts use the configured intermediate format
+        video = self.intermediate_format.video_path
+        audio = self.intermediate_format.audio_path
+        
         # Intro paths
         self.INTRO_BASE = os.path.join(self.BASE_DIRECTORY_GREECE_COMMON_ARTIFACTS, "Intro")
         self.intro_paths = {
-            "audio_en": os.path.join(self.INTRO_BASE, "Intro_Audio_Output_EN.mp3"),
-            "audio_ru": os.path.join(self.INTRO_BASE, "Intro_Audio_Output_RU.mp3"),
+            "audio_en": audio(os.path.join(self.INTRO_BASE, "Intro_Audio_Output_EN.mp3")),
+            "audio_ru": audio(os.path.join(self.INTRO_BASE, "Intro_Audio_Output_RU.mp3")),
             "music": os.path.join(self.INTRO_BASE, "Intro_Music.mp3"),
             "text_audio_en": os.path.join(self.INTRO_BASE, "Welcome_EN_TG.mp3"),
             "text_audio_ru": os.path.join(self.INTRO_BASE, "Welcome_RU_TG.mp3"),
             "text_overlay_csv": os.path.join(self.INTRO_BASE, "Intro_Text_Overlay_EN_RU.csv"),
             "video_paths": [os.path.join(self.INTRO_BASE, f"Intro_{i}.mp4") for i in range(1, 2)],
-            "output_en_horizontal": os.path.join(self.INTRO_BASE, "Intro_Output_horizontal_1920x1080_EN.mp4"),
-            "output_ru_horizontal": os.path.join(self.INTRO_BASE, "Intro_Output_horizontal_1920x1080_RU.mp4"),
-            "output_en_vertical": os.path.join(self.INTRO_BASE, "Intro_Output_vertical_1080x1920_EN.mp4"),
-            "output_ru_vertical": os.path.join(self.INTRO_BASE, "Intro_Output_vertical_1080x1920_RU.mp4")
+            "output_en_horizontal": video(os.path.join(self.INTRO_BASE, "Intro_Output_horizontal_1920x1080_EN.mp4")),
+            "output_ru_horizontal": video(os.path.join(self.INTRO_BASE, "Intro_Output_horizontal_1920x1080_RU.mp4")),
+            "output_en_vertical": video(os.path.join(self.INTRO_BASE, "Intro_Output_vertical_1080x1920_EN.mp4")),
+            "output_ru_vertical": video(os.path.join(self.INTRO_BASE, "Intro_Output_vertical_1080x1920_RU.mp4"))
         }
         
         # Tail paths
         self.TAIL_BASE = os.path.join(self.BASE_DIRECTORY_GREECE_COMMON_ARTIFACTS, "Tail")
         self.tail_paths = {
-            "audio_en": os.path.join(self.TAIL_BASE, "Tail_Audio_Output_EN.mp3"),
-            "audio_ru": os.path.join(self.TAIL_BASE, "Tail_Audio_Output_RU.mp3"),
+            "audio_en": audio(os.path.join(self.TAIL_BASE, "Tail_Audio_Output_EN.mp3")),
+            "audio_ru": audio(os.path.join(self.TAIL_BASE, "Tail_Audio_Output_RU.mp3")),
             "music": os.path.join(self.TAIL_BASE, "Tail_Music.mp3"),
             "text_audio_en": os.path.join(self.TAIL_BASE, "Tail_EN_TG.mp3"),
             "text_audio_ru": os.path.join(self.TAIL_BASE, "Tail_RU_TG.mp3"),
@@ -117,12 +446,12 @@ class VideoConfigGreece(VideoConfig):
             "audio_ru": os.path.join(self.current_artifacts, "Voice_Over_RU.mp3"),
             "audio_en": os.path.join(self.current_artifacts, "Voice_Over_EN.mp3"),
             "csv": os.path.join(self.current_artifacts, "Video_Texts.csv"),
-            "audio_with_tail_ru": os.path.join(self.current_result, "Voice_Over_RU_With_Tail.mp3"),
-            "audio_with_tail_en": os.path.join(self.current_result, "Voice_Over_EN_With_Tail.mp3"),
-            "main_plus_tail_en_h": os.path.join(self.current_result, "main_plus_tail_horizontal_1920x1080_EN.mp4"),
-            "main_plus_tail_ru_h": os.path.join(self.current_result, "main_plus_tail_horizontal_1920x1080_RU.mp4"),
-            "main_plus_tail_en_v": os.path.join(self.current_result, "main_plus_tail_vertical_1080x1920_EN.mp4"),
-            "main_plus_tail_ru_v": os.path.join(self.current_result, "main_plus_tail_vertical_1080x1920_RU.mp4"),
+            "audio_with_tail_ru": audio(os.path.join(self.current_result, "Voice_Over_RU_With_Tail.mp3")),
+            "audio_with_tail_en": audio(os.path.join(self.current_result, "Voice_Over_EN_With_Tail.mp3")),
+            "main_plus_tail_en_h": video(os.path.join(self.current_result, "main_plus_tail_horizontal_1920x1080_EN.mp4")),
+            "main_plus_tail_ru_h": video(os.path.join(self.current_result, "main_plus_tail_horizontal_1920x1080_RU.mp4")),
+            "main_plus_tail_en_v": video(os.path.join(self.current_result, "main_plus_tail_vertical_1080x1920_EN.mp4")),
+            "main_plus_tail_ru_v": video(os.path.join(self.current_result, "main_plus_tail_vertical_1080x1920_RU.mp4")),
             "final_en_h": os.path.join(self.current_final, "final_horizontal_1920x1080_EN.mp4"),
             "final_ru_h": os.path.join(self.current_final, "final_horizontal_1920x1080_RU.mp4"),
             "final_en_v": os.path.join(self.current_final, "final_vertical_1080x1920_EN.mp4"),
@@ -135,18 +464,62 @@ class VideoConfigGreece(VideoConfig):
         
         Args:
             new_project_dir: New project directory name (e.g., "4_Athena")
+            
+        Note:
+            This mutates shared state. For parallel work use with_project() instead.
         """
+        if self._frozen:
+            raise AttributeError("Frozen configuration: use with_project() to get a config for another project")
         print(f"🔄 Changing project directory from '{self.current_project_dir}' to '{new_project_dir}'")
         self.current_project_dir = new_project_dir
         self._setup_greece_paths()
         print(f"✅ Project directory updated successfully")
     
+    def with_project(self, project_dir: str) -> "VideoConfigGreece":
+        """
+        Get a new, frozen configuration for another project without touching this one.
+        Safe to call from several workers at once.
+        
+        Args:
+            project_dir: Project directory name (e.g., "4_Athena")
+        """
+        project_config = copy.copy(self)
+        object.__setattr__(project_config, "_frozen", False)
+        project_config.current_project_dir = project_dir
+        project_config._setup_greece_paths()
+        return project_config.freeze()
+    
+    def with_base_path(self, base_path: str) -> "VideoConfigGreece":
+        """
+        Get a new, frozen configuration with all paths under another base directory
+        (e.g. a local mirror of the Drive tree, see drive_staging).
+        
+        Args:
+            base_path: New base directory
+        """
+        rebased_config = copy.copy(self)
+        object.__setattr__(rebased_config, "_frozen", False)
+        rebased_config.BASE_DIRECTORY = base_path
+        rebased_config._setup_greece_paths()
+        return rebased_config.freeze()
+    
+    def freeze(self):
+        """Make this configuration (including its path tables) read-only"""
+        if not self._frozen:
+            for name in ("intro_paths", "tail_paths", "current_paths"):
+                frozen_paths = {
+                    key: tuple(value) if isinstance(value, list) else value
+                    for key, value in getattr(self, name).items()
+                }
+                object.__setattr__(self, name, MappingProxyType(frozen_paths))
+        return super().freeze()
+    
     def get_greece_paths_for_language_orientation(self, language: str, orientation: str) -> Dict[str, str]:
         """Get specific paths for Greece workflow based on language and orientation"""
         lang_suffix = language.upper()
         orient_suffix = "h" if orientation == "horizontal" else "v"
         
-        return {
+        paths = {
             "intro_audio": self.intro_paths[f"audio_{language.lower()}"],
             "intro_text_audio": self.intro_paths[f"text_audio_{language.lower()}"],
             "intro_video": self.intro_paths[f"output_{language.lower()}_{orientation}"],
@@ -158,6 +531,12 @@ class VideoConfigGreece(VideoConfig):
             "final_video": self.current_paths[f"final_{language.lower()}_{orient_suffix}"],
             "text_column": "english_text" if language.upper() == "EN" else "russian_text"
         }
+        
+        # Preview renders write their videos next to the full ones instead of overwriting them
+        if get_preview_settings() is not None:
+            for key in ("intro_video", "main_tail_video", "final_video"):
+                paths[key] = preview_output_path(paths[key])
+        return paths
     
     def get_video_paths_for_workflow(self, workflow_part: str) -> List[str]:
         """Get video paths for specific workflow parts to ensure proper list format"""
@@ -189,9 +568,9 @@ class VideoConfigGreece(VideoConfig):
 class VideoConfigTT(VideoConfig):
     """TimelessTales-specific video configuration management"""
     
-    def __init__(self, base_path: str = None, environment: str = "local"):
+    def __init__(self, base_path: str = None, environment: str = "local", resource_budget: ResourceBudget = None):
         """Initialize TT configuration - implementation to be added later"""
-        super().__init__(base_path, environment)
+        super().__init__(base_path, environment, resource_budget)
         self._setup_tt_paths()
     
     def _setup_tt_paths(self):
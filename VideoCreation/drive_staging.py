@@ -0,0 +1,285 @@
+"""
+Local-disk staging of Google Drive files for the Colab environment.
+
+On Colab BASE_DIRECTORY lives on the FUSE-mounted Google Drive, so every source
+read and every intermediate write used to go through the slow mount. A
+DriveStaging mirrors the Drive tree under a local directory:
+
+- prefetch(): inputs are copied to local disk in parallel in the background;
+  fetch()/wait_for() block only until the files a job needs have arrived
+- stage_config(): a VideoConfigGreece whose paths point at the local mirror, so
+  all reads and intermediate writes stay local (scratch files already are)
+- publish(): only the final outputs are copied back, in the background while the
+  next job renders, through a temporary file and an atomic rename, so Drive never
+  holds a half-copied video
+
+With enabled=False every method is a pass-through, so callers need no branches.
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from config import VideoConfigGreece, preview_output_path
+from render_verify import SIDECAR_SUFFIX
+
+DRIVE_MOUNT = "/content/drive"
+COLAB_LOCAL_ROOT = "/content/staging"
+DEFAULT_PREFETCH_WORKERS = 4   # Drive reads are latency bound, a few in flight hide it
+DEFAULT_PUBLISH_WORKERS = 2
+
+
+def is_drive_path(path: str) -> bool:
+    """True if the path is on the Colab Google Drive mount."""
+    return os.path.abspath(path).startswith(DRIVE_MOUNT + os.sep)
+
+
+def default_local_root() -> str:
+    """/content/staging on Colab, a directory in the system temp directory elsewhere."""
+    if os.path.isdir(os.path.dirname(COLAB_LOCAL_ROOT)):
+        return COLAB_LOCAL_ROOT
+    return os.path.join(tempfile.gettempdir(), "drive_staging")
+
+
+def _is_fresh_copy(source: str, copy: str) -> bool:
+    """True if `copy` already holds the current contents of `source` (same size, not older)."""
+    try:
+        source_stat = os.stat(source)
+        copy_stat = os.stat(copy)
+    except OSError:
+        return False
+    return copy_stat.st_size == source_stat.st_size and copy_stat.st_mtime >= source_stat.st_mtime
+
+
+def _atomic_copy(source: str, destination: str) -> int:
+    """Copy through a temporary file in the destination directory and rename it into place."""
+    directory = os.path.dirname(destination)
+    os.makedirs(directory, exist_ok=True)
+    partial = os.path.join(directory, f".{os.path.basename(destination)}.partial-{os.getpid()}-{threading.get_ident()}")
+    try:
+        shutil.copyfile(source, partial)
+        os.replace(partial, destination)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return os.path.getsize(destination)
+
+
+class DriveStaging:
+    """
+    Local mirror of a Drive directory for one batch (use as a context manager).
+
+    Args:
+        remote_root: Drive directory mirrored (usually the config's BASE_DIRECTORY)
+        local_root: Local directory holding the mirror (default: default_local_root())
+        prefetch_workers: Concurrent Drive -> local copies
+        publish_workers: Concurrent local -> Drive copies
+        enabled: False makes every method a pass-through on the Drive paths
+    """
+
+    def __init__(
+        self,
+        remote_root: str,
+        local_root: Optional[str] = None,
+        prefetch_workers: int = DEFAULT_PREFETCH_WORKERS,
+        publish_workers: int = DEFAULT_PUBLISH_WORKERS,
+        enabled: bool = True
+    ):
+        self.remote_root = os.path.abspath(remote_root)
+        self.local_root = os.path.abspath(local_root or default_local_root())
+        self.enabled = enabled
+        self._prefetch_workers = prefetch_workers
+        self._publish_workers = publish_workers
+        self._prefetch_executor: Optional[ThreadPoolExecutor] = None
+        self._publish_executor: Optional[ThreadPoolExecutor] = None
+        self._prefetches: Dict[str, Future] = {}   # local path -> copy job
+        self._publishes: Dict[str, Future] = {}    # remote path -> copy job
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def start(self) -> "DriveStaging":
+        if self.enabled and self._prefetch_executor is None:
+            os.makedirs(self.local_root, exist_ok=True)
+            self._prefetch_executor = ThreadPoolExecutor(self._prefetch_workers, thread_name_prefix="drive-prefetch")
+            self._publish_executor = ThreadPoolExecutor(self._publish_workers, thread_name_prefix="drive-publish")
+            self._started = time.perf_counter()
+            print(f"☁️ Staging {self.remote_root} -> {self.local_root}")
+        return self
+
+    def __enter__(self) -> "DriveStaging":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb) -> bool:
+        self.finish()
+        return False
+
+    # Path mapping
+
+    def local_path(self, path: str) -> str:
+        """Local mirror path of a Drive path (other paths are returned unchanged)."""
+        if not self.enabled or not path:
+            return path
+        absolute = os.path.abspath(path)
+        if absolute != self.remote_root and not absolute.startswith(self.remote_root + os.sep):
+            return path
+        return os.path.join(self.local_root, os.path.relpath(absolute, self.remote_root))
+
+    def remote_path(self, path: str) -> str:
+        """Drive path of a local mirror path (other paths are returned unchanged)."""
+        if not self.enabled or not path:
+            return path
+        absolute = os.path.abspath(path)
+        if absolute != self.local_root and not absolute.startswith(self.local_root + os.sep):
+            return path
+        return os.path.join(self.remote_root, os.path.relpath(absolute, self.local_root))
+
+    def stage_config(self, video_config: VideoConfigGreece) -> VideoConfigGreece:
+        """Frozen copy of a Greece config whose paths all point at the local mirror."""
+        if not self.enabled:
+            return video_config
+        staged = video_config.with_base_path(self.local_path(video_config.BASE_DIRECTORY))
+        staged.create_all_directories()
+        return staged
+
+    # Drive -> local
+
+    def _copy_in(self, remote: str, local: str) -> str:
+        if not _is_fresh_copy(remote, local):
+            size = _atomic_copy(remote, local)
+            with self._lock:
+                self.bytes_in += size
+        return local
+
+    def prefetch(self, paths: Iterable[str]) -> "DriveStaging":
+        """Start copying the existing files among `paths` (Drive paths) to local disk."""
+        if not self.enabled:
+            return self
+        self.start()
+        with self._lock:
+            for path in paths:
+                local = self.local_path(path)
+                if not path or local == path or local in self._prefetches or not os.path.isfile(path):
+                    continue
+                self._prefetches[local] = self._prefetch_executor.submit(self._copy_in, path, local)
+        return self
+
+    def wait_for(self, paths: Iterable[str]) -> None:
+        """Block until the prefetches of `paths` (Drive or local mirror paths) are done."""
+        if not self.enabled:
+            return
+        for path in paths:
+            with self._lock:
+                future = self._prefetches.get(self.local_path(path))
+            if future is None:
+                continue
+            try:
+                future.result()
+            except Exception as e:
+                print(f"⚠️ Could not stage {self.remote_path(path)}: {e}")
+
+    def fetch(self, path: str) -> str:
+        """Local copy of a Drive file (prefetched now if it was not already)."""
+        if not self.enabled or not path:
+            return path
+        self.prefetch([path])
+        self.wait_for([path])
+        local = self.local_path(path)
+        return local if os.path.exists(local) else path
+
+    # Local -> Drive
+
+    def _copy_out(self, local: str, remote: str) -> str:
+        started = time.perf_counter()
+        size = _atomic_copy(local, remote)
+        if os.path.exists(local + SIDECAR_SUFFIX):
+            _atomic_copy(local + SIDECAR_SUFFIX, remote + SIDECAR_SUFFIX)
+        with self._lock:
+            self.bytes_out += size
+        print(f"☁️ Published {os.path.basename(remote)} ({size / (1024 * 1024):.1f} MB in {time.perf_counter() - started:.1f}s)")
+        return remote
+
+    def publish(self, path: Optional[str]) -> Optional[str]:
+        """
+        Copy a finished local output back to its Drive path in the background.
+
+        Returns:
+            The Drive path (complete once finish() returns), or `path` unchanged if
+            it is not in the local mirror
+        """
+        if not self.enabled or not path:
+            return path
+        remote = self.remote_path(path)
+        if remote == path:
+            return path
+        self.start()
+        with self._lock:
+            self._publishes[remote] = self._publish_executor.submit(self._copy_out, path, remote)
+        return remote
+
+    def finish(self) -> Set[str]:
+        """
+        Wait for all copies and shut the workers down.
+
+        Returns:
+            Drive paths whose publish failed
+        """
+        if not self.enabled or self._prefetch_executor is None:
+            return set()
+        with self._lock:
+            publishes = dict(self._publishes)
+        wait(list(publishes.values()))
+        failed = set()
+        for remote, future in publishes.items():
+            if future.exception() is not None:
+                print(f"❌ Could not publish {remote}: {future.exception()}")
+                failed.add(remote)
+        self._prefetch_executor.shutdown(wait=True, cancel_futures=True)
+        self._publish_executor.shutdown(wait=True)
+        self._prefetch_executor = None
+        self._publish_executor = None
+        print(f"☁️ Drive staging: {self.bytes_in / (1024 * 1024):.1f} MB in, {self.bytes_out / (1024 * 1024):.1f} MB out "
+              f"({len(publishes) - len(failed)}/{len(publishes)} outputs published) in {time.perf_counter() - self._started:.1f}s")
+        return failed
+
+
+def greece_common_inputs(
+    video_config: VideoConfigGreece,
+    languages: Sequence[str],
+    orientations: Sequence[str],
+    include_artifacts: bool = True
+) -> List[str]:
+    """
+    Intro/tail sources of the Greece workflow, plus the built Common_Artifacts
+    (full and preview variants) when they are reused instead of rebuilt.
+    """
+    paths = []
+    for table in (video_config.intro_paths, video_config.tail_paths):
+        paths += [table["music"], table["text_overlay_csv"]] + list(table["video_paths"])
+        paths += [table[f"text_audio_{language.lower()}"] for language in languages]
+    if include_artifacts:
+        for language in languages:
+            paths += [video_config.intro_paths[f"audio_{language.lower()}"], video_config.tail_paths[f"audio_{language.lower()}"]]
+            for orientation in orientations:
+                intro_video = video_config.intro_paths[f"output_{language.lower()}_{orientation}"]
+                paths += [intro_video, preview_output_path(intro_video)]
+    return paths
+
+
+def greece_project_inputs(video_config: VideoConfigGreece, languages: Sequence[str]) -> List[str]:
+    """Source clips, voice-overs and text CSV of the config's current project."""
+    paths = list(video_config.current_paths["video_paths"]) + [video_config.current_paths["csv"]]
+    paths += [video_config.current_paths[f"audio_{language.lower()}"] for language in languages]
+    return paths
+
+
+def greece_common_outputs(video_config: VideoConfigGreece, languages: Sequence[str], orientations: Sequence[str]) -> List[str]:
+    """Common_Artifacts files built by steps 1-3 (full and preview variants) that exist."""
+    paths = greece_common_inputs(video_config, languages, orientations, include_artifacts=True)
+    sources = set(greece_common_inputs(video_config, languages, orientations, include_artifacts=False))
+    return [path for path in paths if path not in sources and os.path.exists(path)]
@@ -0,0 +1,430 @@
+"""
+Streaming frame pipeline: concurrent decode, transform and encode stages.
+
+MoviePy's write_videofile pulls every frame through nested clip closures on one
+thread, so decoding, resizing/compositing and encoding run in series. This engine
+runs them as concurrent stages joined by bounded queues:
+
+    decoders (one thread + ffmpeg process per source, at most max_open_readers alive)
+        -> sequencer (timeline order)
+        -> transform workers (resize/crop/letterbox + overlays, numpy/OpenCV release the GIL)
+        -> encoder (reorders by frame number, writes raw frames to ffmpeg stdin)
+
+All frame memory is preallocated: each decoder owns queue_depth source-size
+buffers and the transform stage owns queue_depth output-size buffers, which are
+recycled, so memory stays fixed however long the timeline is.
+"""
+
+import os
+import queue
+import threading
+import subprocess
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import budgeted_render, get_preview_settings, get_resource_budget
+from render_metrics import instrumented, metric_span
+from render_verify import verified_output, expect_output
+from video_common import probe_media
+
+DEFAULT_QUEUE_DEPTH = 8
+
+# Seconds between checks of the stop flag while a stage waits on a queue
+_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class FrameOverlay:
+    """RGBA image blended onto every frame of a segment at (x, y)."""
+    rgb: np.ndarray     # uint8 (h, w, 3)
+    alpha: np.ndarray   # uint16 (h, w, 1), 0..255
+    x: int
+    y: int
+
+    @classmethod
+    def from_image(cls, image, x: int, y: int) -> "FrameOverlay":
+        """Create an overlay from a PIL image or an image file path (PNG with transparency)."""
+        if isinstance(image, str):
+            image = Image.open(image)
+        rgba = np.asarray(image.convert("RGBA"))
+        return cls(rgb=np.ascontiguousarray(rgba[..., :3]), alpha=rgba[..., 3:4].astype(np.uint16), x=int(x), y=int(y))
+
+    def apply(self, frame: np.ndarray) -> None:
+        """Alpha-blend onto a frame in place (clipped to the frame)."""
+        frame_h, frame_w = frame.shape[:2]
+        x0, y0 = max(0, self.x), max(0, self.y)
+        x1 = min(frame_w, self.x + self.rgb.shape[1])
+        y1 = min(frame_h, self.y + self.rgb.shape[0])
+        if x1 <= x0 or y1 <= y0:
+            return
+        source = self.rgb[y0 - self.y:y1 - self.y, x0 - self.x:x1 - self.x]
+        alpha = self.alpha[y0 - self.y:y1 - self.y, x0 - self.x:x1 - self.x]
+        region = frame[y0:y1, x0:x1]
+        region[...] = ((source * alpha + region * (255 - alpha) + 127) // 255).astype(np.uint8)
+
+
+@dataclass
+class PipelineSegment:
+    """
+    One source clip of the timeline.
+
+    Args:
+        path: Source video
+        duration: Output duration in seconds (longer than the source: the source is looped)
+        overlays: Overlays blended onto every frame (captions, logos)
+        transform: Optional extra per-frame function (frame, t) -> None applied in place after the overlays
+    """
+    path: str
+    duration: float
+    overlays: List[FrameOverlay] = field(default_factory=list)
+    transform: Optional[Callable[[np.ndarray, float], None]] = None
+
+
+def resize_into(source: np.ndarray, target: np.ndarray) -> None:
+    """
+    Resize a frame into a preallocated target buffer with the auto_resize_video_clip rules:
+    same orientation -> stretch, horizontal to vertical -> center crop, vertical to horizontal -> letterbox.
+    """
+    source_h, source_w = source.shape[:2]
+    target_h, target_w = target.shape[:2]
+    if (source_h, source_w) == (target_h, target_w):
+        np.copyto(target, source)
+        return
+    source_is_horizontal = source_w / source_h > 1.0
+    target_is_horizontal = target_w / target_h > 1.0
+
+    if source_is_horizontal and not target_is_horizontal:
+        # Scale to cover, then crop the center
+        scale = max(target_w / source_w, target_h / source_h)
+        crop_w = min(source_w, int(round(target_w / scale)))
+        crop_h = min(source_h, int(round(target_h / scale)))
+        x0 = (source_w - crop_w) // 2
+        y0 = (source_h - crop_h) // 2
+        cv2.resize(source[y0:y0 + crop_h, x0:x0 + crop_w], (target_w, target_h), dst=target, interpolation=cv2.INTER_AREA)
+    elif target_is_horizontal and not source_is_horizontal:
+        # Scale to fit, pad with black
+        scale = min(target_w / source_w, target_h / source_h)
+        fit_w = max(1, int(round(source_w * scale)))
+        fit_h = max(1, int(round(source_h * scale)))
+        x0 = (target_w - fit_w) // 2
+        y0 = (target_h - fit_h) // 2
+        target.fill(0)
+        cv2.resize(source, (fit_w, fit_h), dst=target[y0:y0 + fit_h, x0:x0 + fit_w], interpolation=cv2.INTER_AREA)
+    else:
+        cv2.resize(source, (target_w, target_h), dst=target, interpolation=cv2.INTER_AREA)
+
+
+class _PipelineState:
+    """Stop flag and first error shared by the stages."""
+
+    def __init__(self):
+        self.stop = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+
+    def fail(self, error: BaseException) -> None:
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        self.stop.set()
+
+    def put(self, target: queue.Queue, item) -> bool:
+        """Blocking put that gives up when the pipeline stops."""
+        while not self.stop.is_set():
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, source: queue.Queue):
+        """Blocking get that returns None when the pipeline stops."""
+        while not self.stop.is_set():
+            try:
+                return source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
+
+
+_END = object()  # End-of-segment marker in a decoder's frame queue
+
+
+class _SegmentDecoder:
+    """
+    Decodes one segment with its own ffmpeg process and thread into a fixed set of
+    preallocated buffers (frames = full buffers, free = empty ones).
+    """
+
+    def __init__(self, segment: PipelineSegment, fps: float, frame_count: int, queue_depth: int, state: _PipelineState):
+        info = probe_media(segment.path)
+        if not info or not info["has_video"]:
+            raise FileNotFoundError(f"Not a video file: {segment.path}")
+        self.segment = segment
+        self.size = (info["width"], info["height"])
+        self.fps = fps
+        self.frame_count = frame_count
+        self.state = state
+        self.frames: queue.Queue = queue.Queue(maxsize=queue_depth)
+        self.free: queue.Queue = queue.Queue()
+        for _ in range(queue_depth):
+            self.free.put(np.empty((self.size[1], self.size[0], 3), dtype=np.uint8))
+        loops = int(np.ceil(segment.duration / info["duration"])) - 1 if info["duration"] > 0 else 0
+        self.loops = max(0, loops)
+        self.thread = threading.Thread(target=self._run, name=f"decode:{os.path.basename(segment.path)}", daemon=True)
+
+    def start(self) -> "_SegmentDecoder":
+        self.thread.start()
+        return self
+
+    def _command(self) -> List[str]:
+        cmd = ["ffmpeg", "-v", "error"]
+        if self.loops:
+            cmd += ["-stream_loop", str(self.loops)]
+        # Rotation is applied by ffmpeg (autorotate), matching the probed width/height
+        cmd += ["-i", self.segment.path, "-t", f"{self.segment.duration:.6f}", "-an",
+                "-vf", f"fps={self.fps}", "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+        return cmd
+
+    def _run(self) -> None:
+        process = None
+        try:
+            process = subprocess.Popen(self._command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+            last = None
+            for _ in range(self.frame_count):
+                buffer = self.state.get(self.free)
+                if buffer is None:
+                    return
+                view = memoryview(buffer).cast("B")
+                filled = 0
+                while filled < len(view):
+                    read = process.stdout.readinto(view[filled:])
+                    if not read:
+                        break
+                    filled += read
+                if filled < len(view):
+                    # Source ended early (rounding): repeat the last frame
+                    if last is None:
+                        raise RuntimeError(f"No frames decoded from {self.segment.path}")
+                    np.copyto(buffer, last)
+                last = buffer
+                if not self.state.put(self.frames, buffer):
+                    return
+            self.state.put(self.frames, _END)
+        except Exception as e:
+            self.state.fail(e)
+        finally:
+            if process is not None:
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+                process.stdout.close()
+
+
+def _segment_frame_counts(segments: List[PipelineSegment], fps: float, max_duration: float = 0) -> List[int]:
+    """Frames per segment, rounded on the timeline so the total matches the summed durations."""
+    counts = []
+    elapsed = 0.0
+    emitted = 0
+    for segment in segments:
+        elapsed += segment.duration
+        if max_duration > 0:
+            elapsed = min(elapsed, max_duration)
+        end_frame = int(round(elapsed * fps))
+        counts.append(max(0, end_frame - emitted))
+        emitted = end_frame
+    return counts
+
+
+def _encoder_command(output_file: str, size: Tuple[int, int], fps: float, audio_path: Optional[str],
+                     duration: float, encode_args: Optional[List[str]]) -> List[str]:
+    cmd = ["ffmpeg", "-hide_banner", "-v", "error", "-y",
+           "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-"]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v", "-map", "1:a"]
+    if encode_args is None:
+        preview = get_preview_settings()
+        encode_args = ["-c:v", "libx264",
+                       "-preset", preview.preset if preview else "veryfast",
+                       "-crf", str(preview.crf if preview else 23),
+                       "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+                       "-threads", str(get_resource_budget().encoder_threads)]
+        if audio_path:
+            encode_args += ["-c:a", "aac", "-b:a", "128k"]
+    return cmd + encode_args + ["-t", f"{duration:.6f}", output_file]
+
+
+@instrumented()
+@verified_output
+@budgeted_render(processes=lambda args: get_resource_budget().max_open_readers + 1)  # live decoders + encoder
+def render_frame_pipeline(
+    segments: List[PipelineSegment],
+    output_file: str,
+    size: Tuple[int, int],
+    fps: float = 24,
+    audio_path: Optional[str] = None,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    transform_workers: Optional[int] = None,
+    encode_args: Optional[List[str]] = None
+) -> bool:
+    """
+    Render a timeline of source clips through concurrent decode/transform/encode stages.
+
+    Args:
+        segments: Clips in timeline order
+        output_file: Output video path
+        size: Output (width, height)
+        fps: Output frame rate
+        audio_path: Optional audio track muxed into the output (cut to the video length)
+        queue_depth: Preallocated frames per decoder and in the transform stage (memory bound)
+        transform_workers: Resize/overlay threads (default: encoder threads of the budget, at least 2)
+        encode_args: ffmpeg output options replacing the default x264/AAC settings
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not segments:
+        print("No segments provided")
+        return False
+
+    preview = get_preview_settings()
+    max_duration = 0
+    if preview is not None:
+        size = preview.scaled_size(size)
+        fps = min(fps, preview.fps)
+        max_duration = preview.max_duration
+    width, height = size
+    budget = get_resource_budget()
+    transform_workers = transform_workers or max(2, budget.encoder_threads)
+    frame_counts = _segment_frame_counts(segments, fps, max_duration)
+    total_frames = sum(frame_counts)
+    duration = total_frames / fps
+    expect_output(output_file, duration, has_audio=audio_path is not None)
+    # Segments cut away by a preview's max_duration are not decoded at all
+    active = [(segment, count) for segment, count in zip(segments, frame_counts) if count > 0]
+
+    state = _PipelineState()
+    work: queue.Queue = queue.Queue(maxsize=queue_depth)      # (index, source buffer, decoder, t)
+    output_free: queue.Queue = queue.Queue()
+    for _ in range(queue_depth):
+        output_free.put(np.empty((height, width, 3), dtype=np.uint8))
+    finished: Dict[int, np.ndarray] = {}
+    finished_ready = threading.Condition()
+    claim_lock = threading.Lock()
+
+    def sequencer():
+        """Start decoders ahead (bounded by max_open_readers) and feed frames in timeline order."""
+        decoders: List[Optional[_SegmentDecoder]] = []
+        try:
+            index = 0
+            next_to_start = 0
+            for position, (segment, count) in enumerate(active):
+                while next_to_start < len(active) and next_to_start < position + budget.max_open_readers:
+                    next_segment, next_count = active[next_to_start]
+                    decoders.append(_SegmentDecoder(next_segment, fps, next_count, queue_depth, state).start())
+                    next_to_start += 1
+                decoder = decoders[position]
+                for frame_number in range(count):
+                    buffer = state.get(decoder.frames)
+                    if buffer is None:
+                        return
+                    if buffer is _END:
+                        raise RuntimeError(f"Decoder of {segment.path} ended early")
+                    if not state.put(work, (index, buffer, decoder, frame_number / fps)):
+                        return
+                    index += 1
+                state.get(decoder.frames)  # End marker
+                decoder.thread.join()
+                decoders[position] = None  # Its buffers are returned by the transform stage; let them go
+            for _ in range(transform_workers):
+                state.put(work, None)
+        except Exception as e:
+            state.fail(e)
+        finally:
+            if state.stop.is_set():
+                for decoder in decoders:
+                    if decoder is not None:
+                        decoder.thread.join(timeout=5)
+
+    def transformer():
+        try:
+            while True:
+                # Output buffers are claimed in frame order, so the encoder's next frame
+                # can never be starved by later frames holding every buffer.
+                with claim_lock:
+                    item = state.get(work)
+                    if item is None:
+                        return
+                    target = state.get(output_free)
+                    if target is None:
+                        return
+                index, source, decoder, t = item
+                resize_into(source, target)
+                decoder.free.put(source)
+                for overlay in decoder.segment.overlays:
+                    overlay.apply(target)
+                if decoder.segment.transform is not None:
+                    decoder.segment.transform(target, t)
+                with finished_ready:
+                    finished[index] = target
+                    finished_ready.notify_all()
+        except Exception as e:
+            state.fail(e)
+            with finished_ready:
+                finished_ready.notify_all()
+
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    encoder = subprocess.Popen(
+        _encoder_command(output_file, size, fps, audio_path, duration, encode_args),
+        stdin=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    threads = [threading.Thread(target=sequencer, name="sequencer", daemon=True)]
+    threads += [threading.Thread(target=transformer, name=f"transform-{i}", daemon=True) for i in range(transform_workers)]
+
+    print(f"🚰 Frame pipeline: {len(active)} segments, {total_frames} frames at {width}x{height}@{fps}, "
+          f"{transform_workers} transform workers, queue depth {queue_depth}")
+    try:
+        with metric_span("encode", output=os.path.basename(output_file), engine="frame_pipeline") as span:
+            for thread in threads:
+                thread.start()
+
+            # Encoder stage (this thread): write frames to ffmpeg stdin in order
+            for index in range(total_frames):
+                with finished_ready:
+                    while index not in finished and not state.stop.is_set():
+                        finished_ready.wait(_POLL_INTERVAL)
+                    frame = finished.pop(index, None)
+                if frame is None:
+                    break
+                encoder.stdin.write(memoryview(frame).cast("B"))
+                output_free.put(frame)
+
+            encoder.stdin.close()
+            stderr = encoder.stderr.read().decode(errors="replace")
+            if encoder.wait() != 0:
+                raise RuntimeError(f"ffmpeg encoder failed: {stderr[-2000:]}")
+            if state.error is not None:
+                raise state.error
+            span.add_frames(total_frames)
+            span.wrote_file(output_file)
+
+        print(f"✅ Frame pipeline wrote {output_file}")
+        return True
+
+    except Exception as e:
+        state.fail(e)
+        print(f"❌ Frame pipeline failed: {e}")
+        return False
+
+    finally:
+        state.stop.set()
+        if encoder.poll() is None:
+            encoder.kill()
+        encoder.wait()
+        for thread in threads:
+            thread.join(timeout=5)
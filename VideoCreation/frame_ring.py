@@ -0,0 +1,386 @@
+"""
+Shared-memory frame transport between decoder, transform and encoder processes.
+
+frame_pipeline runs its stages as threads, which contend on the GIL whenever frames
+are transformed in Python, and sending frames between processes through pipes
+copies them several times. FrameRing is a block of shared memory split into
+fixed-size frame slots; processes pass slot indices through queues instead of
+pickled arrays, so a 1080p frame is written once by the decoder, edited in place
+by a transform process and read by the encoder without any copy.
+
+render_frame_pipeline_shared is the multi-process counterpart of
+frame_pipeline.render_frame_pipeline:
+
+    decoder processes (ffmpeg decode + resize straight into a slot)
+        -> transform processes (overlays/transforms in place)
+        -> encoder (this process, writes the slot to ffmpeg stdin and recycles it)
+
+Each live decoder owns its own group of slots, so a decoder running ahead can
+never take the slots the encoder's next frame needs.
+"""
+
+import os
+import sys
+import queue
+import threading
+import subprocess
+import multiprocessing
+from multiprocessing import shared_memory
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import budgeted_render, get_preview_settings, get_resource_budget
+from render_metrics import instrumented, metric_span
+from render_verify import verified_output, expect_output
+from video_common import probe_media, resize_filter
+from frame_pipeline import PipelineSegment, _segment_frame_counts, _encoder_command
+
+DEFAULT_SLOTS_PER_DECODER = 4
+
+# Seconds between checks of the stop flag while a stage waits on a queue
+_POLL_INTERVAL = 0.1
+
+
+@dataclass(frozen=True)
+class FrameRingSpec:
+    """Picklable description of a FrameRing, used to attach to it from another process."""
+    name: str
+    slot_count: int
+    shape: Tuple[int, ...]
+    dtype: str = "uint8"
+
+    @property
+    def slot_bytes(self) -> int:
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+
+class FrameRing:
+    """
+    Fixed-size frame slots in one shared memory block.
+
+    Example:
+        with FrameRing.create(16, (1080, 1920, 3)) as ring:
+            frame = ring.slot(3)            # numpy view, no copy
+            # other processes: FrameRing.attach(ring.spec).slot(3)
+    """
+
+    def __init__(self, spec: FrameRingSpec, shm: shared_memory.SharedMemory, owner: bool):
+        self.spec = spec
+        self._shm = shm
+        self._owner = owner
+        self._slots = [
+            np.ndarray(spec.shape, dtype=spec.dtype, buffer=shm.buf, offset=index * spec.slot_bytes)
+            for index in range(spec.slot_count)
+        ]
+
+    @classmethod
+    def create(cls, slot_count: int, shape: Tuple[int, ...], dtype: str = "uint8") -> "FrameRing":
+        """Allocate a new ring (this process owns it and unlinks it on close)."""
+        slot_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        shm = shared_memory.SharedMemory(create=True, size=slot_count * slot_bytes)
+        return cls(FrameRingSpec(shm.name, slot_count, tuple(shape), dtype), shm, owner=True)
+
+    @classmethod
+    def attach(cls, spec: FrameRingSpec) -> "FrameRing":
+        """
+        Open an existing ring from a process started with the spawn context.
+
+        Before Python 3.13 attaching registers the block with the resource tracker,
+        but spawned children share the parent's tracker, so the registration is a
+        duplicate of the owner's: it must not be unregistered here (that would drop
+        the owner's entry, and its unlink() would then fail in the tracker).
+        """
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=spec.name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=spec.name)
+        return cls(spec, shm, owner=False)
+
+    def slot(self, index: int) -> np.ndarray:
+        """numpy view of a slot (no copy)."""
+        return self._slots[index]
+
+    def slot_buffer(self, index: int) -> memoryview:
+        """
+        Writable byte view of a slot, e.g. for file.readinto() (no copy).
+        Release it (with-block or .release()) before close(), or close() cannot detach.
+        """
+        start = index * self.spec.slot_bytes
+        return self._shm.buf[start:start + self.spec.slot_bytes]
+
+    def close(self) -> None:
+        """Detach from the shared memory (the owner also frees it)."""
+        self._slots = []
+        try:
+            self._shm.close()
+        except BufferError as e:
+            print(f"Warning: Frame ring {self.spec.name} still has exported views: {e}")
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "FrameRing":
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> bool:
+        self.close()
+        return False
+
+
+def _queue_get(source, stop):
+    """Blocking get on a multiprocessing queue that returns None once `stop` is set."""
+    while not stop.is_set():
+        try:
+            return source.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return None
+
+
+def _decode_worker(spec: FrameRingSpec, command: List[str], frame_count: int, free_slots, decoded, stop) -> None:
+    """Decoder process: ffmpeg writes resized RGB frames straight into free slots of its group."""
+    ring = FrameRing.attach(spec)
+    process = None
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        for _ in range(frame_count):
+            slot = _queue_get(free_slots, stop)
+            if slot is None:
+                return
+            filled = 0
+            with ring.slot_buffer(slot) as view:
+                while filled < len(view):
+                    with view[filled:] as remaining:
+                        read = process.stdout.readinto(remaining)
+                    if not read:
+                        break
+                    filled += read
+            if filled < spec.slot_bytes:
+                raise RuntimeError(f"Decoder ended after a partial frame: {' '.join(command[:8])}")
+            decoded.put(slot)
+        decoded.put(None)
+    except Exception as e:
+        decoded.put(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        if process is not None:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+        ring.close()
+
+
+def _transform_worker(spec: FrameRingSpec, segments: List[PipelineSegment], work, done, stop) -> None:
+    """Transform process: applies the segment's overlays/transform to a slot in place."""
+    ring = FrameRing.attach(spec)
+    try:
+        while True:
+            item = _queue_get(work, stop)
+            if item is None:
+                return
+            index, group, slot, segment_index, t = item
+            frame = ring.slot(slot)
+            segment = segments[segment_index]
+            for overlay in segment.overlays:
+                overlay.apply(frame)
+            if segment.transform is not None:
+                segment.transform(frame, t)
+            frame = None  # Drop the view so the ring can be closed
+            done.put((index, group, slot))
+    except Exception as e:
+        done.put(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        ring.close()
+
+
+def _decoder_command(segment: PipelineSegment, size: Tuple[int, int], fps: float) -> List[str]:
+    """ffmpeg command decoding a segment to raw RGB frames of the output size."""
+    info = probe_media(segment.path)
+    if not info or not info["has_video"]:
+        raise FileNotFoundError(f"Not a video file: {segment.path}")
+    loops = max(0, int(np.ceil(segment.duration / info["duration"])) - 1) if info["duration"] > 0 else 0
+    cmd = ["ffmpeg", "-v", "error"]
+    if loops:
+        cmd += ["-stream_loop", str(loops)]
+    # tpad repeats the last frame, so rounding never leaves the decoder a frame short
+    video_filter = (f"fps={fps},{resize_filter((info['width'], info['height']), size)},setsar=1,"
+                    f"tpad=stop_mode=clone:stop_duration=1")
+    return cmd + ["-i", segment.path, "-an", "-vf", video_filter, "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+
+
+@instrumented()
+@verified_output
+@budgeted_render(processes=lambda args: get_resource_budget().max_open_readers + 1)  # live decoders + encoder
+def render_frame_pipeline_shared(
+    segments: List[PipelineSegment],
+    output_file: str,
+    size: Tuple[int, int],
+    fps: float = 24,
+    audio_path: Optional[str] = None,
+    slots_per_decoder: int = DEFAULT_SLOTS_PER_DECODER,
+    transform_processes: Optional[int] = None,
+    encode_args: Optional[List[str]] = None
+) -> bool:
+    """
+    Render a timeline of source clips with decoder/transform processes sharing a FrameRing.
+    Segment transforms must be picklable (module-level functions).
+
+    Args:
+        segments: Clips in timeline order
+        output_file: Output video path
+        size: Output (width, height)
+        fps: Output frame rate
+        audio_path: Optional audio track muxed into the output (cut to the video length)
+        slots_per_decoder: Frame slots of each live decoder (ring size = slots x max_open_readers)
+        transform_processes: Overlay/transform processes (default: encoder threads of the budget, at least 1)
+        encode_args: ffmpeg output options replacing the default x264/AAC settings
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not segments:
+        print("No segments provided")
+        return False
+
+    preview = get_preview_settings()
+    max_duration = 0
+    if preview is not None:
+        size = preview.scaled_size(size)
+        fps = min(fps, preview.fps)
+        max_duration = preview.max_duration
+    width, height = size
+    budget = get_resource_budget()
+    groups = max(1, budget.max_open_readers)
+    transform_processes = transform_processes or max(1, budget.encoder_threads)
+    frame_counts = _segment_frame_counts(segments, fps, max_duration)
+    total_frames = sum(frame_counts)
+    duration = total_frames / fps
+    expect_output(output_file, duration, has_audio=audio_path is not None)
+    active = [(index, count) for index, count in enumerate(frame_counts) if count > 0]
+
+    # Spawned children work the same on Linux, Colab and Windows
+    context = multiprocessing.get_context("spawn")
+    ring = FrameRing.create(groups * slots_per_decoder, (height, width, 3))
+    stop = context.Event()
+    free_slots = [context.Queue() for _ in range(groups)]
+    decoded = [context.Queue() for _ in range(groups)]
+    work = context.Queue(maxsize=groups * slots_per_decoder)
+    done = context.Queue()
+    for group in range(groups):
+        for slot in range(group * slots_per_decoder, (group + 1) * slots_per_decoder):
+            free_slots[group].put(slot)
+
+    processes: List[multiprocessing.Process] = []
+    errors: List[str] = []
+
+    def fail(message: str) -> None:
+        errors.append(message)
+        stop.set()
+
+    def start_decoder(position: int) -> None:
+        segment_index, count = active[position]
+        process = context.Process(
+            target=_decode_worker,
+            args=(ring.spec, _decoder_command(segments[segment_index], size, fps), count,
+                  free_slots[position % groups], decoded[position % groups], stop),
+            name=f"decode:{os.path.basename(segments[segment_index].path)}",
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    def sequencer():
+        """Keep `groups` decoders running ahead and feed decoded slots to the transforms in timeline order."""
+        try:
+            index = 0
+            for position in range(min(groups, len(active))):
+                start_decoder(position)
+            for position, (segment_index, count) in enumerate(active):
+                group = position % groups
+                for frame_number in range(count):
+                    slot = _queue_get(decoded[group], stop)
+                    if slot is None:
+                        return
+                    if isinstance(slot, tuple):
+                        raise RuntimeError(slot[1])
+                    while not stop.is_set():
+                        try:
+                            work.put((index, group, slot, segment_index, frame_number / fps), timeout=_POLL_INTERVAL)
+                            break
+                        except queue.Full:
+                            continue
+                    index += 1
+                end = _queue_get(decoded[group], stop)  # End marker
+                if isinstance(end, tuple):
+                    raise RuntimeError(end[1])
+                # This group's decoder is done: start the next segment that uses its slots
+                if position + groups < len(active):
+                    start_decoder(position + groups)
+            for _ in range(transform_processes):
+                work.put(None)
+        except Exception as e:
+            fail(f"{type(e).__name__}: {e}")
+
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    encoder = subprocess.Popen(
+        _encoder_command(output_file, size, fps, audio_path, duration, encode_args),
+        stdin=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    print(f"🧵 Shared-memory pipeline: {len(active)} segments, {total_frames} frames at {width}x{height}@{fps}, "
+          f"{ring.spec.slot_count} slots ({ring.spec.slot_count * ring.spec.slot_bytes / 1e6:.0f} MB), "
+          f"{transform_processes} transform processes")
+    sequencer_thread = threading.Thread(target=sequencer, name="sequencer", daemon=True)
+
+    try:
+        with metric_span("encode", output=os.path.basename(output_file), engine="frame_ring") as span:
+            for _ in range(transform_processes):
+                process = context.Process(target=_transform_worker, args=(ring.spec, segments, work, done, stop), daemon=True)
+                process.start()
+                processes.append(process)
+            sequencer_thread.start()
+
+            # Encoder stage (this process): write slots to ffmpeg stdin in order, then recycle them
+            pending: Dict[int, Tuple[int, int]] = {}
+            for index in range(total_frames):
+                while index not in pending:
+                    item = _queue_get(done, stop)
+                    if item is None:
+                        raise RuntimeError(errors[0] if errors else "Pipeline stopped")
+                    if item[0] == "error":
+                        raise RuntimeError(item[1])
+                    pending[item[0]] = (item[1], item[2])
+                group, slot = pending.pop(index)
+                with ring.slot_buffer(slot) as view:
+                    encoder.stdin.write(view)
+                free_slots[group].put(slot)
+
+            encoder.stdin.close()
+            stderr = encoder.stderr.read().decode(errors="replace")
+            if encoder.wait() != 0:
+                raise RuntimeError(f"ffmpeg encoder failed: {stderr[-2000:]}")
+            span.add_frames(total_frames)
+            span.wrote_file(output_file)
+
+        print(f"✅ Shared-memory pipeline wrote {output_file}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Shared-memory pipeline failed: {e}")
+        return False
+
+    finally:
+        stop.set()
+        if encoder.poll() is None:
+            encoder.kill()
+        encoder.wait()
+        if sequencer_thread.ident is not None:
+            sequencer_thread.join(timeout=5)
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        ring.close()
@@ -0,0 +1,297 @@
+"""
+Pluggable frame sources for source videos.
+
+All frame decoding used to go through MoviePy's ffmpeg pipe reader. A FrameSource
+is the small interface the composition code needs (size, fps, duration,
+get_frame(t), close()), with two implementations:
+
+- FFmpegFrameSource: MoviePy's FFMPEG_VideoReader (the previous behavior); with a
+  target size the frames are scaled inside the ffmpeg decoder
+- OpenCVFrameSource: cv2.VideoCapture in-process decoding, with a sequential-read
+  fast path (grab() instead of seeking for small forward steps), a keyframe seek
+  index for random access and optional downscaling before the colour conversion
+
+FrameSourceClip adapts any source to a MoviePy VideoClip, so resize/crop/text
+layers, ReaderPool/LazyVideoSource, CreateVideoFile and prepare_video_clip work
+unchanged on top of it. Backends are looked up by name in FRAME_SOURCE_BACKENDS.
+"""
+
+import os
+import abc
+import bisect
+import threading
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from moviepy.video.VideoClip import VideoClip
+from moviepy.video.io.VideoFileClip import VideoFileClip
+from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader, ffmpeg_parse_infos
+
+# Forward steps up to this many frames are decoded with grab() instead of a seek
+SEQUENTIAL_READ_AHEAD = 48
+
+# Keyframe indices keyed by absolute path -> ((mtime_ns, size), [frame indices])
+_SEEK_INDEX_CACHE: Dict[str, Tuple[Tuple[int, int], List[int]]] = {}
+_SEEK_INDEX_CACHE_LOCK = threading.Lock()
+
+
+class FrameSource(abc.ABC):
+    """
+    Decoded RGB frames of one video file.
+
+    Attributes:
+        path: Video file path
+        size: (width, height) of the returned frames
+        fps: Frame rate
+        duration: Duration in seconds
+    """
+    backend = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size: Tuple[int, int] = (0, 0)
+        self.fps: float = 0.0
+        self.duration: float = 0.0
+
+    @abc.abstractmethod
+    def get_frame(self, t: float) -> np.ndarray:
+        """RGB uint8 frame (height, width, 3) shown at time t."""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "FrameSource":
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> bool:
+        self.close()
+        return False
+
+
+class FFmpegFrameSource(FrameSource):
+    """
+    Frames from MoviePy's ffmpeg pipe reader.
+
+    Args:
+        path: Video file path
+        target_size: Optional (width, height); ffmpeg scales while decoding
+    """
+    backend = "ffmpeg"
+
+    def __init__(self, path: str, target_size: Optional[Tuple[int, int]] = None):
+        super().__init__(path)
+        self.reader = FFMPEG_VideoReader(path, decode_file=False, target_resolution=target_size)
+        self.size = tuple(self.reader.size)
+        self.fps = self.reader.fps
+        self.duration = self.reader.duration
+
+    def get_frame(self, t: float) -> np.ndarray:
+        return self.reader.get_frame(t)
+
+    def close(self) -> None:
+        self.reader.close()
+
+
+def build_seek_index(path: str, fps: float) -> List[int]:
+    """
+    Frame indices of the keyframes of a video (ffprobe reads only the keyframes).
+    Cached by (path, mtime, size).
+
+    Returns:
+        Sorted list of frame indices, [0] if ffprobe fails
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _SEEK_INDEX_CACHE_LOCK:
+        cached = _SEEK_INDEX_CACHE.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+           "-show_entries", "frame=pts_time,best_effort_timestamp_time", "-of", "csv=p=0", path]
+    keyframes = {0}
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        for line in result.stdout.splitlines():
+            for value in line.split(","):
+                try:
+                    keyframes.add(int(round(float(value) * fps)))
+                    break
+                except ValueError:
+                    continue
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Warning: Could not build the seek index of {path}: {e}")
+
+    index = sorted(keyframes)
+    with _SEEK_INDEX_CACHE_LOCK:
+        _SEEK_INDEX_CACHE[key] = (signature, index)
+    return index
+
+
+class OpenCVFrameSource(FrameSource):
+    """
+    Frames decoded in-process with cv2.VideoCapture.
+
+    Sequential access (the usual write_videofile pattern) reads the next frame
+    directly; small forward jumps are skipped with grab() (no colour conversion);
+    other jumps seek to the nearest keyframe before the target (from the seek index)
+    and grab forward, which is exact even where OpenCV's own frame seek is not.
+    Like MoviePy's reader, a closed source reopens its capture on the next get_frame,
+    so clips derived from it (e.g. resized copies) keep working.
+
+    Args:
+        path: Video file path
+        target_size: Optional (width, height); frames are downscaled before the
+            BGR->RGB conversion, so later stages handle the smaller frame
+        use_seek_index: Seek via keyframes (False: let OpenCV seek to the frame directly)
+    """
+    backend = "opencv"
+
+    def __init__(self, path: str, target_size: Optional[Tuple[int, int]] = None, use_seek_index: bool = True):
+        super().__init__(path)
+        self.capture = None
+        self._open()
+        self.target_size = tuple(target_size) if target_size else None
+        self.use_seek_index = use_seek_index
+        self._lock = threading.Lock()
+        self._position = 0          # Index of the frame the next read() returns
+        self._last_index = -1
+        self._last_frame = None
+        self._seek_index: Optional[List[int]] = None
+
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 24.0
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        if self.frame_count <= 0:
+            # Some containers do not store a frame count
+            self.frame_count = max(1, int(ffmpeg_parse_infos(path)["duration"] * self.fps))
+        self.duration = self.frame_count / self.fps
+
+        # Size after OpenCV's automatic rotation and the optional downscale
+        first = self.get_frame(0)
+        self.size = (first.shape[1], first.shape[0])
+
+    def _open(self) -> None:
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            raise IOError(f"OpenCV cannot open video: {self.path}")
+        self._position = 0
+        self._last_index = -1
+        self._last_frame = None
+
+    def _seek(self, index: int) -> None:
+        start = index
+        if self.use_seek_index:
+            if self._seek_index is None:
+                self._seek_index = build_seek_index(self.path, self.fps)
+            start = self._seek_index[max(0, bisect.bisect_right(self._seek_index, index) - 1)]
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        self._position = start
+
+    def _convert(self, frame: np.ndarray) -> np.ndarray:
+        if self.target_size and (frame.shape[1], frame.shape[0]) != self.target_size:
+            frame = cv2.resize(frame, self.target_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def get_frame(self, t: float) -> np.ndarray:
+        index = max(0, min(int(t * self.fps + 1e-6), self.frame_count - 1))
+        with self._lock:
+            if self.capture is None:
+                self._open()
+            if index == self._last_index:
+                return self._last_frame
+
+            gap = index - self._position
+            if gap < 0 or gap > SEQUENTIAL_READ_AHEAD:
+                self._seek(index)
+            while self._position < index:
+                if not self.capture.grab():
+                    break
+                self._position += 1
+
+            ok, frame = self.capture.read()
+            if not ok:
+                # Past the real end (frame counts can be estimates): hold the last frame
+                if self._last_frame is not None:
+                    return self._last_frame
+                raise IOError(f"OpenCV could not decode frame {index} of {self.path}")
+            self._position += 1
+            self._last_index = index
+            self._last_frame = self._convert(frame)
+            return self._last_frame
+
+    def close(self) -> None:
+        with self._lock:
+            if self.capture is not None:
+                self.capture.release()
+                self.capture = None
+            self._last_index = -1
+            self._last_frame = None
+
+
+FRAME_SOURCE_BACKENDS = {
+    "ffmpeg": FFmpegFrameSource,
+    "opencv": OpenCVFrameSource
+}
+
+
+def open_frame_source(path: str, backend: str = "ffmpeg", target_size: Optional[Tuple[int, int]] = None) -> FrameSource:
+    """
+    Open a frame source with the named backend.
+
+    Args:
+        path: Video file path
+        backend: Key of FRAME_SOURCE_BACKENDS ("ffmpeg" or "opencv")
+        target_size: Optional (width, height) to decode at
+    """
+    if backend not in FRAME_SOURCE_BACKENDS:
+        raise ValueError(f"Unknown frame source backend '{backend}', expected one of {list(FRAME_SOURCE_BACKENDS)}")
+    return FRAME_SOURCE_BACKENDS[backend](path, target_size=target_size)
+
+
+class FrameSourceClip(VideoClip):
+    """
+    MoviePy video clip (no audio) reading its frames from a FrameSource.
+
+    Args:
+        source: Opened frame source (closed together with the clip)
+    """
+
+    def __init__(self, source: FrameSource):
+        super().__init__(duration=source.duration)
+        self.source = source
+        self.filename = source.path
+        self.size = source.size
+        self.fps = source.fps
+        self.frame_function = source.get_frame
+
+    def close(self) -> None:
+        self.source.close()
+        if self.audio is not None:
+            self.audio.close()
+
+
+def open_video_clip(path: str, decoder: str = "ffmpeg", target_size: Optional[Tuple[int, int]] = None, audio: bool = True):
+    """
+    Open a video file as a MoviePy clip with the chosen decoder.
+
+    Args:
+        path: Video file path
+        decoder: "ffmpeg" (VideoFileClip) or another FRAME_SOURCE_BACKENDS key
+        target_size: Optional (width, height) to decode at
+        audio: Attach the file's audio track (if it has one)
+
+    Returns:
+        VideoFileClip or FrameSourceClip
+    """
+    if decoder == "ffmpeg":
+        return VideoFileClip(path, audio=audio, target_resolution=target_size)
+
+    clip = FrameSourceClip(open_frame_source(path, decoder, target_size))
+    if audio and ffmpeg_parse_infos(path).get("audio_found"):
+        clip = clip.with_audio(AudioFileClip(path))
+    return clip
@@ -0,0 +1,319 @@
+"""
+Multi-project batch scheduler for the Greece workflow.
+
+Each project gets its own frozen VideoConfigGreece (see VideoConfigGreece.with_project),
+so workers never share mutable state. The Common_Artifacts intro/tail outputs are built
+once per run and then only read by the per-project jobs.
+
+On Colab the batch runs on a local mirror of the Drive tree (see drive_staging):
+each job waits only for its own prefetched inputs, and final videos are copied
+back to Drive in the background while later jobs render.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence
+
+from config import VideoConfigGreece, PreviewSettings, get_resource_budget, using_resource_budget
+from social_video_youtube_full_size import (
+    create_complete_video_for_greece,
+    create_greece_intro_audio,
+    create_greece_intro_video,
+    create_greece_tail_audio
+)
+from greece_filtergraph import render_greece_orientations
+from drive_staging import DriveStaging, greece_common_inputs, greece_common_outputs, greece_project_inputs
+from preflight import preflight_greece, COMMON_OWNER
+
+
+def build_greece_common_artifacts(
+    video_config: VideoConfigGreece,
+    languages: Sequence[str] = ("EN", "RU"),
+    orientations: Sequence[str] = ("horizontal", "vertical"),
+    max_workers: Optional[int] = None,
+    preview: Optional[PreviewSettings] = None
+) -> bool:
+    """
+    Build the shared Common_Artifacts outputs (steps 1-3) once for all languages/orientations.
+    Intro/tail audio depend only on the language; the intro video depends on language and orientation.
+
+    Args:
+        video_config: Any project's configuration (only Common_Artifacts paths are used)
+        languages: Language codes to build
+        orientations: Orientations to build intro videos for
+        max_workers: Maximum number of concurrent renders (default: the resource budget's max_parallel_renders);
+            overrides the budget's max_parallel_renders for this call, so encoder threads are split
+            between the workers
+        preview: Build draft intro videos for a preview run
+
+    Returns:
+        bool: True if every shared artifact was built
+    """
+    budget = get_resource_budget()
+    if max_workers:
+        # Encoder threads are split between the renders that actually run at once
+        budget = budget.with_parallel_renders(max_workers)
+    max_workers = budget.max_parallel_renders
+    with using_resource_budget(budget):
+        return _build_greece_common_artifacts(video_config, languages, orientations, max_workers, preview)
+
+
+def _build_greece_common_artifacts(
+    video_config: VideoConfigGreece,
+    languages: Sequence[str],
+    orientations: Sequence[str],
+    max_workers: int,
+    preview: Optional[PreviewSettings]
+) -> bool:
+    print(f"🏗️ Building shared Common_Artifacts for {', '.join(languages)} / {', '.join(orientations)}")
+    ok = True
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Steps 1 and 3: one audio job per language and artifact (distinct output files)
+        audio_jobs = {}
+        for language in languages:
+            audio_jobs[executor.submit(create_greece_intro_audio, language, video_config, preview=preview)] = f"intro audio {language}"
+            audio_jobs[executor.submit(create_greece_tail_audio, language, video_config, preview=preview)] = f"tail audio {language}"
+        for future in as_completed(audio_jobs):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Shared {audio_jobs[future]} failed: {e}")
+                ok = False
+
+        if not ok:
+            return False
+
+        # Step 2: intro video per language/orientation (needs that language's intro audio)
+        video_jobs = {
+            executor.submit(create_greece_intro_video, language, orientation, video_config, preview=preview): f"intro video {language} {orientation}"
+            for language in languages
+            for orientation in orientations
+        }
+        for future in as_completed(video_jobs):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Shared {video_jobs[future]} failed: {e}")
+                ok = False
+
+    return ok
+
+
+def _render_project_language(
+    project_config: VideoConfigGreece,
+    language: str,
+    orientations: Sequence[str],
+    cleanup_intermediate: bool,
+    preview: Optional[PreviewSettings] = None,
+    engine: str = "moviepy"
+) -> Dict[str, Optional[str]]:
+    """Render all orientations of one project/language in order (they share the step 4 audio file)."""
+    if engine == "filtergraph":
+        # One decode of the sources feeds the encoders of every orientation
+        outputs = render_greece_orientations(language, orientations, project_config, preview=preview)
+        return {f"{language}_{orientation}": path for orientation, path in outputs.items()}
+
+    results = {}
+    for orientation in orientations:
+        results[f"{language}_{orientation}"] = create_complete_video_for_greece(
+            language=language,
+            orientation=orientation,
+            video_config=project_config,
+            cleanup_intermediate=cleanup_intermediate,
+            build_all=False,
+            preview=preview,
+            engine=engine
+        )
+    return results
+
+
+def _render_staged_project_language(
+    staging: DriveStaging,
+    project_config: VideoConfigGreece,
+    language: str,
+    orientations: Sequence[str],
+    cleanup_intermediate: bool,
+    preview: Optional[PreviewSettings] = None,
+    engine: str = "moviepy"
+) -> Dict[str, Optional[str]]:
+    """_render_project_language on the local mirror: wait for this job's inputs, publish its finals."""
+    staging.wait_for(greece_project_inputs(project_config, [language]))
+    results = _render_project_language(project_config, language, orientations, cleanup_intermediate, preview, engine)
+    return {name: staging.publish(path) for name, path in results.items()}
+
+
+def render_greece_projects(
+    base_config: VideoConfigGreece,
+    project_dirs: List[str],
+    languages: Sequence[str] = ("EN", "RU"),
+    orientations: Sequence[str] = ("horizontal", "vertical"),
+    max_workers: Optional[int] = None,
+    build_common: bool = True,
+    cleanup_intermediate: bool = False,
+    preview: Optional[PreviewSettings] = None,
+    engine: str = "moviepy",
+    stage_drive: Optional[bool] = None,
+    preflight: bool = True
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Render many Greece projects (e.g. "3_Hector", "4_Athena") concurrently.
+
+    Args:
+        base_config: Configuration providing the base paths (not modified)
+        project_dirs: Project directory names to render
+        languages: Language codes to render for every project
+        orientations: Orientations to render for every project
+        max_workers: Maximum number of concurrent project/language jobs (default: the
+            config's resource budget max_parallel_renders, 1 = serial); overrides the
+            budget's max_parallel_renders for this call, so encoder threads are split between the workers
+        build_common: Build the shared intro/tail artifacts first (once for the whole run)
+        cleanup_intermediate: Remove each project's intermediate files after its final video
+        preview: Render fast drafts ("*_preview.mp4") instead of the full videos
+        engine: "moviepy" or "filtergraph" (one ffmpeg pass per project/language that
+            decodes the sources once for all orientations and builds the intro/tail
+            inline, so the shared artifacts are not needed)
+        stage_drive: Render on a local copy of the Drive files and copy only the final
+            videos back (default: on for the "colab" environment)
+        preflight: Validate every input first (see preflight) and skip the projects
+            with broken assets (all projects when a shared asset is broken)
+
+    Returns:
+        dict: project_dir -> {"EN_horizontal": final path or None, ...}
+    """
+    budget = base_config.apply_resource_budget()
+    if max_workers:
+        # Encoder threads are split between the renders that actually run at once;
+        # the sized budget is only installed for this batch
+        budget = budget.with_parallel_renders(max_workers)
+    max_workers = budget.max_parallel_renders
+    with using_resource_budget(budget):
+        print(f"🚀 Scheduling {len(project_dirs)} Greece projects with {max_workers} workers "
+              f"({budget.encoder_threads} encoder threads each, max {budget.max_ffmpeg_processes} ffmpeg processes)")
+        print("=" * 70)
+
+        if engine == "filtergraph":
+            build_common = False
+        if stage_drive is None:
+            stage_drive = base_config.environment == "colab"
+
+        if preflight:
+            # The filtergraph engine builds the intro/tail inline from their sources
+            report = preflight_greece(base_config, project_dirs, languages, orientations,
+                                      build_common=build_common or engine == "filtergraph",
+                                      preview=preview is not None)
+            blocked = report.failed_owners()
+            if COMMON_OWNER in blocked:
+                print("❌ Shared intro/tail assets failed the preflight - no projects rendered")
+                return {project_dir: {} for project_dir in project_dirs}
+            if blocked:
+                print(f"⚠️ Skipping projects that failed the preflight: {', '.join(sorted(blocked))}")
+            skipped = [project_dir for project_dir in project_dirs if project_dir in blocked]
+            project_dirs = [project_dir for project_dir in project_dirs if project_dir not in blocked]
+        else:
+            skipped = []
+
+        with DriveStaging(base_config.BASE_DIRECTORY, enabled=stage_drive) as staging:
+            # Start every Drive download at once; jobs only wait for their own files
+            staging.prefetch(greece_common_inputs(base_config, languages, orientations, include_artifacts=not build_common))
+            for project_dir in project_dirs:
+                staging.prefetch(greece_project_inputs(base_config.with_project(project_dir), languages))
+            staged_config = staging.stage_config(base_config)
+            staging.wait_for(greece_common_inputs(staged_config, languages, orientations, include_artifacts=not build_common))
+
+            results = _render_greece_projects(
+                staging, staged_config, project_dirs, languages, orientations, max_workers,
+                build_common, cleanup_intermediate, preview, engine
+            )
+            failed_publishes = staging.finish()
+
+        for variants in results.values():
+            for name, path in variants.items():
+                if path in failed_publishes:
+                    variants[name] = None
+        results.update({project_dir: {} for project_dir in skipped})
+
+        print_greece_batch_summary(results, len(languages) * len(orientations))
+        return results
+
+
+def _render_greece_projects(
+    staging: DriveStaging,
+    base_config: VideoConfigGreece,
+    project_dirs: List[str],
+    languages: Sequence[str],
+    orientations: Sequence[str],
+    max_workers: int,
+    build_common: bool,
+    cleanup_intermediate: bool,
+    preview: Optional[PreviewSettings],
+    engine: str
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """Body of render_greece_projects, on the (possibly staged) base configuration."""
+    if build_common:
+        if not build_greece_common_artifacts(base_config, languages, orientations, max_workers, preview):
+            print("❌ Shared Common_Artifacts could not be built - no projects rendered")
+            return {project_dir: {} for project_dir in project_dirs}
+        # Rebuilt shared artifacts are reused by later runs: keep the Drive copies current
+        for path in greece_common_outputs(base_config, languages, orientations):
+            staging.publish(path)
+
+    # Immutable per-project configs
+    project_configs = {}
+    results: Dict[str, Dict[str, Optional[str]]] = {}
+    for project_dir in project_dirs:
+        project_config = base_config.with_project(project_dir)
+        project_config.create_all_directories()
+        if not project_config.validate_directories():
+            print(f"❌ {project_dir}: Missing required directories - skipping")
+            results[project_dir] = {}
+            continue
+        project_configs[project_dir] = project_config
+        results[project_dir] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        jobs = {
+            executor.submit(_render_staged_project_language, staging, project_config, language, orientations, cleanup_intermediate, preview, engine): (project_dir, language)
+            for project_dir, project_config in project_configs.items()
+            for language in languages
+        }
+        for future in as_completed(jobs):
+            project_dir, language = jobs[future]
+            try:
+                results[project_dir].update(future.result())
+            except Exception as e:
+                print(f"❌ {project_dir} {language} failed: {e}")
+                results[project_dir].update({f"{language}_{orientation}": None for orientation in orientations})
+
+    return results
+
+
+def print_greece_batch_summary(results: Dict[str, Dict[str, Optional[str]]], expected_per_project: int) -> None:
+    """Print a per-project summary of a batch run."""
+    print("\n" + "=" * 70)
+    print("🏁 BATCH PROCESSING COMPLETED")
+    print("=" * 70)
+
+    total_created = 0
+    for project_dir, variants in results.items():
+        created = [name for name, path in variants.items() if path]
+        failed = [name for name, path in variants.items() if not path]
+        total_created += len(created)
+        if created and not failed and len(created) == expected_per_project:
+            print(f"   🎉 {project_dir}: all {len(created)} videos")
+        elif created:
+            print(f"   ⚠️ {project_dir}: partial {len(created)}/{expected_per_project} (failed: {', '.join(failed)})")
+        else:
+            print(f"   ❌ {project_dir}: no videos created")
+
+    print(f"\n🎯 Expected total videos: {len(results) * expected_per_project}")
+    print(f"🎉 Actual videos created: {total_created}")
+
+
+if __name__ == "__main__":
+    from config import get_local_config
+
+    from config import ResourceBudget
+
+    config = get_local_config("3_Hector")
+    config.resource_budget = ResourceBudget(max_parallel_renders=2)
+    render_greece_projects(config, ["3_Hector", "4_Athena"])
@@ -0,0 +1,465 @@
+"""
+Single-pass FFmpeg render of a whole Greece timeline.
+
+The MoviePy workflow encodes the intro (step 2), encodes main+tail (step 5) and
+then decodes both and encodes them again (step 6), writing MP3 intermediates in
+between. This engine compiles the intro clips, the prompt clips, the tail clips,
+their captions and the mixed audio into one ffmpeg filter_complex, so the final
+video is produced in a single decode/encode pass with no intermediate files.
+
+The timeline follows the MoviePy workflow exactly:
+- intro: intro clips at their own length, intro audio = music (looped, 0.3 volume)
+  with the voice after GREECE_INTRO_MUSIC_BEFORE_VOICE, cut/padded to the clips
+- main+tail: prompt clips + tail clips stretched to the audio length (last clip
+  repeated or the timeline cut), audio = main voice, silence, tail music + voice
+- clips are resized with the auto_resize_video_clip rules and captioned like
+  add_text_overlay (rendered once per caption with PIL and overlaid)
+
+render_greece_orientations renders horizontal and vertical together: each source is
+decoded once, split into per-orientation stretch/crop/letterbox + caption chains,
+and every encoder is fed from that single decode.
+"""
+
+import os
+import math
+import subprocess
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image, ImageDraw
+
+from config import (
+    VideoConfigGreece,
+    PreviewSettings,
+    budgeted_render,
+    get_preview_settings,
+    get_resource_budget,
+    preview_entry_point
+)
+from scratch_space import job_scratch, scratch_file
+from render_metrics import instrumented, metric_span
+from render_verify import verified_output, expect_output
+from image_common import load_font, parse_color
+from video_common import probe_media, resize_filter, get_text_columns, MUSIC_OVERLAY_VOLUME
+from social_video_youtube_full_size import (
+    get_orientation_size,
+    GREECE_INTRO_MUSIC_BEFORE_VOICE,
+    GREECE_INTRO_MUSIC_AFTER_VOICE,
+    GREECE_TAIL_MUSIC_BEFORE_VOICE,
+    GREECE_TAIL_MUSIC_AFTER_VOICE,
+    GREECE_TAIL_SILENCE_BETWEEN
+)
+
+GREECE_FPS = 24
+
+# Caption look, matching video_common.add_text_overlay
+CAPTION_FONT_SIZE = 50
+CAPTION_COLOR = "#D4AF37"
+CAPTION_STROKE_COLOR = "black"
+CAPTION_STROKE_WIDTH = 2
+CAPTION_WIDTH_RATIO = 0.9
+CAPTION_TOP_RATIO = 0.75
+CAPTION_MARGIN = 10
+
+AUDIO_FORMAT = "aformat=sample_fmts=fltp:sample_rates=44100:channel_layouts=stereo"
+
+# Final encode (one generation only, so a better quality than the intermediates is affordable)
+X264_SETTINGS = ["-preset", "fast", "-crf", "22"]
+
+
+@dataclass
+class TimelineSegment:
+    """One clip of the timeline."""
+    path: str
+    duration: float               # Output duration of the segment
+    source_duration: float
+    source_size: Tuple[int, int]
+    caption: str = ""
+    loops: int = 0                # Extra plays of the source (repeated last clip)
+
+
+@dataclass
+class FilterGraphPlan:
+    """ffmpeg inputs and filter_complex chains of a render."""
+    inputs: List[List[str]] = field(default_factory=list)
+    filters: List[str] = field(default_factory=list)
+    outputs: List[Tuple[str, str, str, float]] = field(default_factory=list)  # (name, video label, audio label, duration)
+
+    def add_input(self, *args: str) -> int:
+        """Add an input (its ffmpeg options followed by "-i", path) and return its index."""
+        self.inputs.append(list(args))
+        return len(self.inputs) - 1
+
+    def add_filter(self, chain: str) -> None:
+        self.filters.append(chain)
+
+    @property
+    def filter_complex(self) -> str:
+        return ";\n".join(self.filters)
+
+
+def _wrap_caption(text: str, font, max_width: int) -> List[str]:
+    """Greedy word wrap by rendered width (what TextClip's caption method does)."""
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        current = ""
+        for word in paragraph.split():
+            candidate = f"{current} {word}".strip()
+            if current and font.getlength(candidate) > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        lines.append(current)
+    return lines
+
+
+def render_caption_image(text: str, frame_size: Tuple[int, int], output_path: str, scale: float = 1.0) -> Tuple[int, int]:
+    """
+    Render a caption like add_text_overlay as a transparent PNG.
+
+    Args:
+        text: Caption text
+        frame_size: (width, height) of the video frame
+        output_path: PNG path
+        scale: Font/margin scale factor (preview renders)
+
+    Returns:
+        (x, y) overlay position of the PNG in the frame
+    """
+    frame_width, frame_height = frame_size
+    margin = max(1, int(CAPTION_MARGIN * scale))
+    stroke_width = max(1, int(round(CAPTION_STROKE_WIDTH * scale)))
+    box_width = int(frame_width * CAPTION_WIDTH_RATIO)
+    font = load_font(None, max(8, int(CAPTION_FONT_SIZE * scale)))
+
+    lines = _wrap_caption(text, font, box_width - 2 * margin)
+    wrapped = "\n".join(lines)
+    probe = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    bbox = probe.multiline_textbbox((0, 0), wrapped, font=font, align="center", stroke_width=stroke_width)
+    box_height = (bbox[3] - bbox[1]) + 2 * margin
+
+    image = Image.new("RGBA", (box_width, box_height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.multiline_text(
+        (box_width / 2, margin - bbox[1]),
+        wrapped,
+        font=font,
+        fill=parse_color(CAPTION_COLOR),
+        stroke_width=stroke_width,
+        stroke_fill=parse_color(CAPTION_STROKE_COLOR),
+        align="center",
+        anchor="ma"
+    )
+    image.save(output_path, "PNG")
+    return (frame_width - box_width) // 2, int(frame_height * CAPTION_TOP_RATIO)
+
+
+def plan_video_segments(video_paths: List[str], texts: List[str], target_duration: Optional[float] = None) -> List[TimelineSegment]:
+    """
+    Build the clip timeline the way CreateVideoFile does.
+
+    Args:
+        video_paths: Clips in order (missing files are skipped; captions stay aligned with the list index)
+        texts: Caption per clip index
+        target_duration: Stretch the timeline to this length (use_audio_duration): the
+            last clip is repeated if it is too short, clips are cut if it is too long
+
+    Returns:
+        List of TimelineSegment
+    """
+    segments = []
+    for index, path in enumerate(video_paths):
+        info = probe_media(path) if os.path.exists(path) else None
+        if not info or not info["has_video"] or info["duration"] <= 0:
+            print(f"Warning: {path} not found or not a video. Skipping.")
+            continue
+        caption = str(texts[index]).strip() if index < len(texts) else ""
+        segments.append(TimelineSegment(
+            path=path,
+            duration=info["duration"],
+            source_duration=info["duration"],
+            source_size=(info["width"], info["height"]),
+            caption=caption
+        ))
+
+    if not segments:
+        raise ValueError("No valid video clips found for the timeline")
+    if target_duration is None:
+        return segments
+
+    total = sum(segment.duration for segment in segments)
+    if total < target_duration:
+        last = segments[-1]
+        missing = target_duration - total
+        last.loops = int(math.ceil(missing / last.source_duration))
+        last.duration += missing
+        print(f"Extending timeline from {total:.2f}s to {target_duration:.2f}s ({last.loops} repeats of the last clip)")
+    elif total > target_duration:
+        print(f"Shortening timeline from {total:.2f}s to {target_duration:.2f}s")
+        kept = []
+        elapsed = 0.0
+        for segment in segments:
+            if elapsed >= target_duration:
+                break
+            segment.duration = min(segment.duration, target_duration - elapsed)
+            elapsed += segment.duration
+            kept.append(segment)
+        segments = kept
+    return segments
+
+
+def add_video_segment(plan: FilterGraphPlan, segment: TimelineSegment, sizes: Dict[str, Tuple[int, int]],
+                      fps: float, label: str, caption_scale: float = 1.0) -> Dict[str, str]:
+    """
+    Add one clip to the plan. The source is decoded once (frame rate and duration applied
+    before the split) and every output orientation gets its own resize/caption chain.
+
+    Args:
+        sizes: output name (orientation) -> (width, height)
+
+    Returns:
+        dict: output name -> label of the finished segment
+    """
+    input_args = ["-stream_loop", str(segment.loops)] if segment.loops else []
+    video_input = plan.add_input(*input_args, "-i", segment.path)
+    decoded = (f"[{video_input}:v]fps={fps},trim=duration={segment.duration:.6f},setpts=PTS-STARTPTS")
+    if len(sizes) == 1:
+        plan.add_filter(f"{decoded}[{label}_src_{next(iter(sizes))}]")
+    else:
+        plan.add_filter(f"{decoded},split={len(sizes)}" + "".join(f"[{label}_src_{name}]" for name in sizes))
+
+    labels = {}
+    for name, size in sizes.items():
+        output_label = f"{label}_{name}"
+        chain = f"[{label}_src_{name}]{resize_filter(segment.source_size, size)},setsar=1,format=yuv420p"
+        if not segment.caption:
+            plan.add_filter(f"{chain}[{output_label}]")
+        else:
+            caption_path = scratch_file("caption.png")
+            x, y = render_caption_image(segment.caption, size, caption_path, caption_scale)
+            caption_input = plan.add_input("-loop", "1", "-framerate", str(fps), "-i", caption_path)
+            plan.add_filter(f"{chain}[{output_label}_base]")
+            plan.add_filter(f"[{output_label}_base][{caption_input}:v]overlay={x}:{y}:shortest=1:format=auto,"
+                            f"format=yuv420p[{output_label}]")
+        labels[name] = output_label
+    return labels
+
+
+def add_voice_over_music(plan: FilterGraphPlan, voice_path: str, music_path: str,
+                         before: float, after: float, label: str) -> float:
+    """
+    Add the CreateAudioFile mix (looped music at MUSIC_OVERLAY_VOLUME, voice after `before` seconds,
+    total length before + voice + after) to the plan.
+
+    Returns:
+        float: Duration of the mix in seconds
+    """
+    voice = probe_media(voice_path)
+    if not voice or not voice["has_audio"]:
+        raise FileNotFoundError(f"Voice audio not found: {voice_path}")
+    duration = before + voice["duration"] + after
+
+    voice_input = plan.add_input("-i", voice_path)
+    plan.add_filter(f"[{voice_input}:a]{AUDIO_FORMAT},adelay=delays={int(before * 1000)}:all=1[{label}_voice]")
+
+    if music_path and os.path.exists(music_path):
+        music_input = plan.add_input("-stream_loop", "-1", "-i", music_path)
+        plan.add_filter(f"[{music_input}:a]{AUDIO_FORMAT},volume={MUSIC_OVERLAY_VOLUME},atrim=duration={duration:.6f}[{label}_music]")
+        plan.add_filter(f"[{label}_music][{label}_voice]amix=inputs=2:duration=first:normalize=0,"
+                        f"atrim=duration={duration:.6f}[{label}]")
+    else:
+        print(f"Warning: Music not found: {music_path}")
+        plan.add_filter(f"[{label}_voice]apad=whole_dur={duration:.6f},atrim=duration={duration:.6f}[{label}]")
+    return duration
+
+
+def _greece_timeline_size(orientation: str) -> Tuple[Tuple[int, int], float, float]:
+    """Output size, fps and caption scale, adjusted for an active preview render."""
+    size, _ = get_orientation_size(orientation)
+    preview = get_preview_settings()
+    if preview is None:
+        return size, GREECE_FPS, 1.0
+    return preview.scaled_size(size), min(GREECE_FPS, preview.fps), preview.scale
+
+
+def build_greece_filtergraph(language: str, orientations: Union[str, Sequence[str]], video_config: VideoConfigGreece) -> FilterGraphPlan:
+    """
+    Compile the whole Greece timeline (intro, prompt clips, tail, captions, audio) into one plan.
+    With several orientations every source is decoded once and split into one chain per
+    orientation; the audio is mixed once and shared by all outputs.
+
+    Args:
+        language: Language code ("EN" or "RU")
+        orientations: "horizontal", "vertical" or a list of both
+        video_config: Project configuration
+
+    Returns:
+        FilterGraphPlan with one output per orientation
+    """
+    if isinstance(orientations, str):
+        orientations = [orientations]
+    orientations = list(dict.fromkeys(orientations))
+    paths = video_config.get_greece_paths_for_language_orientation(language, orientations[0])
+    text_column = paths["text_column"]
+    sizes = {}
+    for orientation in orientations:
+        sizes[orientation], fps, caption_scale = _greece_timeline_size(orientation)
+    plan = FilterGraphPlan()
+
+    intro_texts = get_text_columns(video_config.intro_paths["text_overlay_csv"], [text_column])[text_column]
+    main_texts = get_text_columns(
+        [video_config.current_paths["csv"], video_config.tail_paths["text_overlay_csv"]], [text_column]
+    )[text_column]
+
+    # Intro: clips at their own length, audio cut or padded to them
+    intro_segments = plan_video_segments(video_config.get_video_paths_for_workflow("intro"), intro_texts)
+    intro_duration = sum(segment.duration for segment in intro_segments)
+    add_voice_over_music(plan, paths["intro_text_audio"], video_config.intro_paths["music"],
+                         GREECE_INTRO_MUSIC_BEFORE_VOICE, GREECE_INTRO_MUSIC_AFTER_VOICE, "intro_mix")
+    plan.add_filter(f"[intro_mix]apad=whole_dur={intro_duration:.6f},atrim=duration={intro_duration:.6f}[intro_audio]")
+
+    # Main + tail audio: main voice, silence, tail music + voice
+    main_voice = probe_media(paths["main_audio"])
+    if not main_voice or not main_voice["has_audio"]:
+        raise FileNotFoundError(f"Main audio not found: {paths['main_audio']}")
+    main_input = plan.add_input("-i", paths["main_audio"])
+    plan.add_filter(f"[{main_input}:a]{AUDIO_FORMAT}[main_voice]")
+    plan.add_filter(f"anullsrc=r=44100:cl=stereo,atrim=duration={GREECE_TAIL_SILENCE_BETWEEN},{AUDIO_FORMAT}[tail_gap]")
+    tail_duration = add_voice_over_music(plan, paths["tail_text_audio"], video_config.tail_paths["music"],
+                                         GREECE_TAIL_MUSIC_BEFORE_VOICE, GREECE_TAIL_MUSIC_AFTER_VOICE, "tail_mix")
+    main_tail_duration = main_voice["duration"] + GREECE_TAIL_SILENCE_BETWEEN + tail_duration
+
+    # Main + tail clips stretched to the audio (use_audio_duration=True)
+    main_segments = plan_video_segments(video_config.get_video_paths_for_workflow("combined"), main_texts, main_tail_duration)
+
+    segment_labels = [
+        add_video_segment(plan, segment, sizes, fps, f"seg{index}", caption_scale)
+        for index, segment in enumerate(intro_segments + main_segments)
+    ]
+    audio = "[intro_audio][main_voice][tail_gap][tail_mix]concat=n=4:v=0:a=1"
+    if len(orientations) == 1:
+        plan.add_filter(f"{audio}[a_{orientations[0]}]")
+    else:
+        plan.add_filter(f"{audio},asplit={len(orientations)}" + "".join(f"[a_{name}]" for name in orientations))
+
+    total_duration = intro_duration + main_tail_duration
+    for orientation in orientations:
+        labels = [segment[orientation] for segment in segment_labels]
+        plan.add_filter("".join(f"[{label}]" for label in labels) + f"concat=n={len(labels)}:v=1:a=0[v_{orientation}]")
+        plan.outputs.append((orientation, f"v_{orientation}", f"a_{orientation}", total_duration))
+
+    print(f"🧩 Greece filtergraph: {len(segment_labels)} clips decoded once, {len(plan.inputs)} inputs, "
+          f"{total_duration:.2f}s -> " + ", ".join(f"{name} {w}x{h}" for name, (w, h) in sizes.items()))
+    return plan
+
+
+def encode_arguments(fps: float, outputs: int = 1) -> List[str]:
+    """
+    x264/AAC output arguments for a Greece final (draft settings during a preview render).
+    The budget's encoder threads are shared by the `outputs` encoders of one ffmpeg process.
+    """
+    preview = get_preview_settings()
+    x264 = ["-preset", preview.preset, "-crf", str(preview.crf)] if preview else X264_SETTINGS
+    threads = max(1, get_resource_budget().encoder_threads // max(1, outputs))
+    arguments = ["-c:v", "libx264"] + x264 + [
+        "-r", str(fps),
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k",
+        "-movflags", "+faststart",
+        "-threads", str(threads)
+    ]
+    if preview is not None and preview.max_duration > 0:
+        arguments += ["-t", str(preview.max_duration)]
+    return arguments
+
+
+def run_filtergraph(plan: FilterGraphPlan, output_args: List[List[str]]) -> None:
+    """
+    Run ffmpeg for a plan. output_args[i] holds the encode arguments and path of plan.outputs[i].
+    Raises RuntimeError if ffmpeg fails.
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-y"]
+    for input_args in plan.inputs:
+        cmd += input_args
+    cmd += ["-filter_complex", plan.filter_complex]
+    for (_, video_label, audio_label, _), arguments in zip(plan.outputs, output_args):
+        cmd += ["-map", f"[{video_label}]", "-map", f"[{audio_label}]"] + arguments
+
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg filtergraph render failed: {result.stderr[-2000:]}")
+
+
+@instrumented("greece.single_pass")
+@verified_output
+@preview_entry_point
+@budgeted_render(processes=1)
+@job_scratch("greece_single_pass")
+def render_greece_orientations(
+    language: str,
+    orientations: Sequence[str],
+    video_config: VideoConfigGreece,
+    preview: Optional[PreviewSettings] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Render the Greece final videos of several orientations from one decode of the sources
+    (one ffmpeg process, one encoder per orientation).
+
+    Args:
+        language: Language code ("EN" or "RU")
+        orientations: Orientations to render, e.g. ("horizontal", "vertical")
+        video_config: Project configuration
+        preview: Render fast drafts to "*_preview.mp4" instead
+
+    Returns:
+        dict: orientation -> path to the final video, or None if failed
+    """
+    orientations = list(dict.fromkeys(orientations))
+    output_files = {
+        orientation: video_config.get_greece_paths_for_language_orientation(language, orientation)["final_video"]
+        for orientation in orientations
+    }
+    print(f"\n🎬 Single-pass render: {language} " + ", ".join(
+        f"{orientation} -> {os.path.basename(path)}" for orientation, path in output_files.items()))
+
+    try:
+        plan = build_greece_filtergraph(language, orientations, video_config)
+        _, fps, _ = _greece_timeline_size(orientations[0])
+        preview_settings = get_preview_settings()
+        output_args = []
+        for orientation, _, _, duration in plan.outputs:
+            os.makedirs(os.path.dirname(output_files[orientation]), exist_ok=True)
+            output_args.append(encode_arguments(fps, len(plan.outputs)) + [output_files[orientation]])
+            if preview_settings is not None and preview_settings.max_duration > 0:
+                duration = min(duration, preview_settings.max_duration)
+            expect_output(output_files[orientation], duration)
+
+        with metric_span("encode", outputs=len(plan.outputs), engine="filtergraph") as span:
+            run_filtergraph(plan, output_args)
+            for orientation, _, _, duration in plan.outputs:
+                span.add_frames(duration * fps)
+                span.wrote_file(output_files[orientation])
+
+        for path in output_files.values():
+            print(f"🎉 SUCCESS: Final video created: {os.path.basename(path)}")
+        return output_files
+
+    except Exception as e:
+        print(f"❌ FAILED: {language} {', '.join(orientations)} single-pass render failed: {e}")
+        return {orientation: None for orientation in orientations}
+
+
+def render_greece_single_pass(
+    language: str,
+    orientation: str,
+    video_config: VideoConfigGreece,
+    preview: Optional[PreviewSettings] = None
+) -> Optional[str]:
+    """
+    Render one Greece final video in one ffmpeg pass (no intro/audio/main+tail intermediates).
+
+    Returns:
+        str: Path to the final video, or None if failed
+    """
+    return render_greece_orientations(language, [orientation], video_config, preview=preview)[orientation]
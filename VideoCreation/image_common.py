@@ -32,10 +32,9 @@ except ImportError:
     BASE_DIRECTORY = r"C:\NATALIA\Generative AI\auto_channel\Files for SocialVideoBot"
 
 
-def create_image_with_text_overlays_static(
+def compose_image_with_text_overlays(
     image_path: str,
     text_overlays: List[TextOverlay],
-    output_dir: str = os.path.join(BASE_DIRECTORY, "TT", "assets", "portraits with overlays"),
     *,
     # safe area (top, right, bottom, left) in %
     safe_area_pct: Tuple[int, int, int, int] = (5, 6, 14, 6),
@@ -48,16 +47,17 @@ def create_image_with_text_overlays_static(
     max_font_size: int = 100,  # Maximum font size to try
     min_font_size: int = 20,   # Minimum font size
     line_spacing_ratio: float = 1.2,  # Line spacing multiplier
-    center_text_horizontally: bool = True  # NEW: Always center text horizontally in left panel
-) -> str:
+    center_text_horizontally: bool = True,  # Always center text horizontally in left panel
+    target_size: Optional[Tuple[int, int]] = None  # Resize the result to (width, height)
+) -> Optional[Image.Image]:
     """
-    Create a static image with text overlays using PIL.
-    Much more efficient than MoviePy for static image processing.
+    Composite text overlays onto an image in memory, without touching the disk.
+    The returned RGB image can be handed straight to the video stage
+    (e.g. numpy.asarray(img) -> ImageClip) or saved for auditing.
     
     Args:
         image_path: Path to the source image
         text_overlays: List of TextOverlay objects
-        output_dir: Directory to save the result image
         safe_area_pct: Safe area margins (top, right, bottom, left) in %
         panel_split_pct: Where the left panel ends as % of width
         max_text_width_ratio: Maximum text width ratio within the target region
@@ -66,9 +66,10 @@ def create_image_with_text_overlays_static(
         min_font_size: Minimum font size
         line_spacing_ratio: Line spacing multiplier
         center_text_horizontally: If True, always center text horizontally in left panel
+        target_size: Optional (width, height) to resize the composited image to
         
     Returns:
-        str: Path to the created image file, or empty string on error
+        PIL.Image.Image: The composited RGB image, or None on error
     """
     try:
         # Validate input
@@ -194,33 +195,109 @@ def create_image_with_text_overlays_static(
 
         # Combine the original image with the text layer
         final_img = Image.alpha_composite(img, txt_layer)
-        final_img = final_img.convert('RGB')  # Convert back to RGB for saving
+        final_img = final_img.convert('RGB')  # Convert back to RGB for saving/encoding
 
-        # Generate output filename
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Create filename based on first text overlay
-        first_text = text_overlays[0].text if text_overlays else "overlay"
-        safe_text = "".join(c for c in first_text if c.isalnum() or c in (' ', '-', '_')).rstrip()[:30]
-        safe_text = safe_text.replace(' ', '_')
-        
-        input_name = os.path.splitext(os.path.basename(image_path))[0]
-        output_filename = f"{input_name}_{safe_text}_overlay.png"
-        output_path = os.path.join(output_dir, output_filename)
+        # Resize here (once) so the video stage can use the frame as-is
+        if target_size and final_img.size != tuple(target_size):
+            print(f"📐 Resizing composited image to {target_size[0]}x{target_size[1]}")
+            final_img = final_img.resize(tuple(target_size), Image.LANCZOS)
 
-        # Save the image
-        final_img.save(output_path, 'PNG', quality=95)
-        print(f"💾 Saved image with overlays: {output_path}")
-
-        return output_path
+        return final_img
 
     except Exception as e:
-        print(f"❌ Error creating image with overlays: {e}")
+        print(f"❌ Error compositing image with overlays: {e}")
         import traceback
         traceback.print_exc()
+        return None
+
+
+
+def get_overlay_output_path(image_path: str, text_overlays: List[TextOverlay], output_dir: str) -> str:
+    """Build the PNG path used when a composited overlay image is written to disk."""
+    # Create filename based on first text overlay
+    first_text = text_overlays[0].text if text_overlays else "overlay"
+    safe_text = "".join(c for c in first_text if c.isalnum() or c in (' ', '-', '_')).rstrip()[:30]
+    safe_text = safe_text.replace(' ', '_')
+    
+    input_name = os.path.splitext(os.path.basename(image_path))[0]
+    output_filename = f"{input_name}_{safe_text}_overlay.png"
+    return os.path.join(output_dir, output_filename)
+
+
+def save_overlay_image(image: Image.Image, output_path: str) -> str:
+    """
+    Save a composited overlay image (audit/side output).
+    
+    Returns:
+        str: Path to the saved image, or empty string on error
+    """
+    try:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        image.save(output_path, 'PNG', quality=95)
+        print(f"💾 Saved image with overlays: {output_path}")
+        return output_path
+    except Exception as e:
+        print(f"❌ Error saving image with overlays: {e}")
         return ""
 
 
+def create_image_with_text_overlays_static(
+    image_path: str,
+    text_overlays: List[TextOverlay],
+    output_dir: str = os.path.join(BASE_DIRECTORY, "TT", "assets", "portraits with overlays"),
+    *,
+    # safe area (top, right, bottom, left) in %
+    safe_area_pct: Tuple[int, int, int, int] = (5, 6, 14, 6),
+    # where the left panel ends, as % of width (e.g., your portrait starts at ~62%)
+    panel_split_pct: float = 62.0,
+    # cap text wrapping width within the target region
+    max_text_width_ratio: float = 0.90,
+    # Font settings
+    font_path: str = None,  # Path to TTF font file, None for default
+    max_font_size: int = 100,  # Maximum font size to try
+    min_font_size: int = 20,   # Minimum font size
+    line_spacing_ratio: float = 1.2,  # Line spacing multiplier
+    center_text_horizontally: bool = True  # NEW: Always center text horizontally in left panel
+) -> str:
+    """
+    Create a static image with text overlays using PIL and save it as PNG.
+    Use compose_image_with_text_overlays() to get the image in memory instead.
+    
+    Args:
+        image_path: Path to the source image
+        text_overlays: List of TextOverlay objects
+        output_dir: Directory to save the result image
+        safe_area_pct: Safe area margins (top, right, bottom, left) in %
+        panel_split_pct: Where the left panel ends as % of width
+        max_text_width_ratio: Maximum text width ratio within the target region
+        font_path: Path to TTF font file (optional)
+        max_font_size: Maximum font size to try
+        min_font_size: Minimum font size
+        line_spacing_ratio: Line spacing multiplier
+        center_text_horizontally: If True, always center text horizontally in left panel
+        
+    Returns:
+        str: Path to the created image file, or empty string on error
+    """
+    final_img = compose_image_with_text_overlays(
+        image_path=image_path,
+        text_overlays=text_overlays,
+        safe_area_pct=safe_area_pct,
+        panel_split_pct=panel_split_pct,
+        max_text_width_ratio=max_text_width_ratio,
+        font_path=font_path,
+        max_font_size=max_font_size,
+        min_font_size=min_font_size,
+        line_spacing_ratio=line_spacing_ratio,
+        center_text_horizontally=center_text_horizontally
+    )
+    if final_img is None:
+        return ""
+
+    output_path = get_overlay_output_path(image_path, text_overlays, output_dir)
+    return save_overlay_image(final_img, output_path)
+
+
 def fit_text_to_region(
     text: str,
     max_width: int,
@@ -0,0 +1,367 @@
+"""
+Preflight validation of every asset a batch will read, before any encoding starts.
+
+Missing or broken inputs used to surface mid-render, one entry at a time (an
+os.path.exists just before each TimelessTales render, a broken Greece intro only
+at step 6). A preflight collects the assets of a whole tracker or set of Greece
+projects, checks them concurrently on a thread pool and prints one report:
+
+- every file: exists and is not empty
+- audio/video: probes (ffprobe header read, no decode; MoviePy's bundled ffmpeg
+  when ffprobe is not installed), duration > 0, expected streams present, video
+  resolution (a warning when smaller than the output)
+- images: open and verify with PIL
+- CSV tables: readable, required text columns present, row counts
+
+Run it from the command line:
+
+    python preflight.py tracker TT/TimelessTales_Video_Tracker.xlsx
+    python preflight.py greece 3_Hector 4_Athena [--colab]
+
+render_greece_projects and process_video_entries run it first (preflight=True)
+and skip the projects/entries it rejects.
+"""
+
+import os
+import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from PIL import Image
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from config import VideoConfigGreece, preview_output_path
+from video_common import probe_media, read_text_table, VideoOverlayEntry
+
+DEFAULT_PREFLIGHT_WORKERS = 8  # Checks wait on ffprobe and file I/O, not the CPU
+COMMON_OWNER = "Common_Artifacts"
+GREECE_TEXT_COLUMNS = {"EN": "english_text", "RU": "russian_text"}
+
+_ffprobe_available: Optional[bool] = None
+_ffprobe_lock = threading.Lock()
+
+
+@dataclass
+class AssetCheck:
+    """
+    One asset to validate.
+
+    Args:
+        path: File path
+        kind: "video", "audio", "image" or "csv"
+        owner: Project/entry the asset belongs to (report grouping, skip decisions)
+        role: What the asset is used for, e.g. "voice-over EN"
+        require_audio: Videos must have an audio track
+        min_size: Warn when a video/image is smaller than this (width, height)
+        columns: Required CSV columns
+        min_rows: Warn when a CSV has fewer rows
+    """
+    path: str
+    kind: str
+    owner: str
+    role: str = ""
+    require_audio: bool = False
+    min_size: Optional[Tuple[int, int]] = None
+    columns: Tuple[str, ...] = ()
+    min_rows: int = 1
+
+
+@dataclass
+class AssetResult:
+    """Outcome of one AssetCheck."""
+    check: AssetCheck
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    duration: float = 0.0
+    size: Tuple[int, int] = (0, 0)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+@dataclass
+class PreflightReport:
+    """All results of one preflight run."""
+    results: List[AssetResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self.results)
+
+    def failed_owners(self) -> Set[str]:
+        """Owners with at least one failed asset."""
+        return {result.check.owner for result in self.results if not result.ok}
+
+    def print_summary(self) -> None:
+        """Print errors and warnings grouped by owner, then the totals."""
+        by_owner: Dict[str, List[AssetResult]] = {}
+        for result in self.results:
+            by_owner.setdefault(result.check.owner, []).append(result)
+
+        print("\n" + "=" * 70)
+        print("🛫 PREFLIGHT REPORT")
+        print("=" * 70)
+        for owner, results in by_owner.items():
+            errors = [result for result in results if result.errors]
+            warnings = [result for result in results if result.warnings]
+            status = "❌" if errors else ("⚠️" if warnings else "✅")
+            print(f"   {status} {owner}: {len(results)} assets, {len(errors)} failed")
+            for result in errors + warnings:
+                label = f"{result.check.role or result.check.kind} ({os.path.basename(result.check.path)})"
+                for message in result.errors:
+                    print(f"      ❌ {label}: {message}")
+                for message in result.warnings:
+                    print(f"      ⚠️ {label}: {message}")
+
+        failed = sum(1 for result in self.results if not result.ok)
+        print(f"\n🎯 Checked {len(self.results)} assets in {self.elapsed:.1f}s: "
+              f"{failed} failed, {len(self.failed_owners())}/{len(by_owner)} owners blocked")
+
+
+def _ffprobe_found() -> bool:
+    """True if ffprobe is on PATH (looked up once, a missing ffprobe is reported once)."""
+    global _ffprobe_available
+    with _ffprobe_lock:
+        if _ffprobe_available is None:
+            _ffprobe_available = shutil.which("ffprobe") is not None
+            if not _ffprobe_available:
+                print("⚠️ ffprobe not found on PATH - preflight reads media headers with MoviePy's ffmpeg instead")
+        return _ffprobe_available
+
+
+def _probe_with_moviepy(path: str) -> Optional[dict]:
+    """probe_media subset (duration, streams, size) from MoviePy's ffmpeg header parse."""
+    try:
+        infos = ffmpeg_parse_infos(path)
+    except Exception as e:
+        print(f"❌ ffmpeg could not read {path}: {e}")
+        return None
+    width, height = infos.get("video_size") or (0, 0)
+    if infos.get("video_rotation", 0) % 180:
+        width, height = height, width
+    return {
+        "duration": float(infos.get("duration") or 0),
+        "has_video": bool(infos.get("video_found")),
+        "has_audio": bool(infos.get("audio_found")),
+        "width": int(width),
+        "height": int(height),
+    }
+
+
+def probe_asset(path: str) -> Optional[dict]:
+    """probe_media with ffprobe, or MoviePy's ffmpeg when ffprobe is not installed."""
+    return probe_media(path) if _ffprobe_found() else _probe_with_moviepy(path)
+
+
+def check_asset(check: AssetCheck) -> AssetResult:
+    """Validate one asset (see AssetCheck); never raises."""
+    result = AssetResult(check=check)
+    try:
+        if not check.path or not os.path.exists(check.path):
+            result.errors.append("file not found")
+            return result
+        if os.path.getsize(check.path) == 0:
+            result.errors.append("file is empty")
+            return result
+
+        if check.kind in ("video", "audio"):
+            info = probe_asset(check.path)
+            if info is None:
+                result.errors.append("cannot be probed (corrupt or unsupported)")
+                return result
+            result.duration = info["duration"]
+            result.size = (info["width"], info["height"])
+            if result.duration <= 0:
+                result.errors.append("duration is 0")
+            if check.kind == "video" and not info["has_video"]:
+                result.errors.append("no video stream")
+            if (check.kind == "audio" or check.require_audio) and not info["has_audio"]:
+                result.errors.append("no audio stream")
+
+        elif check.kind == "image":
+            with Image.open(check.path) as image:
+                result.size = image.size
+                image.verify()
+
+        elif check.kind == "csv":
+            table = read_text_table(check.path)
+            if table is None:
+                result.errors.append("cannot be read")
+                return result
+            missing = [column for column in check.columns if column not in table.columns]
+            if missing:
+                result.errors.append(f"missing columns: {', '.join(missing)}")
+            if len(table) < check.min_rows:
+                message = f"{len(table)} rows, expected at least {check.min_rows}"
+                (result.errors if len(table) == 0 else result.warnings).append(message)
+
+        if check.min_size and result.size[0] and (result.size[0] < check.min_size[0] or result.size[1] < check.min_size[1]):
+            result.warnings.append(f"{result.size[0]}x{result.size[1]} is smaller than the "
+                                   f"{check.min_size[0]}x{check.min_size[1]} output (will be upscaled)")
+
+    except Exception as e:
+        result.errors.append(f"check failed: {e}")
+    return result
+
+
+def run_preflight(checks: Iterable[AssetCheck], max_workers: int = DEFAULT_PREFLIGHT_WORKERS, report: bool = True) -> PreflightReport:
+    """
+    Validate all assets concurrently.
+
+    Args:
+        checks: Assets to validate
+        max_workers: Concurrent checks
+        report: Print the report
+
+    Returns:
+        PreflightReport
+    """
+    checks = list(checks)
+    started = time.perf_counter()
+    print(f"🛫 Preflight: checking {len(checks)} assets with {max_workers} workers...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(check_asset, checks))
+    preflight_report = PreflightReport(results=results, elapsed=time.perf_counter() - started)
+    if report:
+        preflight_report.print_summary()
+    return preflight_report
+
+
+def tracker_entry_label(entry: VideoOverlayEntry) -> str:
+    """Owner label of a TimelessTales tracker entry in preflight reports."""
+    return os.path.basename(entry.output_video_path or entry.image_path)
+
+
+def tracker_checks(entries: Iterable[VideoOverlayEntry]) -> List[AssetCheck]:
+    """Assets of TimelessTales tracker entries (image, audio, optional head/tail videos)."""
+    checks = []
+    for entry in entries:
+        owner = tracker_entry_label(entry)
+        checks.append(AssetCheck(entry.image_path, "image", owner, "image"))
+        checks.append(AssetCheck(entry.audio_path, "audio", owner, "audio"))
+        if entry.head_video_path:
+            checks.append(AssetCheck(entry.head_video_path, "video", owner, "head video"))
+        if entry.tail_video_path:
+            checks.append(AssetCheck(entry.tail_video_path, "video", owner, "tail video"))
+    return checks
+
+
+def greece_common_checks(
+    video_config: VideoConfigGreece,
+    languages: Sequence[str],
+    orientations: Sequence[str],
+    build_common: bool = True,
+    preview: bool = False
+) -> List[AssetCheck]:
+    """
+    Intro/tail sources of the Greece workflow; with build_common=False the existing
+    Common_Artifacts outputs (intro/tail audio, intro videos) instead of their sources.
+    A preview run builds a missing preview intro video from the intro audio, so only
+    an existing one is checked.
+    """
+    columns = tuple(GREECE_TEXT_COLUMNS[language.upper()] for language in languages)
+    checks = []
+    for name, table in (("intro", video_config.intro_paths), ("tail", video_config.tail_paths)):
+        if not build_common and name == "intro":
+            continue  # Only the tail sources are read again (step 5 clips)
+        checks.append(AssetCheck(table["text_overlay_csv"], "csv", COMMON_OWNER, f"{name} texts", columns=columns))
+        for path in table["video_paths"]:
+            checks.append(AssetCheck(path, "video", COMMON_OWNER, f"{name} clip"))
+        if build_common:
+            checks.append(AssetCheck(table["music"], "audio", COMMON_OWNER, f"{name} music"))
+            checks += [AssetCheck(table[f"text_audio_{language.lower()}"], "audio", COMMON_OWNER, f"{name} voice {language}")
+                       for language in languages]
+
+    if not build_common:
+        for language in languages:
+            checks.append(AssetCheck(video_config.intro_paths[f"audio_{language.lower()}"], "audio", COMMON_OWNER, f"intro audio {language}"))
+            checks.append(AssetCheck(video_config.tail_paths[f"audio_{language.lower()}"], "audio", COMMON_OWNER, f"tail audio {language}"))
+            for orientation in orientations:
+                intro_video = video_config.intro_paths[f"output_{language.lower()}_{orientation}"]
+                if preview:
+                    intro_video = preview_output_path(intro_video)
+                    if not os.path.exists(intro_video):
+                        continue
+                checks.append(AssetCheck(intro_video, "video", COMMON_OWNER,
+                                         f"intro video {language} {orientation}", require_audio=True))
+    return checks
+
+
+def greece_project_checks(video_config: VideoConfigGreece, languages: Sequence[str], orientations: Sequence[str]) -> List[AssetCheck]:
+    """Source clips, voice-overs and text CSV of the config's current project."""
+    owner = video_config.current_project_dir
+    clips = list(video_config.current_paths["video_paths"])
+    min_size = (1080, 1080) if len(set(orientations)) > 1 else ((1920, 1080) if orientations[0] == "horizontal" else (1080, 1920))
+    checks = [AssetCheck(path, "video", owner, f"clip {os.path.splitext(os.path.basename(path))[0]}", min_size=min_size)
+              for path in clips]
+    checks += [AssetCheck(video_config.current_paths[f"audio_{language.lower()}"], "audio", owner, f"voice-over {language}")
+               for language in languages]
+    checks.append(AssetCheck(video_config.current_paths["csv"], "csv", owner, "video texts",
+                             columns=tuple(GREECE_TEXT_COLUMNS[language.upper()] for language in languages),
+                             min_rows=len(clips)))
+    return checks
+
+
+def preflight_greece(
+    base_config: VideoConfigGreece,
+    project_dirs: Sequence[str],
+    languages: Sequence[str] = ("EN", "RU"),
+    orientations: Sequence[str] = ("horizontal", "vertical"),
+    build_common: bool = True,
+    preview: bool = False,
+    max_workers: int = DEFAULT_PREFLIGHT_WORKERS
+) -> PreflightReport:
+    """
+    Preflight Greece projects (owners: the project directories and "Common_Artifacts").
+
+    Args:
+        base_config: Configuration providing the base paths
+        project_dirs: Project directory names
+        languages: Language codes to be rendered
+        orientations: Orientations to be rendered
+        build_common: The run rebuilds the Common_Artifacts (check their sources instead)
+        preview: Check the preview intro videos when build_common is False
+        max_workers: Concurrent checks
+    """
+    checks = greece_common_checks(base_config, languages, orientations, build_common, preview)
+    for project_dir in project_dirs:
+        checks += greece_project_checks(base_config.with_project(project_dir), languages, orientations)
+    return run_preflight(checks, max_workers)
+
+
+def preflight_tracker(excel_path: str, status_filter: Optional[str] = "todo", max_workers: int = DEFAULT_PREFLIGHT_WORKERS) -> PreflightReport:
+    """Preflight the entries of a TimelessTales tracker (owners: tracker_entry_label)."""
+    from TimelessTales import load_tt_entries_from_excel
+
+    return run_preflight(tracker_checks(load_tt_entries_from_excel(excel_path, status_filter=status_filter)), max_workers)
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    from config import get_local_config, get_colab_config
+
+    parser = argparse.ArgumentParser(description="Validate every asset of a tracker or Greece projects before rendering")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    tracker_parser = subparsers.add_parser("tracker", help="TimelessTales Excel tracker")
+    tracker_parser.add_argument("excel_path")
+    tracker_parser.add_argument("--all", action="store_true", help="Check every row, not only the todo rows")
+    greece_parser = subparsers.add_parser("greece", help="Greece projects")
+    greece_parser.add_argument("projects", nargs="+", help="Project directories, e.g. 3_Hector")
+    greece_parser.add_argument("--colab", action="store_true", help="Use the Colab Drive paths")
+    greece_parser.add_argument("--reuse-common", action="store_true", help="Check the built Common_Artifacts instead of their sources")
+    parser.add_argument("--workers", type=int, default=DEFAULT_PREFLIGHT_WORKERS)
+    args = parser.parse_args()
+
+    if args.command == "tracker":
+        result = preflight_tracker(args.excel_path, status_filter=None if args.all else "todo", max_workers=args.workers)
+    else:
+        config = (get_colab_config if args.colab else get_local_config)(args.projects[0])
+        result = preflight_greece(config, args.projects, build_common=not args.reuse_common, max_workers=args.workers)
+    sys.exit(0 if result.ok else 1)
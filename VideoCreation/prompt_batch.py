@@ -0,0 +1,419 @@
+"""
+Batch rendering for PromptRecord trackers.
+
+Production-ready records are grouped by their shared head/tail branding assets.
+Each distinct head and tail segment (including the comic-image tail) is rendered
+once per batch, only the per-record middle segment is rendered per prompt, and the
+final videos are assembled with FFmpeg stream-copy concatenation.
+"""
+
+import os
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from moviepy.video.io.VideoFileClip import VideoFileClip
+from moviepy.video.VideoClip import TextClip, ImageClip, ColorClip
+from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
+from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.audio.AudioClip import AudioClip, CompositeAudioClip, concatenate_audioclips
+from moviepy import concatenate_videoclips
+import numpy as np
+import traceback
+
+from config import PreviewSettings, budgeted_render, preview_entry_point, preview_output_path
+from scratch_space import job_scratch
+from render_metrics import instrumented, metric_span
+from render_verify import verified_output, expect_output, is_verified_output
+from PromptRecord import PromptRecord, PromptRecordStore
+from video_common import (
+    DEFAULT_FONT,
+    get_youtube_optimized_settings,
+    apply_preview_to_clip,
+    auto_resize_video_clip,
+    resize_video_maintain_aspect,
+    resolve_path,
+    concatenate_videos_ffmpeg,
+    concatenate_videos_ffmpeg_with_reencoding
+)
+
+# (video path, music path)
+HeadKey = Tuple[str, str]
+# (video path, music path, comic image path)
+TailKey = Tuple[str, str, str]
+
+SEGMENT_AUDIO_FPS = 44100
+
+
+def resolve_record_asset(path: str, assets_base: str) -> str:
+    """
+    Resolve a tracker asset path such as '/Assets/Intro/intro.mp4' against assets_base.
+    Tracker paths are written relative to the assets root even when they start with '/'.
+    """
+    if not path or not path.strip():
+        return ""
+    path = path.strip()
+    if os.path.exists(path):
+        return path
+    return resolve_path(path.lstrip("/\\"), assets_base)
+
+
+def group_records_by_branding(
+    records: List[PromptRecord],
+    assets_base: str
+) -> Dict[Tuple[HeadKey, TailKey], List[PromptRecord]]:
+    """
+    Group records by the head and tail assets they share.
+
+    Args:
+        records: Records to group
+        assets_base: Root directory the tracker asset paths are relative to
+
+    Returns:
+        dict: (head_key, tail_key) -> list of records, in tracker order
+    """
+    groups: Dict[Tuple[HeadKey, TailKey], List[PromptRecord]] = {}
+    for record in records:
+        head_key = (
+            resolve_record_asset(record.head_video_path, assets_base),
+            resolve_record_asset(record.head_music_path, assets_base)
+        )
+        tail_key = (
+            resolve_record_asset(record.tail_video_path, assets_base),
+            resolve_record_asset(record.tail_music_path, assets_base),
+            resolve_record_asset(record.tail_comic_image_path, assets_base)
+        )
+        groups.setdefault((head_key, tail_key), []).append(record)
+    return groups
+
+
+def _segment_filename(prefix: str, key: tuple, size: Tuple[int, int], extra: str = "") -> str:
+    """Stable segment filename derived from its source assets and render size."""
+    digest = hashlib.sha1(repr((key, size, extra)).encode("utf-8")).hexdigest()[:12]
+    return f"{prefix}_{size[0]}x{size[1]}_{digest}.mp4"
+
+
+def _is_up_to_date(output_file: str, sources: List[str]) -> bool:
+    """True if output_file exists, is newer than every existing source file and passed verification."""
+    if not os.path.exists(output_file):
+        return False
+    output_mtime = os.path.getmtime(output_file)
+    if not all(os.path.getmtime(src) <= output_mtime for src in sources if src and os.path.exists(src)):
+        return False
+    return is_verified_output(output_file)
+
+
+def _fit_music(music: AudioFileClip, duration: float):
+    """Loop or trim music to exactly `duration` seconds. Returns (fitted_clip, looped_clip_or_None)."""
+    if music.duration < duration:
+        loops_needed = int(duration / music.duration) + 1
+        looped = concatenate_audioclips([music] * loops_needed)
+        return looped.subclipped(0, duration), looped
+    return music.subclipped(0, duration), None
+
+
+def _silence(duration: float) -> AudioClip:
+    """Silent stereo track at SEGMENT_AUDIO_FPS."""
+    return AudioClip(lambda t: np.zeros((len(t), 2) if np.ndim(t) else 2), duration=duration, fps=SEGMENT_AUDIO_FPS)
+
+
+@instrumented()
+@verified_output
+@budgeted_render(processes=4)  # video reader, music reader, writer (+ audio mux)
+@job_scratch()
+def render_branding_segment(
+    video_path: str,
+    music_path: str,
+    output_file: str,
+    size: Tuple[int, int],
+    comic_image_path: str = "",
+    comic_image_duration: float = 3.0,
+    segment_name: str = "Head",
+    preview_boundaries: Optional[List[float]] = None
+) -> bool:
+    """
+    Render a shared head or tail segment: the branding video, optionally followed by a
+    comic still image, with the branding music as its soundtrack. Without music the
+    segment keeps the video's own sound over a silent stereo track: stream-copy
+    concatenation takes the stream layout from the first input, so every segment
+    needs an audio track.
+
+    Args:
+        video_path: Branding video
+        music_path: Music for the whole segment (looped/trimmed to fit)
+        output_file: Segment output path
+        size: Output (width, height)
+        comic_image_path: Optional still image shown after the video (tail comic)
+        comic_image_duration: How long the comic image is shown in seconds
+        segment_name: Name for logging purposes
+        preview_boundaries: Boundary times kept in boundary-window preview renders
+            (float("inf") = end of the segment)
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    video_clip = None
+    resized_clip = None
+    comic_clip = None
+    segment_clip = None
+    music = None
+    music_looped = None
+    music_fitted = None
+    fallback_audio = None
+    final_clip = None
+
+    try:
+        print(f"🎬 Rendering shared {segment_name.lower()} segment: {os.path.basename(output_file)}")
+
+        video_clip = VideoFileClip(video_path)
+        resized_clip = auto_resize_video_clip(video_clip, size[0], size[1])
+
+        parts = [resized_clip]
+        if comic_image_path and os.path.exists(comic_image_path):
+            print(f"🖼️ Adding comic image: {os.path.basename(comic_image_path)}")
+            comic_clip = resize_video_maintain_aspect(
+                ImageClip(comic_image_path, duration=comic_image_duration),
+                size[0], size[1], "letterbox"
+            )
+            parts.append(comic_clip)
+        elif comic_image_path:
+            print(f"Warning: Comic image not found: {comic_image_path}")
+
+        segment_clip = concatenate_videoclips(parts, method="compose") if len(parts) > 1 else resized_clip
+
+        if music_path and os.path.exists(music_path):
+            music = AudioFileClip(music_path)
+            music_fitted, music_looped = _fit_music(music, segment_clip.duration)
+            final_clip = segment_clip.with_audio(music_fitted)
+        else:
+            if music_path:
+                print(f"Warning: {segment_name} music not found: {music_path}")
+            fallback_audio = _silence(segment_clip.duration)
+            if segment_clip.audio is not None:
+                fallback_audio = CompositeAudioClip([fallback_audio, segment_clip.audio])
+            final_clip = segment_clip.with_audio(fallback_audio)
+
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        final_clip = apply_preview_to_clip(final_clip, preview_boundaries)
+        expect_output(output_file, final_clip.duration)
+        with metric_span("encode", output=os.path.basename(output_file)) as span:
+            final_clip.write_videofile(output_file, **get_youtube_optimized_settings(silent=True))
+            span.wrote_file(output_file)
+
+        print(f"✅ {segment_name} segment created: {os.path.basename(output_file)} ({final_clip.duration:.2f}s)")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error rendering {segment_name.lower()} segment: {e}")
+        traceback.print_exc()
+        return False
+
+    finally:
+        for clip in [final_clip, fallback_audio, music_fitted, music_looped, music, segment_clip, comic_clip, resized_clip, video_clip]:
+            if clip is not None:
+                try:
+                    clip.close()
+                except:
+                    pass
+
+
+@instrumented()
+@verified_output
+@budgeted_render(processes=2)  # voiceover reader + writer
+@job_scratch()
+def render_middle_segment(
+    record: PromptRecord,
+    output_file: str,
+    size: Tuple[int, int],
+    assets_base: str,
+    background_color: Tuple[int, int, int] = (0, 0, 0),
+    background_image_path: Optional[str] = None
+) -> bool:
+    """
+    Render the per-record middle segment: background, the record's text elements and
+    its voiceover. Text offsets are in pixels relative to the frame center.
+
+    Args:
+        record: The PromptRecord to render
+        output_file: Segment output path
+        size: Output (width, height)
+        assets_base: Root directory the tracker asset paths are relative to
+        background_color: Solid background color when no background image is given
+        background_image_path: Optional background image (letterboxed to size)
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    audio = None
+    background = None
+    text_clips = []
+    composite = None
+    final_clip = None
+
+    try:
+        voiceover_path = resolve_record_asset(record.voiceover_path, assets_base)
+        if not os.path.exists(voiceover_path):
+            raise FileNotFoundError(f"Voiceover not found: {voiceover_path}")
+
+        audio = AudioFileClip(voiceover_path)
+        duration = audio.duration
+
+        if background_image_path and os.path.exists(background_image_path):
+            background = resize_video_maintain_aspect(
+                ImageClip(background_image_path, duration=duration), size[0], size[1], "letterbox"
+            )
+        else:
+            background = ColorClip(size=size, color=background_color, duration=duration)
+
+        for element in record.text_elements:
+            txt_clip = TextClip(
+                text=element.text,
+                font=DEFAULT_FONT,
+                font_size=element.font_size,
+                color=element.color,
+                stroke_color=element.stroke_color,
+                stroke_width=element.stroke_width,
+                method="caption",
+                size=(int(size[0] * 0.9), None),
+                text_align="center"
+            ).with_duration(duration)
+            x = (size[0] - txt_clip.w) // 2 + element.hor_offset
+            y = (size[1] - txt_clip.h) // 2 + element.vert_offset
+            text_clips.append(txt_clip.with_position((x, y)))
+
+        composite = CompositeVideoClip([background] + text_clips, size=size).with_duration(duration)
+        final_clip = composite.with_audio(audio)
+
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        final_clip = apply_preview_to_clip(final_clip, [0, float("inf")])  # Joins the head and the tail
+        expect_output(output_file, final_clip.duration)
+        with metric_span("encode", output=os.path.basename(output_file)) as span:
+            final_clip.write_videofile(output_file, **get_youtube_optimized_settings(silent=True))
+            span.wrote_file(output_file)
+
+        print(f"✅ Middle segment created for prompt {record.prompt_id}: {duration:.2f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error rendering middle segment for prompt {record.prompt_id}: {e}")
+        traceback.print_exc()
+        return False
+
+    finally:
+        for clip in [final_clip, composite, background, audio] + text_clips:
+            if clip is not None:
+                try:
+                    clip.close()
+                except:
+                    pass
+
+
+def _output_filename(record: PromptRecord) -> str:
+    """Output filename for a record's final video."""
+    safe_title = "".join(c for c in record.prompt_title if c.isalnum() or c in (' ', '-', '_')).strip()[:40]
+    return f"prompt_{record.prompt_id}_{safe_title.replace(' ', '_')}.mp4"
+
+
+@preview_entry_point
+def render_prompt_records(
+    records: List[PromptRecord],
+    output_dir: str,
+    assets_base: str,
+    size: Tuple[int, int] = (1920, 1080),
+    comic_image_duration: float = 3.0,
+    background_color: Tuple[int, int, int] = (0, 0, 0),
+    keep_middle_segments: bool = False,
+    preview: Optional[PreviewSettings] = None
+) -> List[str]:
+    """
+    Render all production-ready records, building each distinct head/tail segment once.
+
+    Args:
+        records: Records to render (non-ready records are skipped)
+        output_dir: Directory for final videos; shared segments go to output_dir/segments
+        assets_base: Root directory the tracker asset paths are relative to
+        size: Output (width, height)
+        comic_image_duration: Seconds the tail comic image is shown
+        background_color: Background of the middle segment
+        keep_middle_segments: Keep per-record middle segments after assembly
+        preview: Render fast drafts; every segment and video gets a "_preview" name,
+            so draft segments are never reused by full renders
+
+    Returns:
+        List of created video paths
+    """
+    ready = [record for record in records if record.is_ready_for_production()]
+    print(f"🎬 Batch rendering {len(ready)} production-ready records (of {len(records)})")
+    if not ready:
+        return []
+
+    segments_dir = os.path.join(output_dir, "segments")
+    head_segments: Dict[HeadKey, Optional[str]] = {}
+    tail_segments: Dict[TailKey, Optional[str]] = {}
+    created_videos = []
+
+    groups = group_records_by_branding(ready, assets_base)
+    print(f"🔗 {len(groups)} head/tail groups, {len(set(k[0] for k in groups))} distinct heads, "
+          f"{len(set(k[1] for k in groups))} distinct tails")
+
+    # Draft segments are re-rendered every preview run (the preview settings may have changed)
+    def output_name(path: str) -> str:
+        return preview_output_path(path) if preview else path
+
+    for (head_key, tail_key), group in groups.items():
+        # Shared head segment (built once per batch)
+        if head_key not in head_segments:
+            head_file = output_name(os.path.join(segments_dir, _segment_filename("head", head_key, size)))
+            if (not preview and _is_up_to_date(head_file, list(head_key))) or render_branding_segment(
+                    head_key[0], head_key[1], head_file, size, segment_name="Head",
+                    preview_boundaries=[float("inf")]):
+                head_segments[head_key] = head_file
+            else:
+                head_segments[head_key] = None
+
+        # Shared tail segment, including the comic image (built once per batch)
+        if tail_key not in tail_segments:
+            tail_file = output_name(os.path.join(segments_dir, _segment_filename("tail", tail_key, size, str(comic_image_duration))))
+            if (not preview and _is_up_to_date(tail_file, list(tail_key))) or render_branding_segment(
+                    tail_key[0], tail_key[1], tail_file, size,
+                    comic_image_path=tail_key[2], comic_image_duration=comic_image_duration, segment_name="Tail",
+                    preview_boundaries=[0]):
+                tail_segments[tail_key] = tail_file
+            else:
+                tail_segments[tail_key] = None
+
+        head_file = head_segments[head_key]
+        tail_file = tail_segments[tail_key]
+        if not head_file or not tail_file:
+            print(f"❌ Skipping {len(group)} records: shared head/tail segment failed")
+            continue
+
+        for record in group:
+            middle_file = output_name(os.path.join(segments_dir, f"middle_{record.prompt_id}.mp4"))
+            output_file = output_name(os.path.join(output_dir, _output_filename(record)))
+            try:
+                if not render_middle_segment(record, middle_file, size, assets_base, background_color):
+                    continue
+
+                # All segments share the same encode settings, so stream copy is enough
+                if not concatenate_videos_ffmpeg([head_file, middle_file, tail_file], output_file):
+                    print("⚠️ Stream-copy concat failed, falling back to re-encoding")
+                    if not concatenate_videos_ffmpeg_with_reencoding([head_file, middle_file, tail_file], output_file):
+                        continue
+
+                created_videos.append(output_file)
+                print(f"✅ Created video for prompt {record.prompt_id}: {os.path.basename(output_file)}")
+            finally:
+                if not keep_middle_segments and os.path.exists(middle_file):
+                    try:
+                        os.remove(middle_file)
+                    except Exception as e:
+                        print(f"⚠️ Could not remove middle segment {middle_file}: {e}")
+
+    print(f"🎉 Batch completed: {len(created_videos)}/{len(ready)} videos created")
+    return created_videos
+
+
+def render_prompt_tracker(excel_path: str, output_dir: str, assets_base: str, **kwargs) -> List[str]:
+    """Load a prompt tracker and render all its production-ready records."""
+    store = PromptRecordStore.from_excel(excel_path)
+    return render_prompt_records(store.ready_for_production(), output_dir, assets_base, **kwargs)
@@ -0,0 +1,263 @@
+"""
+Lightweight stage-level timing and throughput instrumentation.
+
+Every pipeline stage and public video_common function records a span with wall
+and CPU time, frames processed, encode fps and bytes read/written. Spans can be
+exported as JSON lines to compare runs and spot regressions. Set the
+VIDEO_METRICS_PATH environment variable to append every finished span to a file
+automatically. Only the most recent MAX_RECORDED_SPANS spans are kept in memory.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import inspect
+import functools
+import threading
+import contextvars
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+METRICS_PATH_ENV = "VIDEO_METRICS_PATH"
+
+# In-memory span history; older spans are dropped (long Colab sessions, big batches)
+MAX_RECORDED_SPANS = 10000
+
+# One id per process run, so spans from different runs can be told apart in one file
+RUN_ID = uuid.uuid4().hex[:12]
+
+# Argument names that hold input/output file paths in the render functions
+INPUT_ARGUMENT_NAMES = {
+    "image_path", "audio_path", "audio_paths", "video_path", "video_paths", "voice_path",
+    "csv_path", "csv_paths", "excel_path", "path", "music_overlay_path", "text_audio_overlay_path",
+    "head_video_path", "tail_video_path"
+}
+OUTPUT_ARGUMENT_NAMES = {"output_file", "output_path"}
+
+_spans: deque = deque(maxlen=MAX_RECORDED_SPANS)
+_spans_lock = threading.Lock()
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """Timing and throughput record for one stage or function call."""
+    name: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    parent_id: Optional[str] = None
+    run_id: str = RUN_ID
+    thread: str = ""
+    started_at: float = 0.0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0             # CPU time of the calling thread
+    child_cpu_s: float = 0.0       # CPU time of finished subprocesses (ffmpeg); process-wide, approximate in parallel runs
+    frames: int = 0
+    encode_fps: float = 0.0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    status: str = "ok"
+    error: str = ""
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def add_frames(self, frames: int) -> None:
+        self.frames += int(frames)
+
+    def add_bytes_read(self, count: int) -> None:
+        self.bytes_read += int(count)
+
+    def add_bytes_written(self, count: int) -> None:
+        self.bytes_written += int(count)
+
+    def read_file(self, path: str) -> None:
+        """Count the size of an input file as bytes read."""
+        self.bytes_read += _file_size(path)
+
+    def wrote_file(self, path: str) -> None:
+        """Count the size of an output file as bytes written."""
+        self.bytes_written += _file_size(path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _file_size(path: Any) -> int:
+    try:
+        if isinstance(path, str) and path and os.path.isfile(path):
+            return os.path.getsize(path)
+    except OSError:
+        pass
+    return 0
+
+
+def _paths_size(value: Any) -> int:
+    """Total size of the file(s) in a path argument (str or list of str)."""
+    if isinstance(value, str):
+        return _file_size(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_file_size(item) for item in value)
+    return 0
+
+
+class metric_span:
+    """
+    Context manager that records a Span.
+
+    Example:
+        with metric_span("encode", output=path) as span:
+            clip.write_videofile(path, ...)
+            span.add_frames(clip.duration * fps)
+    """
+
+    def __init__(self, name: str, **attrs):
+        self.span = Span(name=name, attrs=dict(attrs))
+        self._token = None
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        self.span.parent_id = parent.span_id if parent else None
+        self.span.thread = threading.current_thread().name
+        self.span.started_at = time.time()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        times = os.times()
+        self._child_cpu_start = times.children_user + times.children_system
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, tb) -> bool:
+        _current_span.reset(self._token)
+        span = self.span
+        span.wall_s = time.perf_counter() - self._wall_start
+        span.cpu_s = time.thread_time() - self._cpu_start
+        times = os.times()
+        span.child_cpu_s = max(0.0, times.children_user + times.children_system - self._child_cpu_start)
+        if span.frames and span.wall_s > 0:
+            span.encode_fps = span.frames / span.wall_s
+        if exc_type is not None:
+            span.status = "error"
+            span.error = f"{exc_type.__name__}: {exc_value}"
+        _record(span)
+        return False
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span in this thread/context, if any."""
+    return _current_span.get()
+
+
+def _record(span: Span) -> None:
+    with _spans_lock:
+        _spans.append(span)
+    metrics_path = os.environ.get(METRICS_PATH_ENV)
+    if metrics_path:
+        try:
+            _append_jsonl(metrics_path, [span])
+        except Exception as e:
+            print(f"Warning: Could not append metrics to {metrics_path}: {e}")
+
+
+def instrumented(name: Optional[str] = None):
+    """
+    Decorator: record a span for every call of the function.
+    Input/output file sizes are taken from well-known path arguments
+    (video_paths, audio_path, output_file, ...) and from a returned path.
+    """
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__name__}"
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metric_span(span_name) as span:
+                try:
+                    bound = signature.bind_partial(*args, **kwargs)
+                    arguments = bound.arguments
+                except TypeError:
+                    arguments = {}
+                for arg_name in INPUT_ARGUMENT_NAMES.intersection(arguments):
+                    span.add_bytes_read(_paths_size(arguments[arg_name]))
+
+                result = func(*args, **kwargs)
+
+                outputs = {arguments[arg_name] for arg_name in OUTPUT_ARGUMENT_NAMES.intersection(arguments)
+                           if isinstance(arguments[arg_name], str)}
+                if isinstance(result, str):
+                    outputs.add(result)
+                for output in outputs:
+                    span.wrote_file(output)
+                return result
+        return wrapper
+    return decorator
+
+
+def get_spans() -> List[Span]:
+    """Spans recorded in this process so far (the most recent MAX_RECORDED_SPANS)."""
+    with _spans_lock:
+        return list(_spans)
+
+
+def clear_spans() -> None:
+    """Forget all recorded spans."""
+    with _spans_lock:
+        _spans.clear()
+
+
+def _append_jsonl(path: str, spans: List[Span]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for span in spans:
+            f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+
+def export_spans_jsonl(path: str, clear: bool = False) -> int:
+    """
+    Append all recorded spans to a JSON lines file.
+
+    Args:
+        path: Output .jsonl file
+        clear: Forget the spans after exporting
+
+    Returns:
+        int: Number of spans written
+    """
+    with _spans_lock:
+        spans = list(_spans)
+        if clear:
+            _spans.clear()  # In the same lock, so spans finishing meanwhile are not lost
+    _append_jsonl(path, spans)
+    print(f"📊 Exported {len(spans)} spans (run {RUN_ID}, host {socket.gethostname()}) to {path}")
+    return len(spans)
+
+
+def summarize_spans(spans: Optional[List[Span]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Aggregate spans by name and print a summary table.
+
+    Returns:
+        dict: span name -> {"calls", "wall_s", "cpu_s", "child_cpu_s", "frames", "bytes_read", "bytes_written"}
+    """
+    spans = get_spans() if spans is None else spans
+    summary: Dict[str, Dict[str, float]] = {}
+    for span in spans:
+        entry = summary.setdefault(span.name, {
+            "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "child_cpu_s": 0.0,
+            "frames": 0, "bytes_read": 0, "bytes_written": 0
+        })
+        entry["calls"] += 1
+        entry["wall_s"] += span.wall_s
+        entry["cpu_s"] += span.cpu_s
+        entry["child_cpu_s"] += span.child_cpu_s
+        entry["frames"] += span.frames
+        entry["bytes_read"] += span.bytes_read
+        entry["bytes_written"] += span.bytes_written
+
+    print(f"\n📊 {'Stage':<50} {'calls':>5} {'wall s':>9} {'cpu s':>9} {'ffmpeg s':>9} {'frames':>8} {'MB in':>8} {'MB out':>8}")
+    for span_name, entry in sorted(summary.items(), key=lambda item: -item[1]["wall_s"]):
+        print(f"   {span_name[:50]:<50} {entry['calls']:>5} {entry['wall_s']:>9.2f} {entry['cpu_s']:>9.2f} "
+              f"{entry['child_cpu_s']:>9.2f} {entry['frames']:>8} {entry['bytes_read'] / 1e6:>8.1f} {entry['bytes_written'] / 1e6:>8.1f}")
+    return summary
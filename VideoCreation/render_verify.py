@@ -0,0 +1,373 @@
+"""
+Fast post-render verification of written media files.
+
+Success used to mean os.path.exists (Greece steps) or nothing at all
+(TimelessTales), so files truncated by a killed encode went unnoticed until
+upload. verify_render checks a file without decoding it fully:
+
+- container probe: the file opens, expected streams are present
+- duration: matches the expected timeline within a tolerance
+- MP4/MOV atoms: moov present (a killed encode leaves none) and placed before
+  mdat (faststart), no atom running past the end of the file
+- first and last keyframe decode (ffprobe decodes only those frames)
+
+The result is written next to the output as "<output>.verify.json". The
+verified_output decorator runs the check after every render function; a file
+that fails is moved aside to "<name>.corrupt<ext>", so existence checks and
+uploads never pick it up; a file ffprobe cannot open counts as failed. A file
+that could not be checked (ffprobe could not be run) is kept and only warned
+about. Verification is skipped when
+ffprobe is not on PATH; set VIDEO_VERIFY_RENDERS=0 to disable it.
+"""
+
+import os
+import json
+import time
+import shutil
+import struct
+import inspect
+import functools
+import threading
+import subprocess
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+VERIFY_ENV = "VIDEO_VERIFY_RENDERS"
+SIDECAR_SUFFIX = ".verify.json"
+CORRUPT_SUFFIX = ".corrupt"
+
+DEFAULT_DURATION_TOLERANCE = 0.5  # seconds (encoder priming/padding, frame rounding)
+LAST_KEYFRAME_WINDOW = 10.0       # seconds before the end searched for the last keyframe
+
+MEDIA_EXTENSIONS = {".mp4", ".mov", ".m4v", ".mkv", ".mp3", ".wav", ".m4a", ".aac"}
+ISO_MEDIA_EXTENSIONS = {".mp4", ".mov", ".m4v", ".m4a"}
+OUTPUT_ARGUMENT_NAMES = ("output_file", "output_path")
+
+# Expectations announced by the writers, keyed by absolute output path -> (duration, has_audio)
+_expected_outputs: Dict[str, Tuple[float, bool]] = {}
+_expected_outputs_lock = threading.Lock()
+
+_ffprobe_available: Optional[bool] = None
+
+
+@dataclass
+class VerificationResult:
+    """Outcome of verify_render for one file."""
+    path: str
+    ok: bool = True
+    checks: Dict[str, bool] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    duration: float = 0.0
+    expected_duration: Optional[float] = None
+    streams: List[str] = field(default_factory=list)
+    size_bytes: int = 0
+    mtime_ns: int = 0
+    first_keyframe: Optional[float] = None
+    last_keyframe: Optional[float] = None
+    checked_at: float = 0.0
+    check_s: float = 0.0
+
+    def fail(self, check: str, message: str) -> None:
+        self.checks[check] = False
+        self.errors.append(message)
+        self.ok = False
+
+    def warn(self, check: str, message: str) -> None:
+        self.checks[check] = False
+        self.warnings.append(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def verification_enabled() -> bool:
+    """False when disabled through VIDEO_VERIFY_RENDERS or when ffprobe is missing (warned once)."""
+    global _ffprobe_available
+    if os.environ.get(VERIFY_ENV, "1").strip().lower() in ("0", "false", "no", "off"):
+        return False
+    if _ffprobe_available is None:
+        _ffprobe_available = shutil.which("ffprobe") is not None
+        if not _ffprobe_available:
+            print("⚠️ ffprobe not found on PATH - skipping post-render verification")
+    return _ffprobe_available
+
+
+def expect_output(path: str, duration: float, has_audio: bool = True) -> None:
+    """
+    Announce what a writer is about to write to `path`; the verification after the
+    write checks the duration and, for videos, the audio stream against it.
+    """
+    if path:
+        with _expected_outputs_lock:
+            _expected_outputs[os.path.abspath(path)] = (float(duration), has_audio)
+
+
+def _pop_expected_output(path: str) -> Tuple[Optional[float], bool]:
+    with _expected_outputs_lock:
+        return _expected_outputs.pop(os.path.abspath(path), (None, False))
+
+
+def scan_top_level_atoms(path: str) -> List[Tuple[str, int, int]]:
+    """
+    List the top-level atoms of an MP4/MOV file by reading only their headers.
+
+    Returns:
+        List of (type, offset, size); size runs past the file size for a truncated atom
+    """
+    atoms = []
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            header = f.read(8)
+            size, atom_type = struct.unpack(">I4s", header)
+            header_size = 8
+            if size == 1:  # 64-bit size follows
+                size = struct.unpack(">Q", f.read(8))[0]
+                header_size = 16
+            elif size == 0:  # Atom extends to the end of the file
+                size = file_size - offset
+            atoms.append((atom_type.decode("latin-1"), offset, size))
+            if size < header_size:
+                break
+            offset += size
+    return atoms
+
+
+def _run_ffprobe(args: List[str]) -> Tuple[int, str, str]:
+    result = subprocess.run(["ffprobe", "-v", "error"] + args, capture_output=True, text=True)
+    return result.returncode, result.stdout, result.stderr.strip()
+
+
+def _keyframe_times(path: str, read_intervals: str, keyframes_only: bool) -> Tuple[List[float], str]:
+    """Decode only the selected frames of the first video stream; returns (pts times, errors)."""
+    args = ["-select_streams", "v:0"]
+    if keyframes_only:
+        args += ["-skip_frame", "nokey"]
+    args += ["-read_intervals", read_intervals, "-show_entries", "frame=best_effort_timestamp_time",
+             "-of", "csv=p=0", path]
+    returncode, stdout, stderr = _run_ffprobe(args)
+    times = []
+    for line in stdout.splitlines():
+        try:
+            times.append(float(line.strip().strip(",")))
+        except ValueError:
+            continue
+    return times, stderr if (returncode != 0 or stderr) else ""
+
+
+def verify_render(
+    path: str,
+    expected_duration: Optional[float] = None,
+    tolerance: float = DEFAULT_DURATION_TOLERANCE,
+    require_audio: bool = True,
+    write_sidecar: bool = True
+) -> VerificationResult:
+    """
+    Verify a written media file without decoding it fully.
+
+    Args:
+        path: Output file
+        expected_duration: Timeline length the writer produced (None: skip the duration check)
+        tolerance: Allowed duration difference in seconds
+        require_audio: Videos must contain an audio stream
+        write_sidecar: Write the result to "<path>.verify.json"
+
+    Returns:
+        VerificationResult (ok is False if any check failed; faststart placement and
+        a verifier that could not be run are warnings)
+    """
+    started = time.perf_counter()
+    result = VerificationResult(path=path, expected_duration=expected_duration, checked_at=time.time())
+    try:
+        if not os.path.exists(path):
+            result.fail("exists", "File does not exist")
+            return result
+        stat = os.stat(path)
+        result.size_bytes = stat.st_size
+        result.mtime_ns = stat.st_mtime_ns
+        result.checks["exists"] = result.size_bytes > 0
+        if not result.size_bytes:
+            result.fail("exists", "File is empty")
+            return result
+
+        # MP4/MOV structure: a killed encode leaves no moov atom or a truncated last atom
+        extension = os.path.splitext(path)[1].lower()
+        if extension in ISO_MEDIA_EXTENSIONS:
+            atoms = scan_top_level_atoms(path)
+            types = [atom_type for atom_type, _, _ in atoms]
+            truncated = [atom_type for atom_type, offset, size in atoms if offset + size > result.size_bytes]
+            if truncated:
+                result.fail("atoms", f"Truncated atom(s): {', '.join(truncated)}")
+            else:
+                result.checks["atoms"] = True
+            if "moov" not in types:
+                result.fail("moov", "No moov atom (encode did not finish)")
+            else:
+                result.checks["moov"] = True
+                if "mdat" in types and types.index("moov") > types.index("mdat"):
+                    result.warn("faststart", "moov atom is after mdat (no faststart)")
+                else:
+                    result.checks["faststart"] = True
+
+        # Container probe
+        returncode, stdout, stderr = _run_ffprobe(["-show_entries", "format=duration:stream=codec_type",
+                                                   "-of", "json", path])
+        if returncode != 0:
+            result.fail("probe", f"ffprobe cannot open the file: {stderr[-500:]}")
+            return result
+        info = json.loads(stdout or "{}")
+        result.streams = [stream.get("codec_type", "") for stream in info.get("streams", [])]
+        result.duration = float(info.get("format", {}).get("duration") or 0.0)
+        result.checks["probe"] = True
+
+        has_video = "video" in result.streams
+        if not result.streams:
+            result.fail("streams", "No streams")
+        elif has_video and require_audio and "audio" not in result.streams:
+            result.fail("streams", "Video has no audio stream")
+        else:
+            result.checks["streams"] = True
+
+        if expected_duration is not None:
+            if abs(result.duration - expected_duration) > tolerance:
+                result.fail("duration", f"Duration {result.duration:.2f}s, expected {expected_duration:.2f}s (±{tolerance}s)")
+            else:
+                result.checks["duration"] = True
+
+        # First and last keyframe decode
+        if has_video:
+            first, errors = _keyframe_times(path, "%+#1", keyframes_only=False)
+            if errors or not first:
+                result.fail("first_keyframe", f"First frame does not decode: {errors[-300:]}")
+            else:
+                result.first_keyframe = first[0]
+                result.checks["first_keyframe"] = True
+
+            window_start = max(0.0, result.duration - LAST_KEYFRAME_WINDOW)
+            last, errors = _keyframe_times(path, f"{window_start:.3f}%", keyframes_only=True)
+            if errors or not last:
+                result.fail("last_keyframe", f"Last keyframe does not decode: {errors[-300:]}")
+            else:
+                result.last_keyframe = last[-1]
+                result.checks["last_keyframe"] = True
+
+    except OSError as e:
+        # ffprobe could not be run at all: nothing is known about the file, so keep it
+        result.warn("verify", f"Could not run the verifier: {e}")
+
+    except Exception as e:
+        result.fail("verify", f"Unreadable probe output: {e}")
+
+    finally:
+        result.check_s = round(time.perf_counter() - started, 3)
+        if write_sidecar and os.path.exists(path):
+            try:
+                with open(path + SIDECAR_SUFFIX, "w", encoding="utf-8") as f:
+                    json.dump(result.to_dict(), f, indent=2, ensure_ascii=False)
+            except OSError as e:
+                print(f"Warning: Could not write verification sidecar for {path}: {e}")
+
+    return result
+
+
+def is_verified_output(path: str) -> bool:
+    """
+    True if `path` exists and passed verification. Uses the recorded sidecar while
+    it matches the file's size and modification time; otherwise verifies now (and
+    records the result).
+    """
+    if not os.path.exists(path):
+        return False
+    if not verification_enabled():
+        return True
+    try:
+        with open(path + SIDECAR_SUFFIX, encoding="utf-8") as f:
+            recorded = json.load(f)
+        stat = os.stat(path)
+        if recorded.get("size_bytes") == stat.st_size and recorded.get("mtime_ns") == stat.st_mtime_ns:
+            return bool(recorded.get("ok"))
+    except (OSError, ValueError):
+        pass
+    result = verify_render(path)
+    if not result.ok:
+        print(f"❌ {os.path.basename(path)} failed verification: {'; '.join(result.errors)}")
+    return result.ok
+
+
+def quarantine_output(path: str) -> str:
+    """Move a failed output aside ("video.mp4" -> "video.corrupt.mp4") and return the new path."""
+    stem, extension = os.path.splitext(path)
+    corrupt_path = f"{stem}{CORRUPT_SUFFIX}{extension}"
+    os.replace(path, corrupt_path)
+    sidecar = path + SIDECAR_SUFFIX
+    if os.path.exists(sidecar):
+        os.replace(sidecar, corrupt_path + SIDECAR_SUFFIX)
+    return corrupt_path
+
+
+def verify_and_report(path: str, quarantine: bool = True) -> VerificationResult:
+    """verify_render against the writer's announced output, with a log line and quarantine on failure."""
+    expected_duration, has_audio = _pop_expected_output(path)
+    result = verify_render(path, expected_duration=expected_duration, require_audio=has_audio)
+    if result.ok:
+        note = f" ({'; '.join(result.warnings)})" if result.warnings else ""
+        print(f"🔍 Verified {os.path.basename(path)}: {result.duration:.2f}s, {'+'.join(result.streams)}{note}")
+    else:
+        print(f"❌ Verification failed for {os.path.basename(path)}: {'; '.join(result.errors)}")
+        if quarantine and os.path.exists(path):
+            print(f"   Moved to {os.path.basename(quarantine_output(path))}")
+    return result
+
+
+def _output_paths(arguments: Dict[str, Any], result: Any) -> List[str]:
+    paths = [arguments[name] for name in OUTPUT_ARGUMENT_NAMES if isinstance(arguments.get(name), str)]
+    if isinstance(result, str):
+        paths.append(result)
+    elif isinstance(result, dict):
+        paths += [value for value in result.values() if isinstance(value, str)]
+    unique = []
+    for path in paths:
+        if path and path not in unique and os.path.splitext(path)[1].lower() in MEDIA_EXTENSIONS:
+            unique.append(path)
+    return unique
+
+
+def verified_output(func):
+    """
+    Decorator: verify the files a render function wrote (output_file/output_path
+    arguments and returned paths) once it returns, also after a failed render, so a
+    partial file is never left in place. Failed files are quarantined and the failure
+    is reflected in the return value (None for paths, False for bools, None entries
+    in dicts of paths).
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        if not verification_enabled():
+            return result
+        try:
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+        except TypeError:
+            arguments = {}
+
+        failed = set()
+        for path in _output_paths(arguments, result):
+            if not os.path.exists(path):
+                continue
+            if not verify_and_report(path).ok:
+                failed.add(path)
+        if not failed:
+            return result
+        if isinstance(result, str):
+            return None
+        if isinstance(result, bool):
+            return False
+        if isinstance(result, dict):
+            return {key: (None if value in failed else value) for key, value in result.items()}
+        return result
+    return wrapper
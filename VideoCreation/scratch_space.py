@@ -0,0 +1,190 @@
+"""
+Per-job scratch space for renders.
+
+Every render job gets a private scratch directory for its temporary files
+(MoviePy's temp audio, FFmpeg concat lists, subtitle files, ...), so several
+renders can run at once in the same working directory. The directory can live
+on a tmpfs/RAM disk, is removed when the job ends (success or failure) and can
+have a size cap. The cap is checked whenever a scratch path is handed out (before
+anything is written to it); writes themselves are not limited, but the size is
+sampled while the job runs and a peak over the cap is reported when it ends.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import functools
+import threading
+import itertools
+import contextvars
+from typing import Optional
+
+from config import get_resource_budget
+
+RAM_DISK_CANDIDATES = ["/dev/shm"]
+SCRATCH_SAMPLE_INTERVAL = 1.0  # Seconds between size samples of a capped scratch directory
+
+_current_scratch: contextvars.ContextVar = contextvars.ContextVar("current_scratch", default=None)
+
+
+class ScratchQuotaExceeded(OSError):
+    """Raised when a scratch path is requested while the job's directory is over its size cap."""
+
+
+def _ram_disk_root() -> Optional[str]:
+    """Return a writable tmpfs/RAM disk directory, or None if there is none."""
+    for candidate in RAM_DISK_CANDIDATES:
+        if os.path.isdir(candidate) and os.access(candidate, os.W_OK):
+            return candidate
+    return None
+
+
+class ScratchSpace:
+    """
+    Private scratch directory for one render job (use as a context manager).
+
+    Args:
+        job_name: Name used as the directory prefix
+        root: Parent directory (default: budget scratch_root, then RAM disk if requested, then system temp)
+        use_ram_disk: Create the directory on a tmpfs/RAM disk when available (default: from the budget)
+        size_cap_mb: Maximum size of the directory in MB, 0 for no cap (default: budget scratch_quota_mb);
+            new scratch paths are refused over it, a peak over it is only reported
+        keep_on_failure: Keep the directory when the job raises, for debugging
+    """
+
+    def __init__(
+        self,
+        job_name: str = "render",
+        root: Optional[str] = None,
+        use_ram_disk: Optional[bool] = None,
+        size_cap_mb: Optional[int] = None,
+        keep_on_failure: bool = False
+    ):
+        budget = get_resource_budget()
+        self.job_name = re.sub(r"[^A-Za-z0-9_-]+", "_", job_name)[:40] or "render"
+        self.use_ram_disk = budget.scratch_on_ram_disk if use_ram_disk is None else use_ram_disk
+        self.root = root or budget.scratch_root
+        self.size_cap_mb = budget.scratch_quota_mb if size_cap_mb is None else size_cap_mb
+        self.keep_on_failure = keep_on_failure
+        self.directory = None
+        self._counter = itertools.count(1)
+        self._token = None
+        self.peak_mb = 0.0
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+
+    def __enter__(self) -> "ScratchSpace":
+        root = self.root
+        if root is None and self.use_ram_disk:
+            root = _ram_disk_root()
+            if root is None:
+                print("⚠️ No RAM disk available, using the system temp directory for scratch")
+        if root:
+            os.makedirs(root, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix=f"{self.job_name}_", dir=root)
+        self._token = _current_scratch.set(self)
+        if self.size_cap_mb and self.size_cap_mb > 0:
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(target=self._sample_size, name=f"scratch-{self.job_name}", daemon=True)
+            self._sampler.start()
+        print(f"📁 Scratch space for {self.job_name}: {self.directory}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> bool:
+        if self._token is not None:
+            _current_scratch.reset(self._token)
+            self._token = None
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+            self.peak_mb = max(self.peak_mb, self.used_mb())
+            if self.peak_mb > self.size_cap_mb:
+                print(f"⚠️ Scratch space {self.directory} peaked at {self.peak_mb:.1f} MB, over its {self.size_cap_mb} MB cap")
+        if exc_type is not None and self.keep_on_failure:
+            print(f"⚠️ Keeping scratch space after failure: {self.directory}")
+        else:
+            self.cleanup()
+        return False
+
+    def cleanup(self) -> None:
+        """Remove the scratch directory and everything in it."""
+        if self.directory and os.path.exists(self.directory):
+            try:
+                shutil.rmtree(self.directory)
+                print(f"🗑️ Removed scratch space: {self.directory}")
+            except Exception as e:
+                print(f"⚠️ Could not remove scratch space {self.directory}: {e}")
+
+    def used_mb(self) -> float:
+        """Current size of the scratch directory in MB."""
+        total = 0
+        if self.directory and os.path.exists(self.directory):
+            for dirpath, _, filenames in os.walk(self.directory):
+                for filename in filenames:
+                    try:
+                        total += os.path.getsize(os.path.join(dirpath, filename))
+                    except OSError:
+                        pass
+        return total / (1024 * 1024)
+
+    def _sample_size(self) -> None:
+        """Sampler thread: record the peak directory size until the job ends."""
+        while not self._stop_sampling.wait(SCRATCH_SAMPLE_INTERVAL):
+            self.peak_mb = max(self.peak_mb, self.used_mb())
+
+    def check_quota(self) -> None:
+        """Raise ScratchQuotaExceeded if the directory is over its size cap."""
+        if self.size_cap_mb and self.size_cap_mb > 0:
+            used = self.used_mb()
+            if used > self.size_cap_mb:
+                raise ScratchQuotaExceeded(
+                    f"Scratch space {self.directory} uses {used:.1f} MB, over its {self.size_cap_mb} MB cap"
+                )
+
+    def path(self, name: str) -> str:
+        """
+        Get a unique file path inside the scratch directory (the file is not created).
+        The quota is checked every time a new scratch file is handed out.
+        """
+        self.check_quota()
+        stem, ext = os.path.splitext(os.path.basename(name))
+        return os.path.join(self.directory, f"{stem}-{next(self._counter)}{ext}")
+
+
+def current_scratch() -> Optional[ScratchSpace]:
+    """The scratch space of the job running in this thread/context, if any."""
+    return _current_scratch.get()
+
+
+def scratch_file(name: str) -> str:
+    """
+    Get a private path for a temporary file such as "temp-audio.m4a".
+    Uses the active job's scratch space, or a unique name in the system temp
+    directory when no job scratch space is active.
+    """
+    scratch = current_scratch()
+    if scratch is not None:
+        return scratch.path(name)
+    stem, ext = os.path.splitext(os.path.basename(name))
+    fd, path = tempfile.mkstemp(prefix=f"{stem}-", suffix=ext)
+    os.close(fd)
+    os.remove(path)  # Writers create the file themselves
+    return path
+
+
+def job_scratch(job_name: Optional[str] = None, **scratch_kwargs):
+    """
+    Decorator: run the function inside its own ScratchSpace unless the caller
+    already opened one (nested calls share the outer job's directory).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if current_scratch() is not None:
+                return func(*args, **kwargs)
+            with ScratchSpace(job_name or func.__name__, **scratch_kwargs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,8 +1,114 @@
-from video_common import CreateAudioFile, CreateVideoFile, ConcatenateAudioFiles, ConcatenateVideoFiles
-from config import get_local_config, VideoConfigGreece
+from video_common import CreateAudioFile, CreateVideoFile, ConcatenateAudioFiles, ConcatenateVideoFiles, get_text_columns
+from config import get_local_config, VideoConfigGreece, PreviewSettings, preview_entry_point
+from typing import Optional
+from scratch_space import job_scratch
+from render_metrics import instrumented
+from render_verify import is_verified_output
 import os
 
-def create_complete_video_for_greece(language: str, orientation: str, video_config: VideoConfigGreece, cleanup_intermediate: bool = False, build_all: bool = True):
+# Greece audio timing (seconds): music before/after the voice, silence between main and tail audio
+GREECE_INTRO_MUSIC_BEFORE_VOICE = 0.2
+GREECE_INTRO_MUSIC_AFTER_VOICE = 1.5
+GREECE_TAIL_MUSIC_BEFORE_VOICE = 2
+GREECE_TAIL_MUSIC_AFTER_VOICE = 2
+GREECE_TAIL_SILENCE_BETWEEN = 0.5
+
+def get_orientation_size(orientation: str):
+    """Return (size, resize_dim) for "horizontal" or "vertical" output."""
+    if orientation == "horizontal":
+        return (1920, 1080), "width"
+    return (1080, 1920), "height"
+
+@instrumented("greece.step1_intro_audio")
+@preview_entry_point
+def create_greece_intro_audio(language: str, video_config: VideoConfigGreece, preview: Optional[PreviewSettings] = None) -> str:
+    """Step 1: create the shared intro audio for a language (Common_Artifacts). Raises RuntimeError on failure."""
+    paths = video_config.get_greece_paths_for_language_orientation(language, "horizontal")
+    # Step 1: Create intro audio
+    print(f"Step 1/6: 🎵 Creating intro audio...")
+    try:
+        CreateAudioFile(
+            output_file=paths["intro_audio"],
+            music_overlay_path=video_config.intro_paths["music"],
+            text_audio_overlay_path=paths["intro_text_audio"],
+            set_duration_by_text_audio=True,
+            time_of_music_before_voice=GREECE_INTRO_MUSIC_BEFORE_VOICE,
+            time_of_music_after_voice=GREECE_INTRO_MUSIC_AFTER_VOICE
+        )
+
+        if not is_verified_output(paths["intro_audio"]):
+            raise FileNotFoundError(f"Failed to create intro audio: {paths['intro_audio']}")
+
+        print(f"✅ Step 1 completed: {os.path.basename(paths['intro_audio'])}")
+
+    except Exception as e:
+        print(f"❌ Step 1 failed: {e}")
+        raise RuntimeError(f"Intro audio creation failed: {e}")
+    return paths["intro_audio"]
+
+@instrumented("greece.step2_intro_video")
+@preview_entry_point
+def create_greece_intro_video(language: str, orientation: str, video_config: VideoConfigGreece, preview: Optional[PreviewSettings] = None) -> str:
+    """Step 2: create the shared intro video for a language/orientation (Common_Artifacts). Raises RuntimeError on failure."""
+    paths = video_config.get_greece_paths_for_language_orientation(language, orientation)
+    size, resize_dim = get_orientation_size(orientation)
+    # Step 2: Create intro video
+    print(f"Step 2/6: 🎬 Creating intro video...")
+    try:
+        CreateVideoFile(
+            output_file=paths["intro_video"],
+            size=size,
+            resize_dim=resize_dim,
+            audio_path=paths["intro_audio"],
+            csv_path=video_config.intro_paths["text_overlay_csv"],
+            text_column=paths["text_column"],
+            video_paths=video_config.get_video_paths_for_workflow("intro"),
+            use_audio_duration=False,
+            preview_boundaries=[float("inf")],  # The intro ends at the head boundary
+            intermediate_format=video_config.intermediate_format
+        )
+
+        if not is_verified_output(paths["intro_video"]):
+            raise FileNotFoundError(f"Failed to create intro video: {paths['intro_video']}")
+
+        print(f"✅ Step 2 completed: {os.path.basename(paths['intro_video'])}")
+
+    except Exception as e:
+        print(f"❌ Step 2 failed: {e}")
+        raise RuntimeError(f"Intro video creation failed: {e}")
+    return paths["intro_video"]
+
+@instrumented("greece.step3_tail_audio")
+@preview_entry_point
+def create_greece_tail_audio(language: str, video_config: VideoConfigGreece, preview: Optional[PreviewSettings] = None) -> str:
+    """Step 3: create the shared tail audio for a language (Common_Artifacts). Raises RuntimeError on failure."""
+    paths = video_config.get_greece_paths_for_language_orientation(language, "horizontal")
+    # Step 3: Create tail audio
+    print(f"Step 3/6: 🎵 Creating tail audio...")
+    try:
+        CreateAudioFile(
+            output_file=paths["tail_audio"],
+            music_overlay_path=video_config.tail_paths["music"],
+            text_audio_overlay_path=paths["tail_text_audio"],
+            set_duration_by_text_audio=True,
+            time_of_music_before_voice=GREECE_TAIL_MUSIC_BEFORE_VOICE,
+            time_of_music_after_voice=GREECE_TAIL_MUSIC_AFTER_VOICE
+        )
+
+        if not is_verified_output(paths["tail_audio"]):
+            raise FileNotFoundError(f"Failed to create tail audio: {paths['tail_audio']}")
+
+        print(f"✅ Step 3 completed: {os.path.basename(paths['tail_audio'])}")
+
+    except Exception as e:
+        print(f"❌ Step 3 failed: {e}")
+        raise RuntimeError(f"Tail audio creation failed: {e}")
+    return paths["tail_audio"]
+
+@instrumented("greece.complete_video")
+@preview_entry_point
+@job_scratch("greece")
+def create_complete_video_for_greece(language: str, orientation: str, video_config: VideoConfigGreece, cleanup_intermediate: bool = False, build_all: bool = True, preview: Optional[PreviewSettings] = None, engine: str = "moviepy", write_intermediate_audio: bool = True):
     """
     Creates a complete video with intro, main content, and tail for the specified language and orientation.
     
@@ -12,104 +118,58 @@ def create_complete_video_for_greece(language: str, orientation: str, video_conf
         video_config: VideoConfigGreece instance with project configuration
         cleanup_intermediate: Whether to clean up intermediate files to save storage
         build_all: If False, skips intro/tail creation and uses existing files
+        preview: Render a fast draft (reduced size/fps, optional first N seconds or
+            boundary windows) to "*_preview.mp4" files instead of the full videos
+        engine: "moviepy" (steps 1-6 with intermediate files) or "filtergraph"
+            (one ffmpeg pass over the whole timeline, see greece_filtergraph)
+        write_intermediate_audio: If False, the step 4 main+tail audio is handed to step 5
+            in memory instead of being written to (and read back from) audio_with_tail
         
     Returns:
         str: Path to final video if successful, None if failed
     """
     
+    if engine == "filtergraph":
+        from greece_filtergraph import render_greece_single_pass  # Imports this module
+        return render_greece_single_pass(language, orientation, video_config, preview=preview)
+    
     print(f"\n🎬 Creating {language} {orientation} video")
     print("=" * 50)
     
     # Get paths for this specific language/orientation
     paths = video_config.get_greece_paths_for_language_orientation(language, orientation)
     
-    # Track intermediate files for cleanup
-    intermediate_files = [
-        paths["intro_audio"],
-        paths["tail_audio"], 
-        paths["audio_with_tail"],
-        paths["intro_video"],
-        paths["main_tail_video"]
-    ]
+    # Track intermediate files for cleanup. Shared Common_Artifacts outputs are only
+    # ours to remove when this call built them (build_all=True).
+    intermediate_files = [paths["main_tail_video"]]
+    if write_intermediate_audio:
+        intermediate_files.append(paths["audio_with_tail"])
+    if build_all:
+        intermediate_files += [paths["intro_audio"], paths["tail_audio"], paths["intro_video"]]
     
     try:
         # Define dimensions based on orientation
-        if orientation == "horizontal":
-            size = (1920, 1080)
-            resize_dim = "width"
-        else:  # vertical
-            size = (1080, 1920)
-            resize_dim = "height"
+        size, resize_dim = get_orientation_size(orientation)
+        
+        # Parse all text tables once (concurrently); later CreateVideoFile calls hit the cache
+        get_text_columns(
+            [video_config.intro_paths["text_overlay_csv"], video_config.current_paths["csv"], video_config.tail_paths["text_overlay_csv"]],
+            ["english_text", "russian_text"]
+        )
         
         if build_all:
-            # Step 1: Create intro audio
-            print(f"Step 1/6: 🎵 Creating intro audio...")
-            try:
-                CreateAudioFile(
-                    output_file=paths["intro_audio"],
-                    music_overlay_path=video_config.intro_paths["music"],
-                    text_audio_overlay_path=paths["intro_text_audio"],
-                    set_duration_by_text_audio=True,
-                    time_of_music_before_voice=0.2,
-                    time_of_music_after_voice=1.5
-                )
-                
-                if not os.path.exists(paths["intro_audio"]):
-                    raise FileNotFoundError(f"Failed to create intro audio: {paths['intro_audio']}")
-                    
-                print(f"✅ Step 1 completed: {os.path.basename(paths['intro_audio'])}")
-                
-            except Exception as e:
-                print(f"❌ Step 1 failed: {e}")
-                raise RuntimeError(f"Intro audio creation failed: {e}")
-            
-            # Step 2: Create intro video
-            print(f"Step 2/6: 🎬 Creating intro video...")
-            try:
-                CreateVideoFile(
-                    output_file=paths["intro_video"],
-                    size=size,
-                    resize_dim=resize_dim,
-                    audio_path=paths["intro_audio"],
-                    csv_path=video_config.intro_paths["text_overlay_csv"],
-                    text_column=paths["text_column"],
-                    video_paths=video_config.get_video_paths_for_workflow("intro"),
-                    use_audio_duration=False
-                )
-                
-                if not os.path.exists(paths["intro_video"]):
-                    raise FileNotFoundError(f"Failed to create intro video: {paths['intro_video']}")
-                    
-                print(f"✅ Step 2 completed: {os.path.basename(paths['intro_video'])}")
-                
-            except Exception as e:
-                print(f"❌ Step 2 failed: {e}")
-                raise RuntimeError(f"Intro video creation failed: {e}")
-            
-            # Step 3: Create tail audio
-            print(f"Step 3/6: 🎵 Creating tail audio...")
-            try:
-                CreateAudioFile(
-                    output_file=paths["tail_audio"],
-                    music_overlay_path=video_config.tail_paths["music"],
-                    text_audio_overlay_path=paths["tail_text_audio"],
-                    set_duration_by_text_audio=True,
-                    time_of_music_before_voice=2,
-                    time_of_music_after_voice=2
-                )
-                
-                if not os.path.exists(paths["tail_audio"]):
-                    raise FileNotFoundError(f"Failed to create tail audio: {paths['tail_audio']}")
-                    
-                print(f"✅ Step 3 completed: {os.path.basename(paths['tail_audio'])}")
-                
-            except Exception as e:
-                print(f"❌ Step 3 failed: {e}")
-                raise RuntimeError(f"Tail audio creation failed: {e}")
+            create_greece_intro_audio(language, video_config)
+            create_greece_intro_video(language, orientation, video_config)
+            create_greece_tail_audio(language, video_config)
         else:
             # Validate existing files
             print("⏸️ Skipping steps 1-3 (build_all=False). Checking for existing files...")
             
+            # Preview intros are cheap: build a missing one from the existing intro audio
+            if preview is not None and not is_verified_output(paths["intro_video"]) and is_verified_output(paths["intro_audio"]):
+                print("👀 Preview intro video not found - building it")
+                create_greece_intro_video(language, orientation, video_config)
+            
             missing_files = []
             required_files = [
                 ("Intro audio", paths["intro_audio"]),
@@ -118,11 +178,11 @@ def create_complete_video_for_greece(language: str, orientation: str, video_conf
             ]
             
             for name, path in required_files:
-                if not os.path.exists(path):
+                if not is_verified_output(path):
                     missing_files.append(f"{name}: {path}")
                     
             if missing_files:
-                print("❌ Missing required files:")
+                print("❌ Missing or unverified required files:")
                 for missing in missing_files:
                     print(f"   - {missing}")
                 raise FileNotFoundError("Cannot proceed without existing intro/tail files when build_all=False")
@@ -132,16 +192,28 @@ def create_complete_video_for_greece(language: str, orientation: str, video_conf
         # Step 4: Combine main and tail audio
         print(f"Step 4/6: 🔗 Combining main and tail audio...")
         try:
-            success = ConcatenateAudioFiles(
-                audio_paths=[paths["main_audio"], paths["tail_audio"]],
-                output_file=paths["audio_with_tail"],
-                silence_between=0.5
-            )
-            
-            if not success or not os.path.exists(paths["audio_with_tail"]):
-                raise FileNotFoundError(f"Failed to combine audio: {paths['audio_with_tail']}")
+            if write_intermediate_audio:
+                success = ConcatenateAudioFiles(
+                    audio_paths=[paths["main_audio"], paths["tail_audio"]],
+                    output_file=paths["audio_with_tail"],
+                    silence_between=GREECE_TAIL_SILENCE_BETWEEN
+                )
+                
+                if not success or not is_verified_output(paths["audio_with_tail"]):
+                    raise FileNotFoundError(f"Failed to combine audio: {paths['audio_with_tail']}")
+                main_tail_audio = paths["audio_with_tail"]
+                print(f"✅ Step 4 completed: {os.path.basename(paths['audio_with_tail'])}")
+            else:
+                main_tail_audio = ConcatenateAudioFiles(
+                    audio_paths=[paths["main_audio"], paths["tail_audio"]],
+                    output_file=None,
+                    silence_between=GREECE_TAIL_SILENCE_BETWEEN,
+                    return_audio=True
+                )
                 
-            print(f"✅ Step 4 completed: {os.path.basename(paths['audio_with_tail'])}")
+                if main_tail_audio is None:
+                    raise RuntimeError("Failed to combine audio in memory")
+                print(f"✅ Step 4 completed: in-memory audio ({main_tail_audio.duration:.2f}s)")
             
         except Exception as e:
             print(f"❌ Step 4 failed: {e}")
@@ -154,14 +226,16 @@ def create_complete_video_for_greece(language: str, orientation: str, video_conf
                 output_file=paths["main_tail_video"],
                 size=size,
                 resize_dim=resize_dim,
-                audio_path=paths["audio_with_tail"],
+                audio_path=main_tail_audio,
                 csv_path=[video_config.current_paths["csv"], video_config.tail_paths["text_overlay_csv"]],
                 text_column=paths["text_column"],
                 video_paths=video_config.get_video_paths_for_workflow("combined"),
-                use_audio_duration=True
+                use_audio_duration=True,
+                preview_boundaries=[0],  # The main part starts at the head boundary
+                intermediate_format=video_config.intermediate_format
             )
             
-            if not os.path.exists(paths["main_tail_video"]):
+            if not is_verified_output(paths["main_tail_video"]):
                 raise FileNotFoundError(f"Failed to create main+tail video: {paths['main_tail_video']}")
                 
             print(f"✅ Step 5 completed: {os.path.basename(paths['main_tail_video'])}")
@@ -178,7 +252,7 @@ def create_complete_video_for_greece(language: str, orientation: str, video_conf
                 output_file=paths["final_video"]
             )
             
-            if not success or not os.path.exists(paths["final_video"]):
+            if not success or not is_verified_output(paths["final_video"]):
                 raise FileNotFoundError(f"Failed to create final video: {paths['final_video']}")
                 
             print(f"🎉 SUCCESS: Final video created: {os.path.basename(paths['final_video'])}")
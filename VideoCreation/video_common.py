@@ -1,25 +1,40 @@
 import os
 import pandas as pd  # Add this import for Excel support
-from typing import List, Tuple, Optional, Union
+from typing import Dict, List, Tuple, Optional, Union
 from moviepy.video.io.VideoFileClip import VideoFileClip
 from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
 from moviepy.video.VideoClip import TextClip, ImageClip
 from moviepy.audio.io.AudioFileClip import AudioFileClip
-from moviepy.audio.AudioClip import concatenate_audioclips, CompositeAudioClip
+from moviepy.audio.AudioClip import concatenate_audioclips, CompositeAudioClip, AudioArrayClip
 from moviepy import concatenate_videoclips
 from dataclasses import dataclass, field
 from pathlib import Path
 from PIL import Image
 import re  # Add this import at the top with other imports
+import numpy as np
 import cv2  # Add for GetVideoInfo function
 import traceback
+import pickle
+import json
 from datetime import datetime
 
 import subprocess
-import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import get_resource_budget, budgeted_render, get_preview_settings, preview_output_path, IntermediateFormat
+from scratch_space import scratch_file, job_scratch
+from render_metrics import instrumented, metric_span
+from render_verify import verified_output, expect_output
+from clip_lifecycle import ClipScope, ReaderPool, LazyVideoSource, release_finished_readers, report_live_clips
+from frame_source import open_video_clip
 
 # Add import for the new image processing function
-from image_common import create_image_with_text_overlays_static
+from image_common import (
+    compose_image_with_text_overlays,
+    get_overlay_output_path,
+    save_overlay_image
+)
 
 # Base directory constants
 BASE_DIRECTORY = r"C:\NATALIA\Generative AI\auto_channel\Files for SocialVideoBot"
@@ -28,6 +43,13 @@ DEFAULT_FONT = "DejaVuSans"
 
 MIN_DURATION = 1  # seconds
 
+CAPTION_MODES = ("burned", "soft")
+
+MUSIC_OVERLAY_VOLUME = 0.3  # Background music level under a voice track (CreateAudioFile)
+
+# Workflow language codes -> ISO 639-2 codes used for subtitle/audio track metadata
+TRACK_LANGUAGE_CODES = {"EN": "eng", "RU": "rus"}
+
 # Utility dataclasses and functions
 
 @dataclass
@@ -56,55 +78,151 @@ class VideoOverlayEntry:
     status: Optional[str] = ""  # Status of the entry (e.g., "ToDo")
     notes: Optional[str] = ""  # Additional notes
 
-def get_texts_from_csv(csv_paths: Union[str, List[str]], column: str) -> List[str]:
+@dataclass
+class InMemoryAudio:
     """
-    Read texts from a specified column in one or multiple CSV or Excel files.
+    Decoded PCM audio passed from one step to the next instead of an intermediate file
+    (no MP3 encode, write, read and decode, no generation loss).
     """
-    result = []
-    if isinstance(csv_paths, str):
-        paths_to_process = [csv_paths]
-    else:
-        paths_to_process = csv_paths
+    samples: np.ndarray     # float32, shape (n_samples, n_channels), values in [-1, 1]
+    sample_rate: int = 44100
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    @classmethod
+    def from_clip(cls, clip, sample_rate: int = 44100) -> "InMemoryAudio":
+        """Render an audio clip (composite, concatenation, ...) to PCM samples."""
+        samples = clip.to_soundarray(fps=sample_rate)
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        return cls(np.ascontiguousarray(samples, dtype=np.float32), sample_rate)
+
+    def to_clip(self) -> AudioArrayClip:
+        return AudioArrayClip(self.samples, fps=self.sample_rate)
+
+
+def open_audio_clip(source: Union[str, "InMemoryAudio"]):
+    """
+    Open an audio file path or InMemoryAudio as an audio clip.
+    
+    Returns:
+        Audio clip, or None if the file does not exist
+    """
+    if isinstance(source, InMemoryAudio):
+        return source.to_clip()
+    if not os.path.exists(source):
+        return None
+    return AudioFileClip(source)
+
+
+def describe_audio_source(source: Union[str, "InMemoryAudio"]) -> str:
+    if isinstance(source, InMemoryAudio):
+        return f"in-memory audio ({source.duration:.2f}s)"
+    return os.path.basename(source)
+
+# Parsed text tables keyed by absolute path -> ((mtime_ns, size), DataFrame)
+_TEXT_TABLE_CACHE = {}
+_TEXT_TABLE_CACHE_LOCK = threading.Lock()
+
+
+@instrumented()
+def read_text_table(path: str) -> Optional[pd.DataFrame]:
+    """
+    Read a CSV or Excel text table, parsing each file only once.
+    The parsed table is cached by (path, mtime, size), so edits to the file are picked up.
+    
+    Args:
+        path: Path to a .csv, .xlsx or .xls file
+        
+    Returns:
+        pd.DataFrame with the table (shared, do not modify), or None if missing/unreadable
+    """
+    if not os.path.exists(path):
+        print(f"Warning: File not found: {path}")
+        return None
+
+    key = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with _TEXT_TABLE_CACHE_LOCK:
+            cached = _TEXT_TABLE_CACHE.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        print(f"Reading file: {path}")
+        if path.lower().endswith('.xlsx') or path.lower().endswith('.xls'):
+            df = pd.read_excel(path, engine='openpyxl')
+        else:
+            df = pd.read_csv(path)
+
+        with _TEXT_TABLE_CACHE_LOCK:
+            _TEXT_TABLE_CACHE[key] = (signature, df)
+        return df
+
+    except Exception as e:
+        print(f"Error reading file {path}: {e}")
+        traceback.print_exc()
+        return None
+
+
+def clear_text_table_cache() -> None:
+    """Drop all cached text tables."""
+    with _TEXT_TABLE_CACHE_LOCK:
+        _TEXT_TABLE_CACHE.clear()
+
+
+@instrumented()
+def get_text_columns(csv_paths: Union[str, List[str]], columns: List[str]) -> dict:
+    """
+    Read several text columns from one or multiple CSV or Excel files in one call.
+    Files are parsed once (see read_text_table) and read concurrently when a list is given.
     
-    for csv_path in paths_to_process:
-        # Validate file exists before attempting to read
-        if not os.path.exists(csv_path):
-            print(f"Warning: File not found: {csv_path}")
+    Args:
+        csv_paths: A path or list of paths; texts from multiple files are concatenated in order
+        columns: Column names to return (e.g. ["english_text", "russian_text"])
+        
+    Returns:
+        dict: column name -> list of texts (empty cells become "")
+    """
+    paths_to_process = [csv_paths] if isinstance(csv_paths, str) else list(csv_paths)
+    result = {column: [] for column in columns}
+
+    if len(paths_to_process) > 1:
+        with ThreadPoolExecutor(max_workers=min(8, len(paths_to_process))) as executor:
+            tables = list(executor.map(read_text_table, paths_to_process))
+    else:
+        tables = [read_text_table(path) for path in paths_to_process]
+
+    for path, df in zip(paths_to_process, tables):
+        if df is None:
             continue
-            
-        df = None
-        try:
-            print(f"Reading file: {csv_path}")
-            
-            if csv_path.lower().endswith('.xlsx') or csv_path.lower().endswith('.xls'):
-                df = pd.read_excel(csv_path, engine='openpyxl')
-            else:
-                df = pd.read_csv(csv_path)
-            
+        for column in columns:
             if column not in df.columns:
-                print(f"Warning: Column '{column}' not found in {csv_path}")
+                print(f"Warning: Column '{column}' not found in {path}")
                 print(f"Available columns: {list(df.columns)}")
                 continue
-                
             file_texts = df[column].fillna("").tolist()
-            result.extend(file_texts)
-            print(f"Successfully read {len(file_texts)} texts from {csv_path}")
-            
-        except Exception as e:
-            print(f"Error reading file {csv_path} or column '{column}': {e}")
-            traceback.print_exc()
-        finally:
-            # Clean up DataFrame resources
-            if df is not None:
-                try:
-                    del df
-                except:
-                    pass
-    
-    print(f"Total texts loaded: {len(result)}")
+            result[column].extend(file_texts)
+
+    for column in columns:
+        print(f"Total texts loaded for '{column}': {len(result[column])}")
     return result
 
 
+@instrumented()
+def get_texts_from_csv(csv_paths: Union[str, List[str]], column: str) -> List[str]:
+    """
+    Read texts from a specified column in one or multiple CSV or Excel files.
+    Thin wrapper around get_text_columns (cached, concurrent reads).
+    """
+    return get_text_columns(csv_paths, [column])[column]
+
+
+@instrumented()
 def add_text_overlay(clip: VideoFileClip, text: str, size: Tuple[int, int]) -> CompositeVideoClip:
     """Overlay centered text on a video clip."""
     txt_clip = None
@@ -164,6 +282,7 @@ def add_text_overlay(clip: VideoFileClip, text: str, size: Tuple[int, int]) -> C
         return clip
 
 
+@instrumented()
 def parse_video_overlay_entry(row: pd.Series) -> VideoOverlayEntry:
     """
     Parse a row from Excel/CSV into a VideoOverlayEntry.
@@ -230,6 +349,7 @@ def parse_video_overlay_entry(row: pd.Series) -> VideoOverlayEntry:
     )
 
 
+@instrumented()
 def load_video_overlay_entries_from_excel(excel_path: str) -> List[VideoOverlayEntry]:
     """
     Load video overlay entries from an Excel file with UTF-8 encoding support.
@@ -264,7 +384,230 @@ def load_video_overlay_entries_from_excel(excel_path: str) -> List[VideoOverlayE
         return []
 
 
-def prepare_video_clip(video_path: str, main_clip, clip_name: str = "Video") -> Optional[VideoFileClip]:
+# Column families that make up one text overlay in the tracker ("Text 1", "Font Size 1", ...)
+OVERLAY_INT_COLUMNS = {
+    "Hor Offset": 50,      # Default to center
+    "Vert Offset": 50,     # Default to middle
+    "Font Size": 50,       # Default size
+    "Stroke Width": 2      # Default width
+}
+OVERLAY_STR_COLUMNS = {
+    "Color": "black",         # Default color
+    "Stroke Color": "white"   # Default stroke
+}
+TRACKER_ENTRY_COLUMNS = ["Image Path", "Audio Path", "Output Video Path", "Head Video", "Tail Video", "Status", "Notes"]
+TRACKER_CACHE_VERSION = 1
+
+_OVERLAY_COLUMN_PATTERN = re.compile(
+    r"^(Text|" + "|".join(re.escape(name) for name in list(OVERLAY_INT_COLUMNS) + list(OVERLAY_STR_COLUMNS)) + r") (\d+)$"
+)
+
+
+def _normalize_status(status: str) -> str:
+    """Normalize a tracker status for matching ("To Do" -> "todo")."""
+    return str(status).lower().replace(" ", "")
+
+
+def _str_column(df: pd.DataFrame, column: str, default: str) -> pd.Series:
+    """Vectorized safe_str_convert for a whole column."""
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    values = df[column].astype(object).where(df[column].notna(), "").astype(str).str.strip()
+    return values.where(values != "", default)
+
+
+def _int_column(df: pd.DataFrame, column: str, default: int) -> pd.Series:
+    """Vectorized safe_int_convert for a whole column (truncates floats like int(float(x)))."""
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype="int64")
+    values = pd.to_numeric(df[column], errors="coerce")
+    return values.fillna(default).astype("int64")
+
+
+def _tracker_cache_path(excel_path: str) -> str:
+    """Sidecar cache file stored next to the workbook."""
+    directory, filename = os.path.split(excel_path)
+    return os.path.join(directory, f".{filename}.entries.pkl")
+
+
+def _read_tracker_cache(cache_path: str, excel_path: str, status_filter: Optional[str]) -> Optional[List[VideoOverlayEntry]]:
+    """Return cached entries if the sidecar matches the workbook's current mtime/size."""
+    try:
+        if not os.path.exists(cache_path):
+            return None
+        stat = os.stat(excel_path)
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+        if (cached.get("version") == TRACKER_CACHE_VERSION
+                and cached.get("mtime_ns") == stat.st_mtime_ns
+                and cached.get("size") == stat.st_size
+                and cached.get("status_filter") == status_filter):
+            return cached["entries"]
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable tracker cache {cache_path}: {e}")
+    return None
+
+
+def _write_tracker_cache(cache_path: str, excel_path: str, status_filter: Optional[str], entries: List[VideoOverlayEntry]) -> None:
+    """Write the parsed entries sidecar (atomically, so a crash never leaves a half file)."""
+    try:
+        stat = os.stat(excel_path)
+        payload = {
+            "version": TRACKER_CACHE_VERSION,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "status_filter": status_filter,
+            "entries": entries
+        }
+        temp_path = f"{cache_path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        print(f"Warning: Could not write tracker cache {cache_path}: {e}")
+
+
+@instrumented()
+def parse_video_overlay_entries(df: pd.DataFrame) -> List[VideoOverlayEntry]:
+    """
+    Parse a whole tracker DataFrame into VideoOverlayEntry objects column by column.
+    Same rules as parse_video_overlay_entry (overlays stop at the first empty
+    "Text i", rows without overlays are skipped) but without per-row Series or prints.
+    
+    Args:
+        df: Tracker DataFrame (raw cells, NaN allowed)
+        
+    Returns:
+        List of VideoOverlayEntry objects
+    """
+    if df.empty:
+        return []
+
+    # Overlay indices present in the sheet, in order (Text 1, Text 2, ...)
+    indices = []
+    i = 1
+    while f"Text {i}" in df.columns:
+        indices.append(i)
+        i += 1
+
+    overlay_columns = []
+    still_open = pd.Series(True, index=df.index)
+    for i in indices:
+        texts = _str_column(df, f"Text {i}", "")
+        still_open = still_open & (texts != "")
+        if not still_open.any():
+            break
+        overlay_columns.append((
+            still_open.to_numpy(),
+            texts.to_numpy(),
+            {name: _int_column(df, f"{name} {i}", default).to_numpy() for name, default in OVERLAY_INT_COLUMNS.items()},
+            {name: _str_column(df, f"{name} {i}", default).to_numpy() for name, default in OVERLAY_STR_COLUMNS.items()}
+        ))
+
+    entry_columns = {name: _str_column(df, name, "").to_numpy() for name in TRACKER_ENTRY_COLUMNS}
+
+    entries = []
+    skipped = 0
+    for row in range(len(df)):
+        overlays = []
+        for active, texts, ints, strs in overlay_columns:
+            if not active[row]:
+                break
+            overlays.append(TextOverlay(
+                text=texts[row],
+                horizontal_offset=int(ints["Hor Offset"][row]),
+                vertical_offset=int(ints["Vert Offset"][row]),
+                style=TextStyle(
+                    font_size=int(ints["Font Size"][row]),
+                    text_color=strs["Color"][row],
+                    stroke_color=strs["Stroke Color"][row],
+                    stroke_width=int(ints["Stroke Width"][row])
+                )
+            ))
+
+        if not overlays:
+            skipped += 1
+            continue
+
+        entries.append(VideoOverlayEntry(
+            image_path=entry_columns["Image Path"][row],
+            audio_path=entry_columns["Audio Path"][row],
+            output_video_path=entry_columns["Output Video Path"][row],
+            overlays=overlays,
+            head_video_path=entry_columns["Head Video"][row],
+            tail_video_path=entry_columns["Tail Video"][row],
+            status=entry_columns["Status"][row],
+            notes=entry_columns["Notes"][row]
+        ))
+
+    if skipped:
+        print(f"Skipped {skipped} rows without valid text overlays")
+    return entries
+
+
+@instrumented()
+def load_video_overlay_entries_filtered(
+    excel_path: str,
+    status_filter: Optional[str] = "todo",
+    use_cache: bool = True
+) -> List[VideoOverlayEntry]:
+    """
+    Fast tracker loader: reads only the columns it needs, filters on status
+    before parsing, parses overlay column families in vectorized form and
+    keeps a parsed sidecar cache keyed by the workbook's mtime and size.
+    
+    Args:
+        excel_path: Path to the Excel (or CSV) tracker
+        status_filter: Keep only rows whose normalized status contains this
+            value (e.g. "todo" matches "ToDo" and "To Do"); None keeps all rows
+        use_cache: Read/write the ".<workbook>.entries.pkl" sidecar next to the workbook
+        
+    Returns:
+        List of VideoOverlayEntry objects
+    """
+    normalized_filter = _normalize_status(status_filter) if status_filter else None
+    cache_path = _tracker_cache_path(excel_path)
+
+    try:
+        if use_cache:
+            cached_entries = _read_tracker_cache(cache_path, excel_path, normalized_filter)
+            if cached_entries is not None:
+                print(f"Loaded {len(cached_entries)} entries from tracker cache: {os.path.basename(excel_path)}")
+                return cached_entries
+
+        wanted = lambda column: column in TRACKER_ENTRY_COLUMNS or bool(_OVERLAY_COLUMN_PATTERN.match(str(column)))
+        if excel_path.lower().endswith(('.xlsx', '.xls')):
+            df = pd.read_excel(excel_path, engine='openpyxl', usecols=wanted)
+        else:
+            df = pd.read_csv(excel_path, usecols=wanted)
+
+        # Filter on status before any row parsing
+        if normalized_filter:
+            if "Status" not in df.columns:
+                print(f"Warning: No 'Status' column in {excel_path}, nothing matches '{status_filter}'")
+                df = df.iloc[0:0]
+            else:
+                statuses = df["Status"].astype(object).where(df["Status"].notna(), "").astype(str)
+                mask = statuses.str.lower().str.replace(" ", "", regex=False).str.contains(normalized_filter, regex=False)
+                df = df[mask]
+
+        entries = parse_video_overlay_entries(df)
+        print(f"Parsed {len(entries)} entries from {os.path.basename(excel_path)}")
+
+        if use_cache:
+            _write_tracker_cache(cache_path, excel_path, normalized_filter, entries)
+
+        return entries
+
+    except Exception as e:
+        print(f"Error reading Excel file: {str(e)}")
+        traceback.print_exc()
+        return []
+
+
+@instrumented()
+def prepare_video_clip(video_path: str, main_clip, clip_name: str = "Video", decoder: str = "ffmpeg",
+                       decode_at_target_size: bool = False) -> Optional[VideoFileClip]:
     """
     Load a video clip from path and adjust its parameters to match the main clip.
     No concatenation is performed - just preparation.
@@ -273,6 +616,8 @@ def prepare_video_clip(video_path: str, main_clip, clip_name: str = "Video") ->
         video_path: Path to the video file to load
         main_clip: The reference clip to match parameters against
         clip_name: Name for logging purposes
+        decoder: Frame decoder ("ffmpeg" or "opencv", see frame_source)
+        decode_at_target_size: Decode directly at the main clip's size instead of resizing afterwards
         
     Returns:
         VideoFileClip: The prepared video clip with matching parameters, or None if failed
@@ -289,7 +634,7 @@ def prepare_video_clip(video_path: str, main_clip, clip_name: str = "Video") ->
         print(f"Loading {clip_name.lower()} video: {video_path}")
         
         # Load the video
-        video_clip = VideoFileClip(video_path)
+        video_clip = open_video_clip(video_path, decoder, target_size=tuple(main_clip.size) if decode_at_target_size else None)
         original_clip = video_clip  # Keep reference for potential cleanup
         
         # Validate the clip can generate frames
@@ -360,15 +705,15 @@ def prepare_video_clip(video_path: str, main_clip, clip_name: str = "Video") ->
 
 
 def get_youtube_optimized_settings(silent: bool = False) -> dict:
-    """Get optimized settings for YouTube upload"""
-    return {
+    """Get optimized settings for YouTube upload (draft settings during a preview render)"""
+    return apply_preview_to_export_settings({
         "fps": 12,
         "codec": "libx264",
         "audio_codec": "aac",
         "preset": "slow",
         "bitrate": "1500k",
         "audio_bitrate": "128k",
-        "temp_audiofile": "temp-audio.m4a",
+        "temp_audiofile": scratch_file("temp-audio.m4a"),
         "remove_temp": True,
         "ffmpeg_params": [
             "-pix_fmt", "yuv420p",
@@ -385,11 +730,120 @@ def get_youtube_optimized_settings(silent: bool = False) -> dict:
             "-color_primaries", "bt709",
             "-color_trc", "bt709"
         ],
-        "threads": 4,
+        "threads": get_resource_budget().encoder_threads,
         "logger": None if silent else "bar"  # 🚀 FIXED: Configurable logger
+    })
+
+
+def get_intermediate_export_settings(intermediate_format: IntermediateFormat, fps: int = 24) -> dict:
+    """
+    write_videofile settings for a pipeline-internal artifact in the given format:
+    cheap to encode and decode, no bitrate limits and no faststart rewrite.
+    Preview renders only lower the frame rate (quality options do not apply).
+    """
+    preview = get_preview_settings()
+    if preview is not None:
+        fps = min(fps, preview.fps)
+    return {
+        "fps": fps,
+        "codec": intermediate_format.video_codec,
+        "audio_codec": intermediate_format.audio_codec,
+        "preset": "ultrafast",
+        "temp_audiofile": scratch_file("temp-audio.wav"),
+        "remove_temp": True,
+        "ffmpeg_params": ["-pix_fmt", intermediate_format.pix_fmt] + list(intermediate_format.video_params),
+        "threads": get_resource_budget().encoder_threads,
+        "logger": None
     }
 
 
+# Rate-control/tuning options replaced by a single CRF in preview renders
+PREVIEW_REPLACED_FFMPEG_PARAMS = {"-crf", "-maxrate", "-bufsize", "-tune"}
+
+
+def apply_preview_to_export_settings(export_settings: dict) -> dict:
+    """
+    Adjust write_videofile settings for the active preview render: lower fps,
+    fast preset and CRF instead of bitrate limits. Unchanged for full renders.
+    """
+    preview = get_preview_settings()
+    if preview is None:
+        return export_settings
+
+    settings = dict(export_settings)
+    settings["fps"] = min(settings.get("fps") or preview.fps, preview.fps)
+    settings["preset"] = preview.preset
+    settings.pop("bitrate", None)
+
+    params = list(settings.get("ffmpeg_params") or [])
+    kept = []
+    index = 0
+    while index < len(params):
+        if params[index] in PREVIEW_REPLACED_FFMPEG_PARAMS:
+            index += 2  # Skip the option and its value
+            continue
+        kept.append(params[index])
+        index += 1
+    settings["ffmpeg_params"] = kept + ["-crf", str(preview.crf)]
+    return settings
+
+
+def get_preview_windows(duration: float, boundaries: List[float], window: float) -> List[Tuple[float, float]]:
+    """
+    Merge the [boundary - window, boundary + window] ranges of a timeline.
+    Boundaries are clamped to [0, duration], so float("inf") means the end of the clip.
+    """
+    ranges = sorted(
+        (max(0.0, min(boundary, duration) - window), min(duration, min(boundary, duration) + window))
+        for boundary in boundaries
+    )
+    merged = []
+    for start, end in ranges:
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def apply_preview_to_clip(clip, boundaries: Optional[List[float]] = None):
+    """
+    Cut and downscale a clip for the active preview render. Unchanged for full renders.
+    
+    Args:
+        clip: Clip about to be written
+        boundaries: Head/tail boundary times in seconds (float("inf") = end of the clip),
+            kept when PreviewSettings.boundary_window is set; None keeps the whole timeline
+        
+    Returns:
+        The preview clip (or the original clip)
+    """
+    preview = get_preview_settings()
+    if preview is None:
+        return clip
+
+    if preview.boundary_window > 0 and boundaries:
+        windows = get_preview_windows(clip.duration, boundaries, preview.boundary_window)
+        if windows:
+            print(f"👀 Preview: keeping {len(windows)} boundary windows of ±{preview.boundary_window:.1f}s")
+            pieces = [clip.subclipped(start, end) for start, end in windows]
+            clip = pieces[0] if len(pieces) == 1 else concatenate_videoclips(pieces, method="compose")
+
+    if preview.max_duration > 0 and clip.duration > preview.max_duration:
+        print(f"👀 Preview: keeping the first {preview.max_duration:.1f}s of {clip.duration:.1f}s")
+        clip = clip.subclipped(0, preview.max_duration)
+
+    if preview.scale != 1:
+        clip = clip.resized(new_size=preview.scaled_size(clip.size))
+    return clip
+
+
+@instrumented()
+@verified_output
+@budgeted_render(processes=4)  # audio reader, head/tail readers, writer
+@job_scratch()
 def create_video_from_image_and_audio(
     image_path: str,
     text_overlays: List[TextOverlay],
@@ -402,11 +856,21 @@ def create_video_from_image_and_audio(
     use_ffmpeg_concat: bool = True,
     use_temp_dir: bool = False,
     safe_area_pct: Tuple[int, int, int, int] = (5, 6, 14, 6),
-    max_text_width_ratio: float = 0.90
+    max_text_width_ratio: float = 0.90,
+    save_overlay_image_to_disk: bool = False,
+    decoder: str = "ffmpeg"
 ) -> str:
     """
     Complete pipeline: Create video from image + text overlays + audio with optional head/tail.
-    Now uses the new PIL-based static image overlay function for better performance.
+    The overlay frame is composited with PIL and handed to the video stage in memory,
+    so no PNG encode/decode round trip is needed.
+    
+    Args:
+        use_temp_dir: Kept for compatibility; temporary files always go to the job's
+            private scratch space (see scratch_space.ScratchSpace)
+        save_overlay_image_to_disk: Also write the composited overlay PNG to
+            output_dir/temp_overlays for auditing (kept after the render)
+        decoder: Decoder of the head/tail videos ("ffmpeg" or "opencv", see frame_source)
     
     Returns:
         str: Path to created video file, or empty string on error
@@ -416,8 +880,6 @@ def create_video_from_image_and_audio(
     image_clip = None
     main_clip = None
     final_clip = None
-    temp_files = []
-    temp_dir = None
     
     try:
         print(f"🎬 Creating video from image and audio...")
@@ -434,47 +896,39 @@ def create_video_from_image_and_audio(
         if output_dir is None:
             output_dir = BASE_DIRECTORY
         
-        # Setup temporary directory if requested
-        if use_temp_dir:
-            import tempfile
-            temp_dir = tempfile.mkdtemp(prefix="video_creation_")
-            print(f"📁 Using temporary directory: {temp_dir}")
-        
-        # STEP 1: Create static image with text overlays using PIL
-        print("🎨 Creating image with text overlays (using PIL)...")
-        
-        # Determine temporary output directory for the overlay image
-        overlay_output_dir = temp_dir if use_temp_dir else os.path.join(output_dir, "temp_overlays")
+        # STEP 1: Composite text overlays onto the image in memory using PIL
+        print("🎨 Creating image with text overlays (using PIL, in memory)...")
         
-        overlay_image_path = create_image_with_text_overlays_static(
+        overlay_image = compose_image_with_text_overlays(
             image_path=image_path,
             text_overlays=text_overlays,
-            output_dir=overlay_output_dir,
             safe_area_pct=safe_area_pct,
-            max_text_width_ratio=max_text_width_ratio
+            max_text_width_ratio=max_text_width_ratio,
+            target_size=size
         )
         
-        if not overlay_image_path or not os.path.exists(overlay_image_path):
+        if overlay_image is None:
             raise ValueError("Failed to create image with text overlays")
         
-        # Track temporary file for cleanup
-        if use_temp_dir:
-            temp_files.append(overlay_image_path)
+        # Optional side output for auditing the composited frame
+        if save_overlay_image_to_disk:
+            overlay_output_dir = os.path.join(output_dir, "temp_overlays")
+            save_overlay_image(
+                overlay_image,
+                get_overlay_output_path(image_path, text_overlays, overlay_output_dir)
+            )
         
-        print(f"✅ Created overlay image: {os.path.basename(overlay_image_path)}")
+        print(f"✅ Created overlay frame: {overlay_image.size[0]}x{overlay_image.size[1]}")
         
-        # STEP 2: Load audio and create video clip from the overlay image
+        # STEP 2: Load audio and create video clip from the overlay frame
         print("🎵 Loading audio...")
         audio = AudioFileClip(audio_path)
         audio_duration = audio.duration
         print(f"⏱️ Audio duration: {audio_duration:.2f} seconds")
         
-        print("🖼️ Creating video clip from overlay image...")
-        image_clip = ImageClip(overlay_image_path, duration=audio_duration)
-        
-        # Resize image clip to target size
-        print(f"📐 Resizing to {size[0]}x{size[1]}...")
-        image_clip = image_clip.resized(size)
+        print("🖼️ Creating video clip from overlay frame...")
+        image_clip = ImageClip(np.asarray(overlay_image), duration=audio_duration)
+        overlay_image = None  # The clip holds the frame array now
         
         # Set audio
         main_clip = image_clip.with_audio(audio)
@@ -486,7 +940,7 @@ def create_video_from_image_and_audio(
         # Add head video if provided
         if head_video_path and os.path.exists(head_video_path):
             print(f"🎬 Adding head video: {os.path.basename(head_video_path)}")
-            head_clip = prepare_video_clip(head_video_path, main_clip, "Head")
+            head_clip = prepare_video_clip(head_video_path, main_clip, "Head", decoder)
             if head_clip:
                 clips_to_concat.append(head_clip)
         
@@ -496,7 +950,7 @@ def create_video_from_image_and_audio(
         # Add tail video if provided
         if tail_video_path and os.path.exists(tail_video_path):
             print(f"🎬 Adding tail video: {os.path.basename(tail_video_path)}")
-            tail_clip = prepare_video_clip(tail_video_path, main_clip, "Tail")
+            tail_clip = prepare_video_clip(tail_video_path, main_clip, "Tail", decoder)
             if tail_clip:
                 clips_to_concat.append(tail_clip)
         
@@ -507,27 +961,37 @@ def create_video_from_image_and_audio(
         else:
             final_clip = clips_to_concat[0]
         
+        # Head/main and main/tail boundaries for preview renders
+        boundaries = list(np.cumsum([clip.duration for clip in clips_to_concat[:-1]]))
+        preview_clip = apply_preview_to_clip(final_clip, boundaries)
+        
         # STEP 5: Generate output path and export
         if not output_path:
             # Generate filename from image name
             base_name = os.path.splitext(os.path.basename(image_path))[0]
             output_filename = f"{base_name}_video.mp4"
             output_path = os.path.join(output_dir, output_filename)
+            if get_preview_settings() is not None:
+                output_path = preview_output_path(output_path)
         
         # Ensure output directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
         print(f"💾 Exporting final video: {os.path.basename(output_path)}")
-        print(f"⏱️ Final duration: {final_clip.duration:.2f} seconds")
+        print(f"⏱️ Final duration: {preview_clip.duration:.2f} seconds")
         
         # Get optimized export settings
         export_settings = get_youtube_optimized_settings(silent=False)
         
         # Export the video
-        final_clip.write_videofile(
-            output_path,
-            **export_settings
-        )
+        expect_output(output_path, preview_clip.duration)
+        with metric_span("encode", output=os.path.basename(output_path)) as span:
+            preview_clip.write_videofile(
+                output_path,
+                **export_settings
+            )
+            span.add_frames(preview_clip.duration * export_settings["fps"])
+            span.wrote_file(output_path)
         
         print(f"✅ Video created successfully: {output_path}")
         return output_path
@@ -547,35 +1011,20 @@ def create_video_from_image_and_audio(
                     clip.close()
                 except:
                     pass
-        
-        # Clean up temporary files if using temp directory
-        if use_temp_dir and temp_files:
-            print("🧹 Cleaning up temporary files...")
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
-                        print(f"🗑️ Removed: {os.path.basename(temp_file)}")
-                except Exception as e:
-                    print(f"⚠️ Could not remove temp file {temp_file}: {e}")
-        
-        # Clean up temporary directory
-        if use_temp_dir and temp_dir and os.path.exists(temp_dir):
-            try:
-                import shutil
-                shutil.rmtree(temp_dir)
-                print(f"🗑️ Removed temporary directory: {temp_dir}")
-            except Exception as e:
-                print(f"⚠️ Could not remove temp directory {temp_dir}: {e}")
 
+@instrumented()
+@verified_output
+@budgeted_render(processes=3)  # two readers + writer
+@job_scratch()
 def CreateAudioFile(
-    output_file: str, 
+    output_file: Optional[str], 
     music_overlay_path: str, 
     text_audio_overlay_path: str,
     set_duration_by_text_audio: bool = True,
     time_of_music_after_voice: float = 0.0,
-    time_of_music_before_voice: float = 0.0
-) -> None:
+    time_of_music_before_voice: float = 0.0,
+    return_audio: bool = False
+) -> Optional[InMemoryAudio]:
     """
     Create and export an audio file by combining music and text audio tracks.
     The final duration is determined by the longer of the two input audio files,
@@ -588,6 +1037,10 @@ def CreateAudioFile(
         set_duration_by_text_audio: If True, set duration to text audio + music timing parameters
         time_of_music_after_voice: Time in seconds for music to last after the voice
         time_of_music_before_voice: Time in seconds for music to play before the voice starts
+        return_audio: Also return the mix as InMemoryAudio (output_file may then be None to skip the file)
+
+    Returns:
+        InMemoryAudio if return_audio is True and the mix was created, otherwise None
     """
     music_audio = None
     text_audio = None
@@ -661,7 +1114,7 @@ def CreateAudioFile(
                 music_extended = music_audio.subclipped(0, final_duration)
 
         # ✅ CORRECT for MoviePy 2.2.1:
-        music_extended = music_extended * 0.3  # Simple multiplication works best
+        music_extended = music_extended * MUSIC_OVERLAY_VOLUME  # Simple multiplication works best
         
         audio_tracks.append(music_extended)
         print("Added background music track (30% volume)")
@@ -674,14 +1127,23 @@ def CreateAudioFile(
             composite_audio = audio_tracks[0]
             print("Using single audio track")
 
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        if output_file:
+            # Ensure output directory exists
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+            # Export audio file
+            print(f"Exporting audio to: {output_file}")
+            expect_output(output_file, composite_audio.duration)
+            with metric_span("encode_audio", output=os.path.basename(output_file)) as span:
+                composite_audio.write_audiofile(output_file)
+                span.wrote_file(output_file)
 
-        # Export audio file
-        print(f"Exporting audio to: {output_file}")
-        composite_audio.write_audiofile(output_file)
+            print(f"Successfully created audio file: {output_file}")
 
-        print(f"Successfully created audio file: {output_file}")
+        if return_audio:
+            in_memory = InMemoryAudio.from_clip(composite_audio)
+            print(f"Kept audio in memory: {in_memory.duration:.2f}s")
+            return in_memory
 
     except Exception as e:
         print(f"Error creating audio file: {e}")
@@ -711,6 +1173,7 @@ def CreateAudioFile(
 
 
 
+@instrumented()
 def resize_and_crop_clip(clip: VideoFileClip, size: Tuple[int, int], resize_dim: str) -> VideoFileClip:
     """Resize and crop a clip to the target size."""
     if resize_dim == "height":
@@ -725,190 +1188,163 @@ def resize_and_crop_clip(clip: VideoFileClip, size: Tuple[int, int], resize_dim:
         clip = clip.cropped(y1=y1, y2=y2)
     return clip
 
+@instrumented()
+@verified_output
+@report_live_clips
+@budgeted_render(processes=lambda args: min(len(args["video_paths"]), get_resource_budget().max_open_readers) + 2)  # pooled readers + audio + writer
+@job_scratch()
 def CreateVideoFile(
     output_file: str, 
     size: Tuple[int, int], 
     resize_dim: str, 
-    audio_path: str, 
+    audio_path: Union[str, InMemoryAudio], 
     csv_path: str, 
     text_column: str, 
     video_paths: List[str], 
-    use_audio_duration: bool = False
+    use_audio_duration: bool = False,
+    preview_boundaries: Optional[List[float]] = None,
+    caption_mode: str = "burned",
+    subtitle_columns: Optional[Dict[str, str]] = None,
+    intermediate_format: Optional[IntermediateFormat] = None,
+    decoder: str = "ffmpeg"
 ) -> None:
-    """Create and export a video with overlaid text and audio."""
-    clips = []
-    final_clip = None
-    audio_clip = None
-    final_with_audio = None
+    """
+    Create and export a video with overlaid text and audio.
+    audio_path: Audio file path, or InMemoryAudio returned by CreateAudioFile/ConcatenateAudioFiles
+    preview_boundaries: Head/tail boundary times (seconds, float("inf") = end) kept in
+        boundary-window preview renders; None renders the whole timeline.
+    caption_mode: "burned" renders the CSV texts into the frames; "soft" leaves the frames
+        clean and muxes the texts as timed subtitle tracks (one per language, timed by the
+        clip boundaries, also saved as <output>.<language>.srt sidecars)
+    subtitle_columns: For "soft" captions, ISO 639-2 language code -> CSV column
+        (default: {"und": text_column}), e.g. {"eng": "english_text", "rus": "russian_text"}
+    intermediate_format: Encode output_file as a pipeline-internal artifact in this format
+        (e.g. lossless MKV + PCM) instead of the delivery MP4 settings
+    decoder: Source video decoder ("ffmpeg" or "opencv", see frame_source)
+    """
+    if caption_mode not in CAPTION_MODES:
+        raise ValueError(f"caption_mode must be one of {CAPTION_MODES}, got '{caption_mode}'")
+    soft_captions = caption_mode == "soft"
     audio_duration = 0  # Initialize audio_duration
     
-    try:
-        texts = get_texts_from_csv(csv_path, text_column)
-        
-        # Load audio first to get duration
-        if os.path.exists(audio_path):
-            audio_clip = AudioFileClip(audio_path)
-            audio_duration = audio_clip.duration
-            print(f"Audio duration: {audio_duration:.2f}s")
-        else:
-            print(f"Warning: Audio file not found: {audio_path}")
-            return
-        
-        for idx, path in enumerate(video_paths):
-            if not os.path.exists(path):
-                print(f"Warning: {path} not found. Skipping.")
-                continue
-                
-            original_clip = None
-            current_clip = None
+    # Every clip opened below is owned by the scope and closed when it ends; source
+    # videos share a bounded pool of ffmpeg readers opened lazily per segment.
+    with ClipScope("CreateVideoFile") as scope:
+        try:
+            if soft_captions:
+                subtitle_columns = subtitle_columns or {"und": text_column}
+                subtitle_texts = get_text_columns(csv_path, list(subtitle_columns.values()))
+                texts = []
+            else:
+                texts = get_texts_from_csv(csv_path, text_column)
             
-            try:
-                print(f"Loading video {idx+1}: {os.path.basename(path)}")
-                
-                # ✅ ADDED: Test if video can be loaded
-                original_clip = VideoFileClip(path)
-
-                current_clip = original_clip
-                 
-                # Use the new automatic aspect-ratio decision resize function
-                resized_clip = auto_resize_video_clip(
-                    current_clip, 
-                    size[0], 
-                    size[1]
-                )
-                
-                # # Resize the clip
-                # resized_clip = resize_and_crop_clip(current_clip, size, resize_dim)
-                
-                try:
-                    resized_clip.get_frame(0)
-                    print(f"✓ Resized clip is valid: {os.path.basename(path)}")
-                except Exception as frame_error:
-                    print(f"❌ CORRUPTED RESIZED CLIP: {os.path.basename(path)} - {frame_error}")
-                    # Clean up corrupted resized clip
-                    if resized_clip is not current_clip:
-                        try:
-                            resized_clip.close()
-                        except:
-                            pass
-                    if current_clip:
-                        try:
-                            current_clip.close()
-                        except:
-                            pass
-                    continue  # Skip this corrupted file
-
-                # ✅ FIXED: Use identity check instead of equality
-                if resized_clip is not current_clip:
-                    # current_clip.close()
-                    current_clip = resized_clip
-                
-                # Add text overlay if available
-                if idx < len(texts) and texts[idx].strip():
-                    text_overlay_clip = add_text_overlay(current_clip, texts[idx], size)
-                    
-                    text_overlay_clip.get_frame(0)
-                    
-                    # ✅ FIXED: Use identity check and validate result
-                    if text_overlay_clip is not None and text_overlay_clip is not current_clip:
-                        # current_clip.close()
-                        current_clip = text_overlay_clip
-                    elif text_overlay_clip is None:
-                        print(f"⚠️ Warning: text overlay failed for clip {idx+1}, using original clip")
-                
-                # ✅ ADDED: Final validation before adding to clips list
-                if current_clip is None:
-                    print(f"❌ ERROR: current_clip is None for {path}")
+            # Load audio first to get duration
+            audio_clip = scope.own(open_audio_clip(audio_path), "audio")
+            if audio_clip is not None:
+                audio_duration = audio_clip.duration
+                print(f"Audio duration: {audio_duration:.2f}s")
+            else:
+                print(f"Warning: Audio file not found: {audio_path}")
+                return
+            
+            reader_pool = scope.own(ReaderPool(backend=decoder), "reader pool")
+            clips = []
+            timeline = []  # (duration, CSV row index) of every segment, for subtitle timing
+            segment_paths = []  # Source video of every segment, to release its reader once it has played
+            
+            for idx, path in enumerate(video_paths):
+                if not os.path.exists(path):
+                    print(f"Warning: {path} not found. Skipping.")
                     continue
                     
                 try:
-                    # Test that the clip can generate frames
-                    test_frame = current_clip.get_frame(0)
-                    # Test that the clip has valid duration
+                    print(f"Loading video {idx+1}: {os.path.basename(path)}")
+                    
+                    # Probe only; the decoder starts when this segment's first frame is needed
+                    current_clip = scope.own(LazyVideoSource(path, reader_pool), os.path.basename(path))
                     test_duration = current_clip.duration
-                    if test_duration <= 0:
-                        print(f"❌ ERROR: Invalid duration ({test_duration}) for {path}")
-                        current_clip.close()
+                    if test_duration <= 0 or not all(current_clip.size):
+                        print(f"❌ ERROR: Invalid duration ({test_duration}) or size ({current_clip.size}) for {path}")
                         continue
-                        
+                     
+                    # Use the new automatic aspect-ratio decision resize function
+                    current_clip = auto_resize_video_clip(
+                        current_clip, 
+                        size[0], 
+                        size[1]
+                    )
+                    
+                    # Add text overlay if available
+                    if idx < len(texts) and texts[idx].strip():
+                        text_overlay_clip = add_text_overlay(current_clip, texts[idx], size)
+                        if text_overlay_clip is not None:
+                            current_clip = scope.own(text_overlay_clip, f"text overlay {idx+1}")
+                        else:
+                            print(f"⚠️ Warning: text overlay failed for clip {idx+1}, using original clip")
+                    
                     clips.append(current_clip)
+                    timeline.append((test_duration, idx))
+                    segment_paths.append(path)
                     print(f"✅ Successfully processed clip {idx+1}: {os.path.basename(path)} (duration: {test_duration:.2f}s)")
                     
-                except Exception as validation_error:
-                    print(f"❌ ERROR: Final validation failed for {path}: {validation_error}")
-                    if current_clip:
-                        current_clip.close()
-                    continue
-                
-            except Exception as e:
-                print(f"❌ Error processing {path}: {e}")
-                # Clean up on error
-                if current_clip and current_clip is not original_clip:
-                    try:
-                        current_clip.close()
-                    except:
-                        pass
-                if original_clip:
-                    try:
-                        original_clip.close()
-                    except:
-                        pass
-                continue  # Skip this file and continue with others
-
-        if not clips:
-            print("❌ No valid video clips found after processing. Cannot create video.")
-            print(f"📊 Processing summary:")
-            print(f"   - Total video files: {len(video_paths)}")
-            print(f"   - Files found: {sum(1 for path in video_paths if os.path.exists(path))}")
-            print(f"   - Valid clips created: {len(clips)}")
-            return
+                except Exception as e:
+                    print(f"❌ Error processing {path}: {e}")
+                    continue  # Skip this file and continue with others
+
+            if not clips:
+                print("❌ No valid video clips found after processing. Cannot create video.")
+                print(f"📊 Processing summary:")
+                print(f"   - Total video files: {len(video_paths)}")
+                print(f"   - Files found: {sum(1 for path in video_paths if os.path.exists(path))}")
+                print(f"   - Valid clips created: {len(clips)}")
+                return
 
-        # Create initial video from clips
-        print(f"Creating final video from {len(clips)} valid clips...")
-        
-        # ✅ ADDED: Debug clip information before concatenation
-        for i, clip in enumerate(clips):
-            try:
-                print(f"Clip {i+1}: duration={clip.duration:.2f}s, size={clip.size}")
-            except Exception as e:
-                print(f"Clip {i+1}: ERROR getting info - {e}")
-        
-        final_clip = concatenate_videoclips(clips, method="compose")
-        
-        # ✅ ADDED: Validate final_clip before proceeding
-        if final_clip is None:
-            print("❌ ERROR: concatenate_videoclips returned None")
-            print("This usually means all input clips were invalid or incompatible")
-            return
+            # Create initial video from clips
+            print(f"Creating final video from {len(clips)} valid clips...")
             
-        try:
-            video_duration = final_clip.duration
-            print(f"Initial video duration: {video_duration:.2f}s")
-        except Exception as duration_error:
-            print(f"❌ ERROR: Cannot get duration from final_clip: {duration_error}")
-            return
-
-        # Adjust video duration to match audio if flag is set
-        if use_audio_duration and audio_duration:
-            if audio_duration < video_duration:
-                # Shorten video to match audio
-                print(f"Shortening video from {video_duration:.2f}s to {audio_duration:.2f}s")
-                shortened_clip = final_clip.with_duration(audio_duration)
-                final_clip.close()
-                final_clip = shortened_clip
-                
-            elif audio_duration > video_duration:
-                # Extend video by repeating the last clip
-                print(f"Extending video from {video_duration:.2f}s to {audio_duration:.2f}s")
-                time_needed = audio_duration - video_duration
+            # ✅ ADDED: Debug clip information before concatenation
+            for i, clip in enumerate(clips):
+                try:
+                    print(f"Clip {i+1}: duration={clip.duration:.2f}s, size={clip.size}")
+                except Exception as e:
+                    print(f"Clip {i+1}: ERROR getting info - {e}")
+            
+            final_clip = concatenate_videoclips(clips, method="compose")
+            
+            # ✅ ADDED: Validate final_clip before proceeding
+            if final_clip is None:
+                print("❌ ERROR: concatenate_videoclips returned None")
+                print("This usually means all input clips were invalid or incompatible")
+                return
+            scope.own(final_clip, "final clip")
                 
-                if clips:  # Make sure we have clips
+            try:
+                video_duration = final_clip.duration
+                print(f"Initial video duration: {video_duration:.2f}s")
+            except Exception as duration_error:
+                print(f"❌ ERROR: Cannot get duration from final_clip: {duration_error}")
+                return
+
+            # Adjust video duration to match audio if flag is set
+            if use_audio_duration and audio_duration:
+                if audio_duration < video_duration:
+                    # Shorten video to match audio
+                    print(f"Shortening video from {video_duration:.2f}s to {audio_duration:.2f}s")
+                    final_clip = scope.own(final_clip.with_duration(audio_duration), "shortened clip")
+                    
+                elif audio_duration > video_duration:
+                    # Extend video by repeating the last clip
+                    print(f"Extending video from {video_duration:.2f}s to {audio_duration:.2f}s")
+                    time_needed = audio_duration - video_duration
+                    
                     last_clip = clips[-1]
                     last_clip_duration = last_clip.duration
                     
                     # Calculate how many times we need to repeat the last clip
                     repeats_needed = int(time_needed / last_clip_duration) + 1
                     additional_clips = [last_clip] * repeats_needed
+                    timeline += [timeline[-1]] * repeats_needed
+                    segment_paths += [segment_paths[-1]] * repeats_needed
                     
                     # Create extended clip list
                     extended_clips = clips + additional_clips
@@ -918,115 +1354,104 @@ def CreateVideoFile(
                     if extended_final is None:
                         print("❌ ERROR: Extended concatenate_videoclips returned None")
                         return
-                    
-                    # Close old final_clip
-                    final_clip.close()
-                    final_clip = extended_final
+                    scope.own(extended_final, "extended clip")
                     
                     # Trim to exact audio duration
-                    trimmed_clip = final_clip.with_duration(audio_duration)
-                    final_clip.close()
-                    final_clip = trimmed_clip
+                    final_clip = scope.own(extended_final.with_duration(audio_duration), "trimmed clip")
                     print(f"Added {repeats_needed} repetitions of last clip")
-            
-            video_duration = final_clip.duration
+                
+                video_duration = final_clip.duration
 
-        if video_duration < MIN_DURATION:
-            print(f"Warning: Final video duration ({video_duration:.2f}s) is shorter than MIN_DURATION ({MIN_DURATION}s).")
-        else:
-            print(f"Final video duration: {video_duration:.2f}s")
+            if video_duration < MIN_DURATION:
+                print(f"Warning: Final video duration ({video_duration:.2f}s) is shorter than MIN_DURATION ({MIN_DURATION}s).")
+            else:
+                print(f"Final video duration: {video_duration:.2f}s")
 
-        # Apply audio to video (audio was already loaded at the beginning)
-        if audio_duration > video_duration:
-            print(f"Warning: Audio duration ({audio_duration:.2f}s) is longer than video duration ({video_duration:.2f}s). Audio will be cut to video length.")
-            trimmed_audio = audio_clip.with_duration(video_duration)
-            audio_clip.close()
-            audio_clip = trimmed_audio
+            # Apply audio to video (audio was already loaded at the beginning)
+            if audio_duration > video_duration:
+                print(f"Warning: Audio duration ({audio_duration:.2f}s) is longer than video duration ({video_duration:.2f}s). Audio will be cut to video length.")
+                audio_clip = scope.own(audio_clip.with_duration(video_duration), "trimmed audio")
 
-        # ✅ ADDED: Test if final_clip can generate frames BEFORE creating final_with_audio
-        try:
-            test_frame = final_clip.get_frame(0)
-            print(f"✓ final_clip is valid and can generate frames: {test_frame.shape}")
-        except Exception as frame_error:
-            print(f"❌ CORRUPTED final_clip - cannot generate frames: {frame_error}")
-            return
-            
-        final_with_audio = final_clip.with_audio(audio_clip)
-        
-        # ✅ ADDED: Validate final_with_audio before proceeding
-        if final_with_audio is None:
-            print("❌ ERROR: with_audio() returned None")
-            return
-        
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        
-        # ✅ ADDED: Test if final_with_audio can generate frames
-        try:
-            test_frame = final_with_audio.get_frame(0)
-            print(f"✓ final_with_audio is valid and can generate frames: {test_frame.shape}")
-        except Exception as frame_error:
-            print(f"❌ CORRUPTED final_with_audio - cannot generate frames: {frame_error}")
-            return
+            segment_ends = np.cumsum([duration for duration, _ in timeline])
+            release_finished_readers(final_clip, list(zip(segment_ends, segment_paths)), reader_pool)
 
-        # Write video
-        final_with_audio.write_videofile(
-            output_file,
-            fps=24,
-            codec="libx264",
-            audio_codec="aac",
-            preset="ultrafast",        # 🚀 FASTEST preset (was "medium")
-            bitrate="3000k",          # 🚀 LOWER bitrate (was "8000k") 
-            audio_bitrate="64k",      # 🚀 LOWER audio quality (was "128k")
-            temp_audiofile="temp-audio.m4a",
-            remove_temp=True,
-             ffmpeg_params=[
-                "-pix_fmt", "yuv420p",
-                "-movflags", "+faststart",
-                "-crf", "28",             # 🚀 HIGHER compression = faster
-                "-tune", "fastdecode"     # 🚀 OPTIMIZE for speed
-            ],
-            threads=4,
-            logger=None               # 🚀 DISABLE verbose logging
-        )
-        
-        print(f"Successfully created video: {output_file}")
-        
-    except Exception as e:
-        print(f"Error creating video: {e}")
-        traceback.print_exc()
-        
-    finally:
-        # Clean up all resources
-        print("Cleaning up CreateVideoFile resources...")
-        
-        # Clean up clips in reverse order
-        if final_with_audio:
-            try:
-                final_with_audio.close()
-            except Exception as e:
-                print(f"Warning: Error closing final_with_audio: {e}")
-                
-        if audio_clip:
-            try:
-                audio_clip.close()
-            except Exception as e:
-                print(f"Warning: Error closing audio_clip: {e}")
-                
-        if final_clip:
+            # ✅ ADDED: Test if final_clip can generate frames BEFORE creating final_with_audio
             try:
-                final_clip.close()
-            except Exception as e:
-                print(f"Warning: Error closing final_clip: {e}")
+                test_frame = final_clip.get_frame(0)
+                print(f"✓ final_clip is valid and can generate frames: {test_frame.shape}")
+            except Exception as frame_error:
+                print(f"❌ CORRUPTED final_clip - cannot generate frames: {frame_error}")
+                return
                 
-        # Clean up individual clips
-        for i, clip in enumerate(clips):
-            if clip:
-                try:
-                    clip.close()
-                except Exception as e:
-                    print(f"Warning: Error closing clip {i}: {e}")
+            final_with_audio = final_clip.with_audio(audio_clip)
+            
+            # ✅ ADDED: Validate final_with_audio before proceeding
+            if final_with_audio is None:
+                print("❌ ERROR: with_audio() returned None")
+                return
+            scope.own(final_with_audio, "final with audio")
+            
+            # Ensure output directory exists
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
+            preview_clip = apply_preview_to_clip(final_with_audio, preview_boundaries)
+            if intermediate_format is not None and not intermediate_format.is_delivery:
+                export_settings = get_intermediate_export_settings(intermediate_format, fps=24)
+            else:
+                export_settings = apply_preview_to_export_settings(dict(
+                    fps=24,
+                    codec="libx264",
+                    audio_codec="aac",
+                    preset="ultrafast",        # 🚀 FASTEST preset (was "medium")
+                    bitrate="3000k",          # 🚀 LOWER bitrate (was "8000k") 
+                    audio_bitrate="64k",      # 🚀 LOWER audio quality (was "128k")
+                    temp_audiofile=scratch_file("temp-audio.m4a"),
+                    remove_temp=True,
+                    ffmpeg_params=[
+                        "-pix_fmt", "yuv420p",
+                        "-movflags", "+faststart",
+                        "-crf", "28",             # 🚀 HIGHER compression = faster
+                        "-tune", "fastdecode"     # 🚀 OPTIMIZE for speed
+                    ],
+                    threads=get_resource_budget().encoder_threads,
+                    logger=None               # 🚀 DISABLE verbose logging
+                ))
+
+            # Soft captions: encode clean frames first, then mux the subtitle tracks into output_file
+            encoded_file = scratch_file("captionless" + os.path.splitext(output_file)[1]) if soft_captions else output_file
+
+            # Write video
+            expect_output(output_file, preview_clip.duration)
+            with metric_span("encode", output=os.path.basename(output_file)) as span:
+                preview_clip.write_videofile(encoded_file, **export_settings)
+                span.add_frames(preview_clip.duration * export_settings["fps"])
+                span.wrote_file(encoded_file)
+            
+            if soft_captions:
+                subtitle_tracks = []
+                for language, column in subtitle_columns.items():
+                    cues = build_caption_cues(subtitle_texts.get(column, []), timeline, video_duration)
+                    cues = apply_preview_to_cues(cues, video_duration, preview_boundaries)
+                    srt_path = f"{os.path.splitext(output_file)[0]}.{language}.srt"
+                    write_srt_file(cues, srt_path)
+                    subtitle_tracks.append((srt_path, language))
+                if not mux_subtitle_tracks(encoded_file, output_file, subtitle_tracks):
+                    raise RuntimeError("Muxing the subtitle tracks failed")
+            
+            print(f"Successfully created video: {output_file}")
+            print(f"🎞️ Source readers opened: {reader_pool.opened_count} (max {reader_pool.max_open} at once)")
+            
+        except Exception as e:
+            print(f"Error creating video: {e}")
+            traceback.print_exc()
+            
+        finally:
+            print("Cleaning up CreateVideoFile resources...")
+
+@instrumented()
+@verified_output
+@budgeted_render(processes=lambda args: 2 * len(args["video_paths"]) + 1)  # video/audio readers + writer
+@job_scratch()
 def ConcatenateVideoFiles(
     video_paths: List[str],
     output_file: str,
@@ -1105,27 +1530,35 @@ def ConcatenateVideoFiles(
         # Ensure output directory exists
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
-        # Write output
-        print(f"Writing concatenated video to: {output_file}")
-        final_video.write_videofile(
-            output_file,
+        # Joins between the inputs are the head/tail boundaries of a preview render
+        boundaries = list(np.cumsum([clip.duration for clip in video_clips[:-1]]))
+        preview_video = apply_preview_to_clip(final_video, boundaries)
+        export_settings = apply_preview_to_export_settings(dict(
             fps=24,
             codec="libx264",
             audio_codec="aac",
             preset="ultrafast",        # 🚀 FASTEST preset (was "medium")
             bitrate="3000k",          # 🚀 LOWER bitrate (was "8000k") 
             audio_bitrate="64k",      # 🚀 LOWER audio quality (was "128k")
-            temp_audiofile="temp-audio.m4a",
+            temp_audiofile=scratch_file("temp-audio.m4a"),
             remove_temp=True,
-             ffmpeg_params=[
+            ffmpeg_params=[
                 "-pix_fmt", "yuv420p",
                 "-movflags", "+faststart",
                 "-crf", "28",             # 🚀 HIGHER compression = faster
                 "-tune", "fastdecode"     # 🚀 OPTIMIZE for speed
             ],
-            threads=4,
+            threads=get_resource_budget().encoder_threads,
             logger=None               # 🚀 DISABLE verbose logging
-        )
+        ))
+        
+        # Write output
+        print(f"Writing concatenated video to: {output_file}")
+        expect_output(output_file, preview_video.duration)
+        with metric_span("encode", output=os.path.basename(output_file)) as span:
+            preview_video.write_videofile(output_file, **export_settings)
+            span.add_frames(preview_video.duration * export_settings["fps"])
+            span.wrote_file(output_file)
         
         total_duration = sum(clip.duration for clip in video_clips)
         print(f"Successfully concatenated {len(video_paths)} videos")
@@ -1156,25 +1589,33 @@ def ConcatenateVideoFiles(
                 except Exception as e:
                     print(f"Warning: Error closing clip {i}: {e}")
 
+@instrumented()
+@verified_output
+@budgeted_render(processes=lambda args: len(args["audio_paths"]) + 1)
+@job_scratch()
 def ConcatenateAudioFiles(
-    audio_paths: List[str],
-    output_file: str,
-    silence_between: float = 0
-) -> bool:
+    audio_paths: List[Union[str, InMemoryAudio]],
+    output_file: Optional[str],
+    silence_between: float = 0,
+    return_audio: bool = False
+) -> Union[bool, Optional[InMemoryAudio]]:
     """
     Concatenate multiple audio files into a single audio file.
     
     Args:
-        audio_paths: List of paths to audio files to concatenate
-        output_file: Path for the output concatenated audio
+        audio_paths: List of paths to audio files (or InMemoryAudio) to concatenate
+        output_file: Path for the output concatenated audio (None: no file, requires return_audio)
         silence_between: Duration of silence to insert between clips in seconds (default: 0)
+        return_audio: Return the result as InMemoryAudio instead of a bool
     
     Returns:
         bool: True if successful, False otherwise
+        (return_audio=True: InMemoryAudio if successful, None otherwise)
     """
+    failed = None if return_audio else False
     if not audio_paths:
         print("No audio paths provided")
-        return False
+        return failed
     
     audio_clips = []
     final_audio = None
@@ -1183,23 +1624,23 @@ def ConcatenateAudioFiles(
     try:
         # Load all audio clips
         for i, path in enumerate(audio_paths):
-            if not os.path.exists(path):
+            if not isinstance(path, InMemoryAudio) and not os.path.exists(path):
                 print(f"Warning: Audio file not found: {path}")
                 continue
                 
-            print(f"Loading audio {i+1}/{len(audio_paths)}: {os.path.basename(path)}")
+            print(f"Loading audio {i+1}/{len(audio_paths)}: {describe_audio_source(path)}")
             
             try:
-                clip = AudioFileClip(path)
+                clip = open_audio_clip(path)
                 audio_clips.append(clip)
-                print(f"Loaded: {os.path.basename(path)} - Duration: {clip.duration:.2f}s")
+                print(f"Loaded: {describe_audio_source(path)} - Duration: {clip.duration:.2f}s")
             except Exception as e:
                 print(f"Error loading audio file {path}: {e}")
                 continue
                 
         if not audio_clips:
             print("No valid audio clips found")
-            return False
+            return failed
         
         # Insert silence between clips if requested
         clips_to_concatenate = audio_clips
@@ -1224,24 +1665,30 @@ def ConcatenateAudioFiles(
         print("Concatenating audio clips...")
         final_audio = concatenate_audioclips(clips_to_concatenate)
         
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        
-        # Write the final audio to file
-        print(f"Writing concatenated audio to: {output_file}")
-        final_audio.write_audiofile(output_file)
+        if output_file:
+            # Ensure output directory exists
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            
+            # Write the final audio to file
+            print(f"Writing concatenated audio to: {output_file}")
+            expect_output(output_file, final_audio.duration)
+            with metric_span("encode_audio", output=os.path.basename(output_file)) as span:
+                final_audio.write_audiofile(output_file)
+                span.wrote_file(output_file)
+            print(f"Output saved to: {output_file}")
         
         total_duration = final_audio.duration
         print(f"Successfully concatenated {len(audio_clips)} audio clips")
         print(f"Total duration: {total_duration:.2f}s")
-        print(f"Output saved to: {output_file}")
         
+        if return_audio:
+            return InMemoryAudio.from_clip(final_audio)
         return True
         
     except Exception as e:
         print(f"Error during audio concatenation: {str(e)}")
         traceback.print_exc()
-        return False
+        return failed
     finally:
         # Clean up resources
         print("Cleaning up audio concatenation resources...")
@@ -1288,7 +1735,87 @@ def resolve_path(path: str, base_path: str) -> str:
     # Otherwise join with base_path
     return os.path.join(base_path, path)
 
-def add_voice_to_video(video_path: str, voice_path: str, output_path: str = None, output_dir: str = None) -> str:
+def _voice_output_path(video_path: str, output_path: str = None, output_dir: str = None) -> str:
+    """Output path of add_voice_to_video (auto-generated name unless output_path is given); creates its directory."""
+    if output_path:
+        result_path = output_path
+    else:
+        # Generate filename based on input video name, next to the input unless output_dir is given
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{video_name}_with_voice_{timestamp}.mp4"
+        result_path = os.path.join(output_dir or os.path.dirname(video_path), filename)
+    
+    # Ensure output directory exists
+    os.makedirs(os.path.dirname(result_path) or ".", exist_ok=True)
+    return result_path
+
+
+def mux_centered_voice(video_path: str, voice_path: str, output_path: str) -> bool:
+    """
+    Mix a voice track into the middle of a video's audio without re-encoding the picture:
+    the video stream is copied, only the audio mix is encoded (AAC 128k) and remuxed.
+    
+    Args:
+        video_path: Path to the input video file
+        voice_path: Path to the voice audio file
+        output_path: Path of the result video
+        
+    Returns:
+        bool: True if successful, False otherwise
+        
+    Raises:
+        ValueError: If voice audio is longer than video duration
+    """
+    video_info = probe_media(video_path)
+    voice_info = probe_media(voice_path)
+    if not video_info or not video_info["has_video"]:
+        print(f"❌ Not a video file: {video_path}")
+        return False
+    if not voice_info or not voice_info["has_audio"]:
+        print(f"❌ Not an audio file: {voice_path}")
+        return False
+    if voice_info["duration"] > video_info["duration"]:
+        raise ValueError(f"Voice audio duration ({voice_info['duration']:.2f}s) is longer than video duration ({video_info['duration']:.2f}s)")
+    
+    # Center the voice, mixed like CompositeAudioClip (summed, not normalized)
+    delay_ms = int(round((video_info["duration"] - voice_info["duration"]) / 2 * 1000))
+    audio_format = "aformat=sample_fmts=fltp:sample_rates=44100:channel_layouts=stereo"
+    voice_chain = f"[1:a]{audio_format},adelay=delays={delay_ms}:all=1"
+    if video_info["has_audio"]:
+        filter_complex = f"{voice_chain}[voice];[0:a]{audio_format}[music];[music][voice]amix=inputs=2:duration=first:normalize=0[a]"
+    else:
+        filter_complex = f"{voice_chain},apad=whole_dur={video_info['duration']:.6f}[a]"
+    
+    # Preview renders only keep their first max_duration seconds (a copied stream cannot be windowed)
+    duration = video_info["duration"]
+    preview = get_preview_settings()
+    if preview is not None and preview.max_duration > 0:
+        duration = min(duration, preview.max_duration)
+    
+    cmd = ['ffmpeg', '-i', video_path, '-i', voice_path, '-filter_complex', filter_complex,
+           '-map', '0:v', '-map', '[a]', '-c:v', 'copy', '-c:a', 'aac', '-b:a', '128k',
+           '-t', f"{duration:.6f}", '-movflags', '+faststart', '-y', output_path]
+    
+    try:
+        print(f"🎙️ Muxing centered voice into {os.path.basename(output_path)} (video stream copied)...")
+        expect_output(output_path, duration)
+        with metric_span("encode_audio", output=os.path.basename(output_path), mux_only=True) as span:
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+            span.wrote_file(output_path)
+        print(f"✅ Successfully added voice to video (audio-only re-encode): {output_path}")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"❌ FFmpeg voice mux failed: {e}")
+        print(f"FFmpeg stderr: {e.stderr}")
+        return False
+
+
+@instrumented()
+@verified_output
+@budgeted_render(processes=4)  # video, its audio, voice reader + writer
+@job_scratch()
+def add_voice_to_video(video_path: str, voice_path: str, output_path: str = None, output_dir: str = None, mux_only: bool = False) -> str:
     """
     Add voice audio to an existing video with music, placing the voice in the middle of the video timeline.
     Optimized for FFmpeg concatenation with create_video_with_audio function.
@@ -1298,6 +1825,8 @@ def add_voice_to_video(video_path: str, voice_path: str, output_path: str = None
         voice_path: Path to the voice audio file
         output_path: Optional specific output path for the result video
         output_dir: Optional directory to save the result video (uses auto-generated filename)
+        mux_only: Copy the video stream and only re-encode the audio mix (seconds instead
+            of minutes, no picture quality loss). The output keeps the input's video encoding.
         
     Returns:
         str: Path to the created video file, or None if failed
@@ -1312,6 +1841,10 @@ def add_voice_to_video(video_path: str, voice_path: str, output_path: str = None
     final_video = None
     
     try:
+        if mux_only:
+            result_path = _voice_output_path(video_path, output_path, output_dir)
+            return result_path if mux_centered_voice(video_path, voice_path, result_path) else None
+        
         # Load the video
         video_clip = VideoFileClip(video_path)
         
@@ -1342,35 +1875,17 @@ def add_voice_to_video(video_path: str, voice_path: str, output_path: str = None
         final_video = video_clip.with_audio(composite_audio)
         
         # Determine output path
-        if output_path:
-            result_path = output_path
-        elif output_dir:
-            # Generate filename based on input video name
-            video_name = os.path.splitext(os.path.basename(video_path))[0]
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{video_name}_with_voice_{timestamp}.mp4"
-            result_path = os.path.join(output_dir, filename)
-        else:
-            # Use same directory as input video
-            video_dir = os.path.dirname(video_path)
-            video_name = os.path.splitext(os.path.basename(video_path))[0]
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{video_name}_with_voice_{timestamp}.mp4"
-            result_path = os.path.join(video_dir, filename)
-        
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(result_path), exist_ok=True)
+        result_path = _voice_output_path(video_path, output_path, output_dir)
         
         # 🚀 OPTIMIZED: Use IDENTICAL settings to create_video_with_audio for perfect FFmpeg concat compatibility
-        final_video.write_videofile(
-            result_path,
+        export_settings = apply_preview_to_export_settings(dict(
             fps=12,                    # MATCH: Same as main clip
             codec="libx264",           # MATCH: Same codec
             audio_codec="aac",         # MATCH: Same audio codec
             preset="slow",             # MATCH: Same preset for quality
             bitrate="1500k",           # MATCH: Same bitrate
             audio_bitrate="128k",      # MATCH: Same audio bitrate
-            temp_audiofile="temp-audio.m4a",
+            temp_audiofile=scratch_file("temp-audio.m4a"),
             remove_temp=True,
             ffmpeg_params=[
                 "-pix_fmt", "yuv420p",         # MATCH: Same pixel format
@@ -1387,9 +1902,15 @@ def add_voice_to_video(video_path: str, voice_path: str, output_path: str = None
                 "-color_primaries", "bt709",   # MATCH: Same color primaries
                 "-color_trc", "bt709"          # MATCH: Same color transfer
             ],
-            threads=4,                 # MATCH: Same thread count
+            threads=get_resource_budget().encoder_threads,  # From the machine-wide resource budget
             logger=None                # MATCH: Silent logging
-        )
+        ))
+        preview_video = apply_preview_to_clip(final_video)
+        expect_output(result_path, preview_video.duration)
+        with metric_span("encode", output=os.path.basename(result_path)) as span:
+            preview_video.write_videofile(result_path, **export_settings)
+            span.add_frames(preview_video.duration * export_settings["fps"])
+            span.wrote_file(result_path)
         
         print(f"✅ Successfully added voice to video with FFmpeg-optimized encoding: {result_path}")
         return result_path
@@ -1420,6 +1941,241 @@ def add_voice_to_video(video_path: str, voice_path: str, output_path: str = None
                     print(f"Warning: Error closing {name}: {cleanup_error}")
 
 
+def _parse_frame_rate(rate: str) -> float:
+    try:
+        numerator, _, denominator = str(rate).partition("/")
+        return float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+_PROBE_CACHE = {}
+_PROBE_CACHE_LOCK = threading.Lock()
+
+
+def probe_media(path: str) -> Optional[dict]:
+    """
+    Read stream information of a media file with ffprobe (no decoding).
+    Results are cached by (path, mtime, size).
+    
+    Args:
+        path: Video or audio file
+        
+    Returns:
+        dict with "duration", "has_video", "has_audio", "width", "height", "fps",
+        "rotation", "video_codec", "audio_codec", or None if the file cannot be probed
+    """
+    if not os.path.exists(path):
+        print(f"Warning: File not found: {path}")
+        return None
+
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _PROBE_CACHE_LOCK:
+        if key in _PROBE_CACHE:
+            return dict(_PROBE_CACHE[key])
+
+    cmd = ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        data = json.loads(result.stdout)
+    except (subprocess.CalledProcessError, ValueError) as e:
+        print(f"❌ ffprobe failed for {path}: {e}")
+        return None
+
+    video = next((stream for stream in data.get("streams", []) if stream.get("codec_type") == "video"
+                  and not stream.get("disposition", {}).get("attached_pic")), None)
+    audio = next((stream for stream in data.get("streams", []) if stream.get("codec_type") == "audio"), None)
+    info = {
+        "duration": float(data.get("format", {}).get("duration") or (video or audio or {}).get("duration") or 0),
+        "has_video": video is not None,
+        "has_audio": audio is not None,
+        "width": 0,
+        "height": 0,
+        "fps": 0.0,
+        "rotation": 0,
+        "video_codec": video.get("codec_name", "") if video else "",
+        "audio_codec": audio.get("codec_name", "") if audio else "",
+    }
+    if video:
+        rotation = int(float(video.get("tags", {}).get("rotate", 0) or 0))
+        for side_data in video.get("side_data_list", []):
+            if "rotation" in side_data:
+                rotation = int(float(side_data["rotation"]))
+        width, height = int(video.get("width", 0)), int(video.get("height", 0))
+        if rotation % 180:
+            width, height = height, width  # ffmpeg auto-rotates while decoding
+        info.update(width=width, height=height, rotation=rotation,
+                    fps=_parse_frame_rate(video.get("avg_frame_rate") or video.get("r_frame_rate")))
+
+    with _PROBE_CACHE_LOCK:
+        _PROBE_CACHE[key] = info
+    return dict(info)
+
+
+def resize_filter(source_size: Tuple[int, int], target_size: Tuple[int, int]) -> str:
+    """
+    FFmpeg scale/crop/pad chain with the auto_resize_video_clip rules:
+    same orientation -> stretch, horizontal to vertical -> crop, vertical to horizontal -> letterbox.
+    """
+    width, height = target_size
+    source_is_horizontal = source_size[0] / source_size[1] > 1.0
+    target_is_horizontal = width / height > 1.0
+
+    if source_is_horizontal and not target_is_horizontal:
+        return f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}"
+    if target_is_horizontal and not source_is_horizontal:
+        return (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black")
+    return f"scale={width}:{height}"
+
+
+def build_caption_cues(texts: List[str], timeline: List[Tuple[float, int]], total_duration: float) -> List[Tuple[float, float, str]]:
+    """
+    Time CSV captions by the clip boundaries.
+    
+    Args:
+        texts: Caption per CSV row
+        timeline: (segment duration, CSV row index) of every segment in playback order
+        total_duration: Final video duration; later cues are cut at this point
+        
+    Returns:
+        List of (start, end, text) cues; segments without text get no cue
+    """
+    cues = []
+    start = 0.0
+    for duration, row in timeline:
+        end = min(start + duration, total_duration)
+        text = str(texts[row]).strip() if row < len(texts) else ""
+        if text and end > start:
+            cues.append((start, end, text))
+        start += duration
+        if start >= total_duration:
+            break
+    return cues
+
+
+def apply_preview_to_cues(cues: List[Tuple[float, float, str]], duration: float,
+                          boundaries: Optional[List[float]] = None) -> List[Tuple[float, float, str]]:
+    """Re-time cues for the cuts apply_preview_to_clip makes in a preview render. Unchanged for full renders."""
+    preview = get_preview_settings()
+    if preview is None:
+        return cues
+
+    if preview.boundary_window > 0 and boundaries:
+        windows = get_preview_windows(duration, boundaries, preview.boundary_window)
+        if windows:
+            shifted = []
+            offset = 0.0
+            for window_start, window_end in windows:
+                for start, end, text in cues:
+                    cut_start, cut_end = max(start, window_start), min(end, window_end)
+                    if cut_end > cut_start:
+                        shifted.append((cut_start - window_start + offset, cut_end - window_start + offset, text))
+                offset += window_end - window_start
+            cues = shifted
+
+    if preview.max_duration > 0:
+        cues = [(start, min(end, preview.max_duration), text) for start, end, text in cues if start < preview.max_duration]
+    return cues
+
+
+def format_srt_timestamp(seconds: float) -> str:
+    """Format seconds as an SRT timestamp (HH:MM:SS,mmm)."""
+    milliseconds = int(round(max(0.0, seconds) * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+
+
+def write_srt_file(cues: List[Tuple[float, float, str]], srt_path: str) -> str:
+    """
+    Write (start, end, text) cues as an SRT subtitle file.
+    
+    Returns:
+        str: Path to the SRT file
+    """
+    directory = os.path.dirname(srt_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(srt_path, "w", encoding="utf-8") as f:
+        for number, (start, end, text) in enumerate(cues, start=1):
+            f.write(f"{number}\n{format_srt_timestamp(start)} --> {format_srt_timestamp(end)}\n{text}\n\n")
+    print(f"📝 Wrote {len(cues)} subtitle cues: {os.path.basename(srt_path)}")
+    return srt_path
+
+
+@instrumented()
+@verified_output
+@budgeted_render(processes=1)
+@job_scratch()
+def mux_language_variant(
+    video_path: str,
+    output_path: str,
+    audio_path: Optional[str] = None,
+    subtitle_tracks: Optional[List[Tuple[str, str]]] = None,
+    audio_language: Optional[str] = None
+) -> bool:
+    """
+    Build a language variant around an already-encoded video stream without re-encoding it:
+    the video is stream-copied, the audio is taken from audio_path (or kept from the video)
+    and every subtitle file becomes a mov_text track.
+    
+    Args:
+        video_path: Encoded video (its video stream is shared by all variants)
+        output_path: Output MP4
+        audio_path: Language audio to use instead of the video's own audio
+        subtitle_tracks: (SRT path, ISO 639-2 language code) pairs, e.g. [("main.eng.srt", "eng")]
+        audio_language: ISO 639-2 code for the audio track metadata
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    subtitle_tracks = subtitle_tracks or []
+    cmd = ['ffmpeg', '-i', video_path]
+    if audio_path:
+        cmd += ['-i', audio_path]
+    for srt_path, _ in subtitle_tracks:
+        cmd += ['-i', srt_path]
+
+    cmd += ['-map', '0:v']
+    if audio_path:
+        cmd += ['-map', '1:a', '-c:a', 'aac', '-b:a', '128k', '-shortest']
+    else:
+        cmd += ['-map', '0:a?', '-c:a', 'copy']
+    first_subtitle_input = 2 if audio_path else 1
+    for index in range(len(subtitle_tracks)):
+        cmd += ['-map', f'{first_subtitle_input + index}:s']
+
+    subtitle_codec = 'srt' if output_path.lower().endswith('.mkv') else 'mov_text'  # MKV intermediates
+    cmd += ['-c:v', 'copy', '-c:s', subtitle_codec]
+    for index, (_, language) in enumerate(subtitle_tracks):
+        cmd += [f'-metadata:s:s:{index}', f'language={language}']
+    if audio_language:
+        cmd += ['-metadata:s:a:0', f'language={audio_language}']
+    cmd += ['-movflags', '+faststart', '-y', output_path]
+
+    try:
+        print(f"🔤 Muxing {len(subtitle_tracks)} subtitle tracks into {os.path.basename(output_path)}...")
+        subprocess.run(cmd, capture_output=True, text=True, check=True)
+        print(f"✅ Muxed: {output_path}")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"❌ FFmpeg mux failed: {e}")
+        print(f"FFmpeg stderr: {e.stderr}")
+        return False
+
+
+def mux_subtitle_tracks(video_path: str, output_path: str, subtitle_tracks: List[Tuple[str, str]]) -> bool:
+    """Add subtitle tracks to a video, stream-copying its video and audio."""
+    return mux_language_variant(video_path, output_path, subtitle_tracks=subtitle_tracks)
+
+
+@instrumented()
+@verified_output
+@budgeted_render(processes=1)
+@job_scratch()
 def concatenate_videos_ffmpeg(video_paths: List[str], output_path: str) -> bool:
     """
     Concatenate videos using FFmpeg's concat demuxer - much faster than MoviePy
@@ -1433,8 +2189,8 @@ def concatenate_videos_ffmpeg(video_paths: List[str], output_path: str) -> bool:
     """
     try:
         # Create temporary file list for FFmpeg
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            filelist_path = f.name
+        filelist_path = scratch_file("concat_list.txt")
+        with open(filelist_path, 'w') as f:
             for video_path in video_paths:
                 # Escape single quotes and write to file list
                 escaped_path = video_path.replace("'", "'\"'\"'")
@@ -1447,6 +2203,11 @@ def concatenate_videos_ffmpeg(video_paths: List[str], output_path: str) -> bool:
             '-safe', '0',
             '-i', filelist_path,
             '-c', 'copy',  # Stream copy - no re-encoding!
+        ]
+        preview = get_preview_settings()
+        if preview is not None and preview.max_duration > 0:
+            cmd += ['-t', str(preview.max_duration)]
+        cmd += [
             '-y',  # Overwrite output
             output_path
         ]
@@ -1471,29 +2232,39 @@ def concatenate_videos_ffmpeg(video_paths: List[str], output_path: str) -> bool:
         except:
             pass
 
+@instrumented()
+@verified_output
+@budgeted_render(processes=1)
+@job_scratch()
 def concatenate_videos_ffmpeg_with_reencoding(video_paths: List[str], output_path: str) -> bool:
     """
     Concatenate videos with re-encoding - use when videos have different formats
     """
     try:
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            filelist_path = f.name
+        filelist_path = scratch_file("concat_list.txt")
+        with open(filelist_path, 'w') as f:
             for video_path in video_paths:
                 escaped_path = video_path.replace("'", "'\"'\"'")
                 f.write(f"file '{escaped_path}'\n")
         
+        preview = get_preview_settings()
         cmd = [
             'ffmpeg',
             '-f', 'concat',
             '-safe', '0',
             '-i', filelist_path,
             '-c:v', 'libx264',
-            '-preset', 'fast',
-            '-crf', '22',
+            '-preset', preview.preset if preview else 'fast',
+            '-crf', str(preview.crf) if preview else '22',
+            '-threads', str(get_resource_budget().encoder_threads),
             '-c:a', 'aac',
             '-b:a', '128k',
             '-pix_fmt', 'yuv420p',
             '-movflags', '+faststart',
+        ]
+        if preview is not None and preview.max_duration > 0:
+            cmd += ['-t', str(preview.max_duration)]
+        cmd += [
             '-y',
             output_path
         ]
@@ -1515,6 +2286,7 @@ def concatenate_videos_ffmpeg_with_reencoding(video_paths: List[str], output_pat
 
 
         
+@instrumented()
 def resize_video_maintain_aspect(video_clip, target_width: int, target_height: int, method: str = "letterbox"):
     """
     Resize video while maintaining aspect ratio.
@@ -1570,6 +2342,7 @@ def resize_video_maintain_aspect(video_clip, target_width: int, target_height: i
     else:
         raise ValueError(f"Unknown resize method: {method}. Use 'letterbox', 'crop', or 'stretch'")
 
+@instrumented()
 def auto_resize_video_clip(video_clip, target_width: int, target_height: int):
     """
     Automatically resize video clip using the best method based on aspect ratios.
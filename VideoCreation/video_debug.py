@@ -1,5 +1,9 @@
 import os
+import sys
+import time
+import tracemalloc
 import cv2
+from dataclasses import dataclass, asdict
 from typing import Optional, List
 
 def GetVideoInfo(video_path: str) -> Optional[dict]:
@@ -233,3 +237,199 @@ def compare_clips_info(clips: List, clip_names: List[str]) -> dict:
     print(f"Differences found: {len(comparison['differences'])}")
     print(f"Warnings generated: {len(comparison['warnings'])}")
     return comparison
+
+@dataclass
+class ClipNodeProfile:
+    """Per-node frame timing collected by profile_clip_tree."""
+    node_id: int
+    label: str
+    clip_type: str
+    depth: int
+    parent_id: Optional[int]
+    size: Optional[tuple] = None
+    duration: Optional[float] = None
+    calls: int = 0
+    inclusive_s: float = 0.0       # Time inside this node's get_frame, children included
+    exclusive_s: float = 0.0       # Time spent in this node only (resize/composite/text work)
+    alloc_blocks: int = 0          # Net Python memory blocks allocated by this node only
+    traced_bytes: int = 0          # Net bytes allocated by this node only (trace_memory=True)
+    frame_bytes: int = 0           # Bytes of the frame arrays this node returned
+
+def _is_clip(obj) -> bool:
+    """Duck-typed check for a MoviePy clip (avoids importing MoviePy here)."""
+    return hasattr(obj, "get_frame") and hasattr(obj, "frame_function") and hasattr(obj, "duration")
+
+def _closure_clips(func, seen_functions: set, max_depth: int = 4) -> List:
+    """Clips referenced from a frame function's closure (transform/resize/crop wrappers)."""
+    found = []
+    if func is None or max_depth <= 0 or id(func) in seen_functions:
+        return found
+    seen_functions.add(id(func))
+    owner = getattr(func, "__self__", None)
+    if owner is not None and _is_clip(owner):
+        found.append(owner)
+        return found
+    for cell in getattr(func, "__closure__", None) or ():
+        try:
+            value = cell.cell_contents
+        except ValueError:
+            continue
+        if _is_clip(value):
+            found.append(value)
+        elif callable(value):
+            found.extend(_closure_clips(value, seen_functions, max_depth - 1))
+    return found
+
+def walk_clip_tree(clip) -> List[tuple]:
+    """
+    Walk a clip graph: composite children (.clips), masks and clips captured
+    by frame-function closures (effects created with transform/image_transform).
+    Args:
+        clip: Root MoviePy clip
+    Returns:
+        list: (clip, parent_clip or None, relation, depth) tuples, each clip once, root first
+    """
+    nodes = []
+    visited = set()
+    stack = [(clip, None, "root", 0)]
+    while stack:
+        current, parent, relation, depth = stack.pop()
+        if current is None or id(current) in visited:
+            continue
+        visited.add(id(current))
+        nodes.append((current, parent, relation, depth))
+
+        children = []
+        for index, sub in enumerate(getattr(current, "clips", None) or []):
+            children.append((sub, f"clips[{index}]"))
+        mask = getattr(current, "mask", None)
+        if mask is not None:
+            children.append((mask, "mask"))
+        for source in _closure_clips(getattr(current, "frame_function", None), set()):
+            if source is not current:
+                children.append((source, "source"))
+        for child, child_relation in reversed(children):
+            stack.append((child, current, child_relation, depth + 1))
+    return nodes
+
+def profile_clip_tree(
+    clip,
+    clip_name: str = "Clip",
+    sample_count: int = 20,
+    sample_times: Optional[List[float]] = None,
+    trace_memory: bool = False,
+    print_report: bool = True
+) -> dict:
+    """
+    Profile where per-frame time goes in a nested clip tree.
+    Every node's get_frame is wrapped (instance attribute, restored afterwards), frames are
+    sampled across the timeline and inclusive/exclusive time per frame is reported per node.
+    Args:
+        clip: Root MoviePy clip (e.g. the CompositeVideoClip about to be written)
+        clip_name: Name for the report
+        sample_count: Number of evenly spaced frames to sample (ignored if sample_times given)
+        sample_times: Explicit frame times in seconds
+        trace_memory: Also count allocated bytes with tracemalloc (slower)
+        print_report: Print the per-node table
+    Returns:
+        dict: {"clip_name", "frames_sampled", "total_s", "nodes": [ClipNodeProfile as dict, ...]}
+    """
+    nodes = walk_clip_tree(clip)
+    node_ids = {id(node_clip): index for index, (node_clip, _, _, _) in enumerate(nodes)}
+    profiles = []
+    for index, (node_clip, parent, relation, depth) in enumerate(nodes):
+        profiles.append(ClipNodeProfile(
+            node_id=index,
+            label=f"{relation}:{type(node_clip).__name__}",
+            clip_type=type(node_clip).__name__,
+            depth=depth,
+            parent_id=node_ids.get(id(parent)) if parent is not None else None,
+            size=tuple(getattr(node_clip, "size", None) or ()) or None,
+            duration=getattr(node_clip, "duration", None)
+        ))
+
+    if sample_times is None:
+        duration = getattr(clip, "duration", None) or 0
+        if duration > 0:
+            sample_times = [duration * i / max(1, sample_count) for i in range(max(1, sample_count))]
+        else:
+            sample_times = [0]
+
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    # Stack of [child inclusive time, child blocks, child bytes] accumulators for the active calls
+    call_stack = []
+    originals = []
+
+    def make_wrapper(original_get_frame, profile: ClipNodeProfile):
+        def profiled_get_frame(t):
+            call_stack.append([0.0, 0, 0])
+            blocks_before = sys.getallocatedblocks()
+            bytes_before = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+            start = time.perf_counter()
+            try:
+                frame = original_get_frame(t)
+            finally:
+                elapsed = time.perf_counter() - start
+                blocks = sys.getallocatedblocks() - blocks_before
+                traced = (tracemalloc.get_traced_memory()[0] - bytes_before) if trace_memory else 0
+                child_time, child_blocks, child_bytes = call_stack.pop()
+                profile.calls += 1
+                profile.inclusive_s += elapsed
+                profile.exclusive_s += max(0.0, elapsed - child_time)
+                profile.alloc_blocks += blocks - child_blocks
+                profile.traced_bytes += traced - child_bytes
+                if call_stack:
+                    call_stack[-1][0] += elapsed
+                    call_stack[-1][1] += blocks
+                    call_stack[-1][2] += traced
+            profile.frame_bytes += getattr(frame, "nbytes", 0)
+            return frame
+        return profiled_get_frame
+
+    total_s = 0.0
+    try:
+        for (node_clip, _, _, _), profile in zip(nodes, profiles):
+            had_instance_attr = "get_frame" in vars(node_clip)
+            originals.append((node_clip, had_instance_attr, node_clip.get_frame))
+            node_clip.get_frame = make_wrapper(node_clip.get_frame, profile)
+
+        start = time.perf_counter()
+        for t in sample_times:
+            try:
+                clip.get_frame(t)
+            except Exception as e:
+                print(f"⚠️ Could not render frame at t={t:.2f}s: {e}")
+        total_s = time.perf_counter() - start
+    finally:
+        for node_clip, had_instance_attr, original in originals:
+            if had_instance_attr:
+                node_clip.get_frame = original
+            else:
+                try:
+                    del node_clip.get_frame
+                except AttributeError:
+                    pass
+        if started_tracing:
+            tracemalloc.stop()
+
+    frames = len(sample_times)
+    report = {
+        "clip_name": clip_name,
+        "frames_sampled": frames,
+        "total_s": total_s,
+        "nodes": [asdict(profile) for profile in profiles]
+    }
+
+    if print_report:
+        print(f"\n=== {clip_name} frame profile ({frames} frames, {total_s / max(1, frames) * 1000:.1f} ms/frame) ===")
+        print(f"{'node':<40} {'calls':>6} {'incl ms/f':>10} {'excl ms/f':>10} {'excl %':>7} {'blocks/f':>9}")
+        for profile in sorted(profiles, key=lambda p: -p.exclusive_s):
+            share = 100 * profile.exclusive_s / total_s if total_s > 0 else 0
+            label = ("  " * profile.depth + profile.label)[:40]
+            print(f"{label:<40} {profile.calls:>6} {profile.inclusive_s / frames * 1000:>10.2f} "
+                  f"{profile.exclusive_s / frames * 1000:>10.2f} {share:>6.1f}% {profile.alloc_blocks / frames:>9.0f}")
+        print("=" * (len(clip_name) + 20))
+    return report